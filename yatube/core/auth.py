@@ -0,0 +1,38 @@
+"""Пользователь запроса из кеша.
+
+AuthenticationMiddleware на каждый запрос достаёт пользователя из базы.
+CachedModelBackend сначала смотрит в кеш; запись удаляется при любом
+сохранении или удалении пользователя — смене пароля, профиля, входе
+(last_login), поэтому хеш сессии всегда считается по свежему паролю.
+Удаление видно всем процессам только в общем кеше, поэтому с кешем
+процесса (USER_CACHE_ENABLED = False) пользователь читается из базы.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+USER_KEY_TEMPLATE = 'auth.user.%s'
+User = get_user_model()
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if not settings.USER_CACHE_ENABLED:
+            return super().get_user(user_id)
+        key = USER_KEY_TEMPLATE % user_id
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    cache.delete(USER_KEY_TEMPLATE % instance.pk)
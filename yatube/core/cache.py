@@ -0,0 +1,29 @@
+import time
+
+from django.core.cache import cache
+
+GENERATION_KEY_TEMPLATE = 'generation.%s'
+
+
+def get_generation(name):
+    """Текущее поколение кеша с именем name.
+
+    Поколение входит в ключи закешированных страниц: после bump_generation
+    все старые ключи перестают использоваться и вытесняются сами.
+    """
+    key = GENERATION_KEY_TEMPLATE % name
+    generation = cache.get(key)
+    if generation is None:
+        # Если счётчик вытеснили из кеша, начинаем с метки времени,
+        # чтобы не совпасть ни с одним из прежних поколений.
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(name):
+    key = GENERATION_KEY_TEMPLATE % name
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_generation(name)
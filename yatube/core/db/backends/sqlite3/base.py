@@ -0,0 +1,79 @@
+"""SQLite с настройками для боевой нагрузки.
+
+Каждое новое соединение переводится в WAL и получает PRAGMA из
+DEFAULT_PRAGMAS (их можно переопределить в OPTIONS['pragmas']).
+Транзакции открываются через BEGIN IMMEDIATE, чтобы писатели сразу
+вставали в очередь busy_timeout, а не падали при повышении блокировки,
+а запросы, всё же получившие "database is locked", повторяются.
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+DEFAULT_LOCK_RETRIES = 5
+RETRY_DELAY = 0.05
+
+
+def apply_pragmas(conn, pragmas):
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked_error(error):
+    return 'database is locked' in str(error)
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    lock_retries = DEFAULT_LOCK_RETRIES
+
+    def _retry(self, method, *args):
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return method(self, *args)
+            except base.Database.OperationalError as error:
+                if attempt == self.lock_retries or not is_locked_error(error):
+                    raise
+                time.sleep(RETRY_DELAY * 2 ** attempt * random.random())
+
+    def execute(self, query, params=None):
+        return self._retry(base.SQLiteCursorWrapper.execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(
+            base.SQLiteCursorWrapper.executemany, query, param_list
+        )
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pragmas = DEFAULT_PRAGMAS
+    lock_retries = DEFAULT_LOCK_RETRIES
+    transaction_mode = 'IMMEDIATE'
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        self.lock_retries = params.pop('lock_retries', DEFAULT_LOCK_RETRIES)
+        self.transaction_mode = params.pop('transaction_mode', 'IMMEDIATE')
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.lock_retries = self.lock_retries
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
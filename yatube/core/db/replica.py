@@ -0,0 +1,8 @@
+from django.db import connections
+
+
+def sync_replica(source='default', target='replica'):
+    """Копирует основную SQLite-базу в реплику через backup API."""
+    connections[source].ensure_connection()
+    connections[target].ensure_connection()
+    connections[source].connection.backup(connections[target].connection)
@@ -0,0 +1,45 @@
+import random
+import threading
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def use_replica(enabled):
+    """Разрешает текущему потоку читать с реплики."""
+    _state.use_replica = enabled
+
+
+def reset():
+    _state.use_replica = False
+    _state.wrote = False
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    """Отправляет чтение на реплики, а запись — на основную базу.
+
+    Читать с реплики можно только там, где это разрешил
+    ReplicaRoutingMiddleware; сессии и пользователи всегда читаются
+    с основной базы, чтобы отставание реплики не разлогинивало людей.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            settings.READ_REPLICAS
+            and getattr(_state, 'use_replica', False)
+            and model._meta.app_label not in settings.REPLICA_EXCLUDED_APPS
+        ):
+            return random.choice(settings.READ_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
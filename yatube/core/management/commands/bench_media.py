@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.views import static
+
+from core import media
+
+CHUNK = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет отдачу большого файла из MEDIA_ROOT: скорость и пик '
+        'памяти для django.views.static.serve и core.media.serve'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=64,
+            help='Размер файла в мегабайтах',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        size = options['size'] * CHUNK
+        factory = RequestFactory()
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'posts'))
+            with open(os.path.join(root, 'posts', 'big.jpg'), 'wb') as file:
+                for _ in range(options['size']):
+                    file.write(os.urandom(CHUNK))
+            path = 'posts/big.jpg'
+            with override_settings(MEDIA_ROOT=root, MEDIA_ACCEL=None):
+                self.report('static.serve', size, self.measure(
+                    lambda: static.serve(
+                        factory.get('/'), path, document_root=root
+                    ),
+                    options['repeat'],
+                ))
+                self.report('media.serve', size, self.measure(
+                    lambda: media.serve(factory.get('/'), path),
+                    options['repeat'],
+                ))
+                half = size // 2
+                self.report('media.serve, Range', half, self.measure(
+                    lambda: media.serve(
+                        factory.get('/', HTTP_RANGE=f'bytes={half}-'), path
+                    ),
+                    options['repeat'],
+                ))
+
+    def measure(self, view, repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            response = view()
+            # Так ответ читает WSGI-сервер без file_wrapper.
+            for _ in response:
+                pass
+            response.close()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed / repeat, peak
+
+    def report(self, title, size, result):
+        elapsed, peak = result
+        self.stdout.write(
+            f'{title}: {size / CHUNK / elapsed:.0f} МБ/с, '
+            f'пик памяти {peak / 1024:.0f} КБ'
+        )
@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from core import ratelimit
+
+BENCH_LIMITS = {
+    'bench': {'user': '1000000/s', 'ip': '1000000/s', 'methods': ('POST',)},
+}
+
+
+class Command(BaseCommand):
+    help = 'Замеряет накладные расходы проверки лимитов на один запрос'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--clients', type=int, default=100)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        requests = []
+        for number in range(options['clients']):
+            request = factory.post('/', REMOTE_ADDR=f'10.0.0.{number % 250}')
+            request.user = AnonymousUser()
+            requests.append(request)
+
+        with override_settings(RATELIMITS=BENCH_LIMITS):
+            started = time.perf_counter()
+            for number in range(options['requests']):
+                ratelimit.check(requests[number % len(requests)], 'bench')
+            elapsed = time.perf_counter() - started
+
+        per_request = elapsed / options['requests'] * 1000
+        self.stdout.write(
+            f'{options["requests"]} проверок за {elapsed:.3f} с, '
+            f'{per_request:.4f} мс на запрос'
+        )
@@ -0,0 +1,102 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from core.db.backends.sqlite3.base import (
+    DEFAULT_PRAGMAS, apply_pragmas, is_locked_error,
+)
+
+SCHEMA = (
+    'CREATE TABLE comment ('
+    'id INTEGER PRIMARY KEY, post_id INTEGER, text TEXT, created REAL)'
+)
+INSERT = 'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)'
+SELECT = 'SELECT COUNT(*) FROM comment WHERE post_id = ?'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентную запись в SQLite: соединение на запрос '
+        'с настройками по умолчанию против постоянных соединений с WAL'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200)
+
+    def handle(self, *args, **options):
+        for title, worker in (
+            ('по умолчанию', self.default_worker),
+            ('WAL + PRAGMA', self.tuned_worker),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                path = str(Path(directory) / 'bench.sqlite3')
+                with sqlite3.connect(path) as conn:
+                    conn.execute(SCHEMA)
+                written, errors, elapsed = self.run(worker, path, options)
+            self.stdout.write(
+                f'{title}: {written / elapsed:.0f} записей/с, '
+                f'ошибок блокировки: {errors}'
+            )
+
+    def run(self, worker, path, options):
+        results = []
+        threads = [
+            threading.Thread(
+                target=worker, args=(path, options['writes'], results)
+            )
+            for _ in range(options['threads'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return (
+            sum(written for written, _ in results),
+            sum(errors for _, errors in results),
+            elapsed,
+        )
+
+    def default_worker(self, path, writes, results):
+        """Как раньше: новое соединение на каждый запрос, журнал DELETE."""
+        written = errors = 0
+        for number in range(writes):
+            conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+            try:
+                conn.execute('BEGIN')
+                conn.execute(SELECT, (number % 10,))
+                conn.execute(INSERT, (number % 10, 'comment', time.time()))
+                conn.execute('COMMIT')
+                written += 1
+            except sqlite3.OperationalError as error:
+                if not is_locked_error(error):
+                    raise
+                errors += 1
+            finally:
+                conn.close()
+        results.append((written, errors))
+
+    def tuned_worker(self, path, writes, results):
+        """Постоянное соединение, PRAGMA бэкенда и BEGIN IMMEDIATE."""
+        written = errors = 0
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        apply_pragmas(conn, DEFAULT_PRAGMAS)
+        for number in range(writes):
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(SELECT, (number % 10,))
+                conn.execute(INSERT, (number % 10, 'comment', time.time()))
+                conn.execute('COMMIT')
+                written += 1
+            except sqlite3.OperationalError as error:
+                if not is_locked_error(error):
+                    raise
+                errors += 1
+        conn.close()
+        results.append((written, errors))
@@ -0,0 +1,80 @@
+import os
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.profiling import SUFFIX, read_folded
+
+DUMPING_SUFFIX = '.dumping'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводит стеки профилировщика всех процессов в файлы '
+        '<страница>.folded для flamegraph и очищает накопленное'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=os.path.join(settings.PROFILER_DIR, 'dump'),
+            help='Каталог для сводных файлов',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не очищать накопленные стеки',
+        )
+        parser.add_argument('--top', type=int, default=5)
+
+    def handle(self, *args, **options):
+        profiles = defaultdict(Counter)
+        for path in self.sources(options['keep']):
+            view_name = os.path.basename(path).split('.')
+            read_folded(path, profiles['.'.join(view_name[:-2])])
+            if not options['keep']:
+                os.remove(path)
+        if not profiles:
+            self.stdout.write('Профилей нет')
+            return
+        os.makedirs(options['output'], exist_ok=True)
+        for view_name, stacks in sorted(profiles.items()):
+            path = os.path.join(options['output'], view_name + SUFFIX)
+            with open(path, 'w') as file:
+                file.writelines(
+                    f'{stack} {count}\n'
+                    for stack, count in stacks.most_common()
+                )
+            self.report(view_name, stacks, options['top'])
+            self.stdout.write(f'  {path}')
+
+    def sources(self, keep):
+        """Файлы процессов; при очистке сначала переименовываются.
+
+        Процесс, который сбрасывает стеки во время выгрузки, создаст
+        новый файл, и его стеки попадут в следующую выгрузку.
+        """
+        directory = settings.PROFILER_DIR
+        if not os.path.isdir(directory):
+            return []
+        paths = []
+        for entry in os.scandir(directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(SUFFIX) and not keep:
+                path = entry.path[:-len(SUFFIX)] + DUMPING_SUFFIX
+                os.replace(entry.path, path)
+                paths.append(path)
+            elif entry.name.endswith((SUFFIX, DUMPING_SUFFIX)):
+                paths.append(entry.path)
+        return paths
+
+    def report(self, view_name, stacks, top):
+        total = sum(stacks.values())
+        self.stdout.write(f'{view_name}: {total} сэмплов')
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rpartition(';')[2]] += count
+        for leaf, count in leaves.most_common(top):
+            self.stdout.write(f'  {count / total:6.1%} {leaf}')
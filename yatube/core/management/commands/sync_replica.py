@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db.replica import sync_replica
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу в реплики, при --interval — по кругу'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Пауза между копированиями в секундах',
+        )
+
+    def handle(self, *args, **options):
+        replicas = settings.READ_REPLICAS or ['replica']
+        while True:
+            for alias in replicas:
+                sync_replica(target=alias)
+            self.stdout.write(f'Реплики обновлены: {", ".join(replicas)}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,90 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+
+from core.cache import get_generation
+
+HOLES_ATTR = '_page_cache_holes'
+HOLE_MARKER = '<!--page-hole:%s-->'
+HOLE_RE = re.compile(r'<!--page-hole:([\w/.\-]+)-->')
+PAGE_KEY_TEMPLATE = 'page.%s.%s'
+GENERATION = 'pages'
+
+
+def fill_holes(content, request):
+    """Подставляет в страницу персональные фрагменты."""
+    return HOLE_RE.sub(
+        lambda match: render_to_string(match.group(1), request=request),
+        content,
+    )
+
+
+class AnonymousPageCacheMiddleware:
+    """Кеширует страницы целиком для посетителей без сессии.
+
+    Стоит до SessionMiddleware: при попадании в кеш не выполняются ни
+    view, ни запросы к сессиям и пользователям. В закешированной
+    странице вместо шапки и формы комментария лежат метки {% hole %},
+    их заполняет fill_holes с анонимным пользователем. Вместе со
+    страницей хранятся её заголовки (X-Frame-Options и прочие, что
+    ставят view и middleware ниже), ответ из кеша отдаёт их же.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = self._cacheable_match(request)
+        if match is None:
+            return self.get_response(request)
+
+        key = PAGE_KEY_TEMPLATE % (
+            get_generation(GENERATION),
+            hashlib.md5(request.get_full_path().encode()).hexdigest(),
+        )
+        request.resolver_match = match
+        request.user = AnonymousUser()
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(fill_holes(content, request))
+            for name, value in headers:
+                response[name] = value
+            response['Content-Length'] = len(response.content)
+            return response
+
+        setattr(request, HOLES_ATTR, True)
+        response = self.get_response(request)
+        if response.streaming:
+            return response
+        content = response.content.decode(response.charset)
+        if response.status_code == 200 and not response.cookies:
+            # Длина страницы меняется при заполнении меток.
+            headers = [
+                (name, value) for name, value in response.items()
+                if name.lower() != 'content-length'
+            ]
+            cache.set(key, (content, headers), settings.PAGE_CACHE_TIMEOUT)
+        response.content = fill_holes(content, request)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = len(response.content)
+        return response
+
+    def _cacheable_match(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.view_name not in settings.PAGE_CACHE_VIEWS:
+            return None
+        return match
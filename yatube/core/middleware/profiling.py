@@ -0,0 +1,40 @@
+import random
+
+from django.conf import settings
+
+from core.profiling import sampler
+
+
+class SamplingProfilerMiddleware:
+    """Профилирует часть запросов сэмплирующим профилировщиком.
+
+    Профилируются страницы из PROFILER_VIEWS, доля PROFILER_SAMPLE_RATE
+    остальных и запросы с заголовком X-Profile, равным PROFILER_TOKEN.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            if getattr(request, '_profiled', False):
+                sampler.stop()
+                sampler.flush()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        if should_profile(request, view_name):
+            request._profiled = True
+            sampler.start(view_name)
+
+
+def should_profile(request, view_name):
+    token = settings.PROFILER_TOKEN
+    if token and request.META.get('HTTP_X_PROFILE') == token:
+        return True
+    if view_name in settings.PROFILER_VIEWS:
+        return True
+    rate = settings.PROFILER_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
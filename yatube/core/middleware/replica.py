@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+
+from core.db import routers
+
+
+class ReplicaRoutingMiddleware:
+    """Включает чтение с реплик для страниц из REPLICA_READ_VIEWS.
+
+    Пользователь, который только что что-то записал, получает cookie и
+    REPLICA_PIN_SECONDS читает с основной базы: так он сразу видит свои
+    посты и комментарии, даже если реплика ещё отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        try:
+            response = self.get_response(request)
+            if routers.has_written():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE,
+                    int(time.time()) + settings.REPLICA_PIN_SECONDS,
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                )
+            return response
+        finally:
+            routers.reset()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.use_replica(
+            request.resolver_match.view_name in settings.REPLICA_READ_VIEWS
+            and not self._is_pinned(request)
+        )
+
+    def _is_pinned(self, request):
+        try:
+            pinned_until = int(request.COOKIES[settings.REPLICA_PIN_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        return pinned_until > time.time()
@@ -0,0 +1,113 @@
+import mimetypes
+import os
+import re
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+# Сжатые копии в порядке предпочтения.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых q=0."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику из STATIC_ROOT до остальных middleware.
+
+    Файлы с хешем в имени неизменны и кешируются браузером на год, к
+    остальным добавляется короткий max-age и проверка If-Modified-Since.
+    Если клиент принимает br или gzip и collectstatic положил сжатую
+    копию, отдаётся она: сжатия во время запроса нет. FileResponse
+    передаёт файл серверу через wsgi.file_wrapper, и gunicorn/uwsgi
+    отправляют его sendfile без копирования.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self._hashed_names = None
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path.startswith(
+            self.prefix
+        ):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except ValueError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        modified = http_date(stat.st_mtime)
+        if self.not_modified(request, stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            response = self.file_response(request, path)
+        response['Last-Modified'] = modified
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = self.cache_control(name)
+        return response
+
+    def file_response(self, request, path):
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        encoding = None
+        for coding, suffix in ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                path, encoding = path + suffix, coding
+                break
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if request.method == 'HEAD':
+            response.streaming_content = []
+        return response
+
+    def not_modified(self, request, mtime):
+        header = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        if not header:
+            return False
+        try:
+            since = parsedate_to_datetime(header).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+
+    def cache_control(self, name):
+        if HASHED_NAME_RE.search(name) and name in self.hashed_names():
+            return f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+        return 'public, max-age=60'
+
+    def hashed_names(self):
+        # Манифест читается один раз при старте процесса, поэтому и
+        # множество имён строится один раз, при первом запросе.
+        if self._hashed_names is None:
+            self._hashed_names = set(staticfiles_storage.hashed_files.values())
+        return self._hashed_names
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+
+class CappedCountPaginator(Paginator):
+    """Paginator, который считает строки не дальше ADMIN_COUNT_CAP.
+
+    COUNT(*) по большой таблице — полный проход, а подзапрос с LIMIT
+    останавливается на пороге. Страницы за порогом недоступны, их всё
+    равно никто не листает: нужное находят фильтрами и поиском.
+    """
+
+    @cached_property
+    def count(self):
+        cap = settings.ADMIN_COUNT_CAP
+        try:
+            return self.object_list[:cap].count()
+        except (AttributeError, TypeError):
+            return min(len(self.object_list), cap)
@@ -0,0 +1,105 @@
+"""Сэмплирующий профилировщик запросов.
+
+Фоновый поток раз в PROFILER_INTERVAL секунд снимает стеки потоков,
+которые сейчас обрабатывают профилируемые запросы, и считает одинаковые
+стеки по имени страницы. Пока таких запросов нет, поток не работает.
+Накопленное раз в PROFILER_FLUSH_SECONDS дописывается в
+PROFILER_DIR/<страница>.<pid>.folded в формате collapsed stacks
+(«кадр;кадр;кадр число»), который читают flamegraph.pl и speedscope;
+команда dump_profiles сводит файлы всех процессов.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+SUFFIX = '.folded'
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', '?')
+        names.append(f'{module}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def file_name(view_name):
+    return view_name.replace(':', '.').replace(os.sep, '_')
+
+
+class Sampler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.samples = defaultdict(Counter)
+        self.thread = None
+        self.flushed = time.monotonic()
+
+    def start(self, view_name):
+        with self.lock:
+            self.active[threading.get_ident()] = view_name
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='profiler', daemon=True
+                )
+                self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.active.pop(threading.get_ident(), None)
+
+    def run(self):
+        interval = settings.PROFILER_INTERVAL
+        while True:
+            time.sleep(interval)
+            with self.lock:
+                if not self.active:
+                    self.thread = None
+                    return
+                frames = sys._current_frames()
+                for ident, view_name in self.active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self.samples[view_name][collapse(frame)] += 1
+
+    def flush(self, force=False):
+        """Дописывает накопленные стеки в файлы и очищает их в памяти."""
+        now = time.monotonic()
+        with self.lock:
+            due = now - self.flushed >= settings.PROFILER_FLUSH_SECONDS
+            if not (force or due):
+                return
+            samples, self.samples = self.samples, defaultdict(Counter)
+            self.flushed = now
+        if not samples:
+            return
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        for view_name, stacks in samples.items():
+            path = os.path.join(
+                settings.PROFILER_DIR,
+                f'{file_name(view_name)}.{os.getpid()}{SUFFIX}',
+            )
+            with open(path, 'a') as file:
+                file.writelines(
+                    f'{stack} {count}\n' for stack, count in stacks.items()
+                )
+
+
+sampler = Sampler()
+# Остаток стеков при остановке воркера не теряется.
+atexit.register(sampler.flush, force=True)
+
+
+def read_folded(path, into):
+    with open(path) as file:
+        for line in file:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack:
+                into[stack] += int(count)
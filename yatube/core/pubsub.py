@@ -0,0 +1,74 @@
+"""Шина событий внутри процесса для живых обновлений.
+
+У каждого подписчика своя очередь ограниченной длины: если клиент
+не успевает читать, старые события выбрасываются, а подписчик узнаёт,
+сколько он пропустил. Число подписчиков тоже ограничено.
+"""
+import threading
+from collections import deque
+
+
+class BrokerFull(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, broker, maxsize, accept=None):
+        self.broker = broker
+        self.maxsize = maxsize
+        self.accept = accept
+        self.events = deque()
+        self.dropped = 0
+        self.condition = threading.Condition()
+
+    def put(self, event):
+        if self.accept is not None and not self.accept(event):
+            return
+        with self.condition:
+            if len(self.events) >= self.maxsize:
+                self.events.popleft()
+                self.dropped += 1
+            self.events.append(event)
+            self.condition.notify()
+
+    def get(self, timeout):
+        """Ждёт события до timeout секунд.
+
+        Возвращает накопившиеся события и число выброшенных.
+        """
+        with self.condition:
+            if not self.events:
+                self.condition.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+            dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self, max_subscribers, queue_size):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, accept=None):
+        with self._lock:
+            if len(self.subscriptions) >= self.max_subscribers:
+                raise BrokerFull
+            subscription = Subscription(self, self.queue_size, accept)
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.put(event)
@@ -0,0 +1,119 @@
+"""Ограничение частоты запросов скользящим окном.
+
+Для view и пользователя/IP в кеше лежат счётчики запросов за текущий
+и прошлый период; прошлый учитывается с весом оставшейся от него доли
+окна, поэтому на стыке периодов лимит не удваивается. Счётчик растёт
+атомарным cache.incr без блокировок и ожиданий, проверка — O(1) и
+несколько обращений к кешу. Запрос засчитывается во все свои лимиты
+или ни в один: при отказе счётчики возвращаются cache.decr.
+
+Между процессами счётчики общие, только если общий сам кеш
+(memcached); с LocMemCache у каждого процесса свои лимиты. Если кеш
+недоступен, счётчики временно живут в памяти процесса.
+"""
+import logging
+import time
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+KEY_TEMPLATE = 'ratelimit.%s.%s.%s'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+LOCAL_MAX_ENTRIES = 10000
+
+_local_cache = LocMemCache(
+    'ratelimit', {'OPTIONS': {'MAX_ENTRIES': LOCAL_MAX_ENTRIES}}
+)
+
+
+class SlidingWindow:
+    def __init__(self, rate):
+        """rate в виде '10/m': десять запросов в минуту."""
+        count, period = rate.split('/')
+        self.capacity = int(count)
+        self.period = PERIODS[period]
+
+    def keys(self, key, now):
+        """Ключи счётчиков текущего и прошлого периода."""
+        number = int(now // self.period)
+        return f'{key}.{number}', f'{key}.{number - 1}'
+
+    def wait(self, current, previous, now):
+        """Сколько секунд ждать запросу номер current в периоде, 0 — можно.
+
+        previous — запросов за прошлый период.
+        """
+        left = 1 - now % self.period / self.period
+        if current + previous * left <= self.capacity:
+            return 0
+        if current > self.capacity:
+            return left * self.period
+        return (left - (self.capacity - current) / previous) * self.period
+
+
+def _take(store, limits, now):
+    """Засчитывает запрос во все лимиты, если его пропускает каждый."""
+    keys = {key: limit.keys(key, now) for key, limit in limits.items()}
+    previous = store.get_many([prev for _, prev in keys.values()])
+    counted, wait = [], 0
+    for key, limit in limits.items():
+        current_key, previous_key = keys[key]
+        # Счётчик нужен ещё период как прошлый.
+        store.add(current_key, 0, 2 * limit.period)
+        current = store.incr(current_key)
+        counted.append(current_key)
+        wait = max(wait, limit.wait(
+            current, previous.get(previous_key, 0), now
+        ))
+    if wait:
+        for current_key in counted:
+            store.decr(current_key)
+    return wait
+
+
+def check(request, view_name):
+    """Сколько секунд ждать до следующего запроса, 0 — можно сейчас."""
+    config = settings.RATELIMITS.get(view_name)
+    if not config or request.method not in config['methods']:
+        return 0
+    idents = {'ip': request.META.get('REMOTE_ADDR', '')}
+    if request.user.is_authenticated:
+        idents['user'] = request.user.pk
+    limits = {
+        KEY_TEMPLATE % (view_name, scope, ident): SlidingWindow(config[scope])
+        for scope, ident in idents.items()
+        if scope in config
+    }
+    if not limits:
+        return 0
+    now = time.time()
+    try:
+        return _take(cache, limits, now)
+    except Exception:
+        logger.warning('Кеш недоступен, лимиты считаются в процессе')
+        return _take(_local_cache, limits, now)
+
+
+def ratelimit(view_name):
+    """Отвечает 429, если лимиты для view_name из RATELIMITS исчерпаны."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            wait = check(request, view_name)
+            if wait:
+                response = render(
+                    request,
+                    'core/429.html',
+                    status=HTTPStatus.TOO_MANY_REQUESTS,
+                )
+                response['Retry-After'] = int(wait) + 1
+                return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
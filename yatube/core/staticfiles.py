@@ -0,0 +1,54 @@
+"""Хранилище статики: хеш в именах файлов и заранее сжатые копии.
+
+collectstatic кладёт рядом с каждым текстовым файлом name.gz и, если
+установлен brotli, name.br — при запросе сжимать уже ничего не нужно,
+их отдаёт core.middleware.static.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.json', '.map', '.xml', '.html',
+)
+# Расширение сжатой копии и функция сжатия.
+ENCODINGS = {'.gz': lambda data: gzip.compress(data, 9, mtime=0)}
+if brotli is not None:
+    ENCODINGS['.br'] = lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Файла нет в манифесте (или манифеста нет вовсе, collectstatic ещё
+    # не запускали) — отдаём имя без хеша вместо ошибки рендера.
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.lower().endswith(COMPRESSIBLE) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix, compress in ENCODINGS.items():
+            compressed = compress(data)
+            # Сжатая копия, которая не меньше оригинала, не нужна.
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
@@ -0,0 +1,121 @@
+"""Кеширование в режиме stale-while-revalidate.
+
+Запись в кеше живёт hard_ttl секунд, но считается свежей только
+soft_ttl секунд. Устаревшая запись отдаётся сразу, а перерисовка
+запускается в фоне — не больше одной на ключ благодаря блокировке.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY_TEMPLATE = 'swr.lock.%s'
+
+
+class CircuitBreaker:
+    """Размыкается, если перерисовки подряд идут слишком медленно.
+
+    Пока цепь разомкнута, фоновые перерисовки не запускаются и
+    пользователи получают устаревшие данные, пока не истечёт hard_ttl.
+    """
+
+    def __init__(self, slow_threshold, max_failures, cooldown):
+        self.slow_threshold = slow_threshold
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            # Полуоткрытое состояние: пропускаем одну пробную перерисовку,
+            # после неудачи цепь снова разомкнётся.
+            self.opened_at = None
+            self.failures = self.max_failures - 1
+            return True
+
+    def record(self, duration, ok=True):
+        with self._lock:
+            if ok and duration < self.slow_threshold:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                self.opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+
+breaker = CircuitBreaker(
+    slow_threshold=settings.SWR_SLOW_RENDER_SECONDS,
+    max_failures=settings.SWR_BREAKER_FAILURES,
+    cooldown=settings.SWR_BREAKER_COOLDOWN,
+)
+
+
+def _render_and_store(key, render, soft_ttl, hard_ttl):
+    started = time.monotonic()
+    try:
+        value = render()
+    except Exception:
+        breaker.record(time.monotonic() - started, ok=False)
+        raise
+    breaker.record(time.monotonic() - started)
+    cache.set(key, (value, time.time() + soft_ttl), hard_ttl)
+    return value
+
+
+def _refresh(key, render, soft_ttl, hard_ttl, background):
+    try:
+        _render_and_store(key, render, soft_ttl, hard_ttl)
+    except Exception:
+        logger.exception('Фоновая перерисовка %s не удалась', key)
+    finally:
+        cache.delete(LOCK_KEY_TEMPLATE % key)
+        if background:
+            connections.close_all()
+
+
+def _schedule_refresh(key, render, soft_ttl, hard_ttl):
+    if not settings.SWR_BACKGROUND_REFRESH:
+        _refresh(key, render, soft_ttl, hard_ttl, background=False)
+        return
+    threading.Thread(
+        target=_refresh,
+        args=(key, render, soft_ttl, hard_ttl, True),
+        daemon=True,
+    ).start()
+
+
+def get_or_render(key, render, soft_ttl, hard_ttl):
+    """Возвращает значение из кеша, при необходимости перерисовывая его.
+
+    Синхронно рендерим только при полном промахе; устаревшее значение
+    отдаётся как есть, а обновление уходит в фоновый поток.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return _render_and_store(key, render, soft_ttl, hard_ttl)
+    value, fresh_until = entry
+    if time.time() < fresh_until or not breaker.allow():
+        return value
+    if cache.add(LOCK_KEY_TEMPLATE % key, True, settings.SWR_LOCK_TIMEOUT):
+        _schedule_refresh(key, render, soft_ttl, hard_ttl)
+    return value
@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.middleware.page_cache import HOLE_MARKER, HOLES_ATTR
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name):
+    """Вставляет персональный фрагмент страницы.
+
+    Если страница рендерится для кеша анонимных посетителей, вместо
+    фрагмента выводится метка: её заполняет AnonymousPageCacheMiddleware.
+    """
+    request = context.get('request')
+    if getattr(request, HOLES_ATTR, False):
+        return mark_safe(HOLE_MARKER % template_name)
+    return context.template.engine.get_template(template_name).render(context)
@@ -0,0 +1,62 @@
+from copy import copy
+
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.swr import get_or_render
+
+register = template.Library()
+
+
+class SWRCacheNode(template.Node):
+    def __init__(self, nodelist, soft_ttl, hard_ttl, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def _resolve_ttl(self, var, context):
+        try:
+            return int(var.resolve(context))
+        except (template.VariableDoesNotExist, ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'"swrcache" получил некорректный таймаут: {var.token!r}'
+            )
+
+    def render(self, context):
+        soft_ttl = self._resolve_ttl(self.soft_ttl, context)
+        hard_ttl = self._resolve_ttl(self.hard_ttl, context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        # Фоновая перерисовка может случиться уже после ответа,
+        # поэтому рендерим копию контекста, а не сам контекст запроса.
+        snapshot = copy(context)
+        return get_or_render(
+            key,
+            lambda: self.nodelist.render(snapshot),
+            soft_ttl,
+            hard_ttl,
+        )
+
+
+@register.tag
+def swrcache(parser, token):
+    """Кеширует фрагмент в режиме stale-while-revalidate.
+
+    {% swrcache soft_ttl hard_ttl fragment_name [var1 var2 ...] %}
+    """
+    nodelist = parser.parse(('endswrcache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 4:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} требует как минимум 3 аргумента'
+        )
+    return SWRCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        parser.compile_filter(tokens[2]),
+        tokens[3],
+        [parser.compile_filter(t) for t in tokens[4:]],
+    )
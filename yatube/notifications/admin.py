@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Inbox, Notification
+
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'recipient',
+        'kind',
+        'post',
+        'count',
+        'is_read',
+        'updated',
+    )
+    list_filter = ('kind', 'is_read')
+    raw_id_fields = ('recipient', 'post', 'actor')
+
+
+admin.site.register(Notification, NotificationAdmin)
+admin.site.register(Inbox)
@@ -0,0 +1,84 @@
+"""Запись и чтение входящих уведомлений.
+
+Рассылка идёт пачками по FANOUT_CHUNK получателей: непрочитанные
+уведомления того же вида обновляются одним UPDATE, недостающие
+создаются одним bulk_create, счётчик непрочитанного меняется вместе
+с ними и не требует COUNT(*).
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Inbox, Notification
+
+FANOUT_CHUNK = 500
+PAGE_SIZE = 20
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def deliver(recipient_ids, kind, post, actor, count=1):
+    """Доставляет событие получателям, склеивая его с непрочитанным."""
+    recipients = sorted(set(recipient_ids) - {actor.pk})
+    for chunk in _chunks(recipients, FANOUT_CHUNK):
+        same = Notification.objects.filter(
+            recipient_id__in=chunk, kind=kind, is_read=False
+        )
+        if kind == Notification.COMMENT:
+            same = same.filter(post=post)
+        else:
+            same = same.filter(actor=actor)
+        with transaction.atomic():
+            coalesced = set(same.values_list('recipient_id', flat=True))
+            same.update(
+                count=F('count') + count,
+                post=post,
+                actor=actor,
+                updated=timezone.now(),
+            )
+            new = [pk for pk in chunk if pk not in coalesced]
+            Notification.objects.bulk_create(
+                Notification(
+                    recipient_id=pk,
+                    kind=kind,
+                    post=post,
+                    actor=actor,
+                    count=count,
+                )
+                for pk in new
+            )
+            Inbox.objects.bulk_create(
+                (Inbox(user_id=pk) for pk in new), ignore_conflicts=True
+            )
+            Inbox.objects.filter(user_id__in=new).update(
+                unread=F('unread') + 1
+            )
+
+
+def unread_count(user):
+    return Inbox.objects.filter(user=user).values_list(
+        'unread', flat=True
+    ).first() or 0
+
+
+def mark_all_read(user):
+    with transaction.atomic():
+        Notification.objects.filter(recipient=user, is_read=False).update(
+            is_read=True
+        )
+        Inbox.objects.filter(user=user).update(unread=0)
+
+
+def get_page(user, before=None, size=PAGE_SIZE):
+    """Страница входящих перед id=before и курсор следующей страницы."""
+    notifications = user.notifications.filter(
+        post__is_deleted=False
+    ).select_related('post', 'actor').defer('post__text').order_by('-id')
+    if before:
+        notifications = notifications.filter(id__lt=before)
+    items = list(notifications[:size + 1])
+    next_cursor = items[size - 1].pk if len(items) > size else None
+    return items[:size], next_cursor
@@ -0,0 +1,61 @@
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications.models import Inbox, Notification
+
+MESSAGES_PER_BATCH = 100
+NOTIFICATIONS_PER_DIGEST = 20
+
+
+class Command(BaseCommand):
+    help = 'Рассылает дайджест непрочитанных уведомлений по почте'
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        inboxes = Inbox.objects.filter(
+            digest=True, unread__gt=0
+        ).exclude(user__email='').select_related('user')
+        # Одно SMTP-соединение на всю рассылку, письма уходят пачками.
+        connection = get_connection()
+        connection.open()
+        sent, messages, delivered = 0, [], []
+        for inbox in inboxes.iterator():
+            message = self.build_message(inbox, connection)
+            if message is None:
+                continue
+            messages.append(message)
+            delivered.append(inbox.pk)
+            if len(messages) >= MESSAGES_PER_BATCH:
+                sent += connection.send_messages(messages) or 0
+                messages = []
+        if messages:
+            sent += connection.send_messages(messages) or 0
+        connection.close()
+        Inbox.objects.filter(pk__in=delivered).update(last_digest=started)
+        self.stdout.write(f'Отправлено дайджестов: {sent}')
+
+    def build_message(self, inbox, connection):
+        notifications = Notification.objects.filter(
+            recipient_id=inbox.pk, is_read=False
+        )
+        if inbox.last_digest:
+            notifications = notifications.filter(
+                updated__gt=inbox.last_digest
+            )
+        notifications = list(
+            notifications.select_related('actor')[:NOTIFICATIONS_PER_DIGEST]
+        )
+        if not notifications:
+            return None
+        lines = [
+            f'{item.get_kind_display()} от {item.actor.username}: '
+            f'{item.count}'
+            for item in notifications
+        ]
+        return EmailMessage(
+            subject=f'Yatube: непрочитанных уведомлений {inbox.unread}',
+            body='\n'.join(lines),
+            to=[inbox.user.email],
+            connection=connection,
+        )
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Notification(models.Model):
+    """Уведомление во входящих.
+
+    Однотипные непрочитанные события склеиваются в одну запись:
+    count растёт, а текст превращается в «5 новых комментариев».
+    """
+    COMMENT = 'comment'
+    POST = 'post'
+    KINDS = (
+        (COMMENT, 'Комментарий к посту'),
+        (POST, 'Новый пост автора'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    kind = models.CharField('Тип', max_length=10, choices=KINDS)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Кто',
+    )
+    count = models.PositiveIntegerField('Событий', default=1)
+    is_read = models.BooleanField('Прочитано', default=False)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['recipient', '-id']),
+            models.Index(fields=['recipient', 'kind', 'is_read']),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.kind} x{self.count}'
+
+
+class Inbox(models.Model):
+    """Счётчик непрочитанного и настройки доставки пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='inbox',
+    )
+    unread = models.PositiveIntegerField('Непрочитанных', default=0)
+    digest = models.BooleanField('Присылать дайджест на почту', default=False)
+    last_digest = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Входящие'
+        verbose_name_plural = 'Входящие'
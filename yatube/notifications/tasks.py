@@ -0,0 +1,39 @@
+from collections import defaultdict
+
+from posts.models import Comment, Follow, Post
+from tasks.queue import task
+from .inbox import deliver
+from .models import Notification
+
+
+@task(batch=True)
+def comments_added(args_list):
+    """Сообщает авторам постов о новых комментариях, по посту за раз."""
+    comments = Comment.objects.filter(
+        pk__in=[args[0] for args in args_list]
+    ).select_related('post', 'author').order_by('id')
+    by_post = defaultdict(list)
+    for comment in comments:
+        if comment.author_id != comment.post.author_id:
+            by_post[comment.post].append(comment)
+    for post, post_comments in by_post.items():
+        deliver(
+            [post.author_id],
+            Notification.COMMENT,
+            post,
+            post_comments[-1].author,
+            count=len(post_comments),
+        )
+
+
+@task(batch=True)
+def posts_published(args_list):
+    """Рассылает подписчикам автора уведомления о новых постах."""
+    posts = Post.objects.filter(
+        pk__in=[args[0] for args in args_list]
+    ).select_related('author').order_by('pub_date')
+    for post in posts:
+        followers = Follow.objects.filter(
+            author_id=post.author_id, user__isnull=False
+        ).values_list('user_id', flat=True)
+        deliver(list(followers), Notification.POST, post, post.author)
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+from tasks.worker import run_once
+from ..inbox import get_page, unread_count
+from ..models import Inbox, Notification
+
+
+class InboxTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.another_reader = User.objects.create_user(username='another')
+        cls.post = Post.objects.create(author=cls.author, text='test_post')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def comment(self, client, text='comment'):
+        client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            data={'text': text},
+        )
+
+    def test_comments_coalesced_into_one_notification(self):
+        """Комментарии к посту склеиваются в одно уведомление автору"""
+        for _ in range(3):
+            self.comment(self.reader_client)
+        run_once(batch_size=10)
+        self.comment(self.reader_client)
+        run_once(batch_size=10)
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.count, 4)
+        self.assertEqual(unread_count(self.author), 1)
+
+    def test_own_comment_not_notified(self):
+        """Комментарий к своему посту не создаёт уведомления"""
+        self.comment(self.author_client)
+        run_once(batch_size=10)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Новый пост доставляется всем подписчикам автора"""
+        for user in (self.reader, self.another_reader):
+            Follow.objects.create(user=user, author=self.author)
+        for text in ('first', 'second'):
+            self.author_client.post(
+                reverse('posts:create_post'), data={'text': text}
+            )
+        run_once(batch_size=10)
+        for user in (self.reader, self.another_reader):
+            with self.subTest(user=user):
+                notification = Notification.objects.get(recipient=user)
+                self.assertEqual(notification.count, 2)
+                self.assertEqual(unread_count(user), 1)
+
+    def test_mark_read_resets_counter(self):
+        """Отметка прочитанным обнуляет счётчик"""
+        self.comment(self.reader_client)
+        run_once(batch_size=10)
+        self.author_client.post(reverse('notifications:mark_read'))
+        self.assertEqual(unread_count(self.author), 0)
+        self.assertFalse(
+            Notification.objects.filter(is_read=False).exists()
+        )
+
+    def test_cursor_pagination(self):
+        """Курсор отдаёт следующую страницу без повторов"""
+        Notification.objects.bulk_create(
+            Notification(
+                recipient=self.author,
+                kind=Notification.COMMENT,
+                post=self.post,
+                actor=self.reader,
+                is_read=True,
+            )
+            for _ in range(5)
+        )
+        first, cursor = get_page(self.author, size=3)
+        second, last_cursor = get_page(self.author, cursor, size=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(last_cursor)
+        self.assertTrue(first[-1].pk > second[0].pk)
+        response = self.author_client.get(
+            reverse('notifications:index'), {'before': 'abc'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_digest_sent_once_per_user(self):
+        """Дайджест уходит один раз, пока не появится новое"""
+        Inbox.objects.create(user=self.author, digest=True)
+        self.comment(self.reader_client)
+        run_once(batch_size=10)
+        call_command('send_digests', stdout=StringIO())
+        call_command('send_digests', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['author@example.com'])
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'notifications'
+
+urlpatterns = [
+    path('', views.index, name='index'),
+    path('read/', views.mark_read, name='mark_read'),
+    path('digest/', views.toggle_digest, name='toggle_digest'),
+]
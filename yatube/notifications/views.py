@@ -0,0 +1,39 @@
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_POST
+
+from . import inbox
+from .models import Inbox
+
+
+@login_required
+def index(request):
+    """Входящие уведомления с курсорной пагинацией"""
+    before = request.GET.get('before')
+    if before and not before.isdigit():
+        raise Http404
+    notifications, next_cursor = inbox.get_page(request.user, before)
+    user_inbox, _ = Inbox.objects.get_or_create(user=request.user)
+    context = {
+        'notifications': notifications,
+        'next_cursor': next_cursor,
+        'inbox': user_inbox,
+    }
+    return render(request, 'notifications/index.html', context)
+
+
+@login_required
+@require_POST
+def mark_read(request):
+    inbox.mark_all_read(request.user)
+    return redirect('notifications:index')
+
+
+@login_required
+@require_POST
+def toggle_digest(request):
+    user_inbox, _ = Inbox.objects.get_or_create(user=request.user)
+    user_inbox.digest = not user_inbox.digest
+    user_inbox.save(update_fields=('digest',))
+    return redirect('notifications:index')
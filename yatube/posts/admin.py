@@ -1,22 +1,161 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
+from core.paginator import CappedCountPaginator
+from . import purge, search
 from .models import Group, Post, Comment
 
 
-class PostAdmin(admin.ModelAdmin):
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автокомплит, которому выбранный объект передают уже загруженным.
+
+    AutocompleteSelect ищет подпись выбранного значения отдельным
+    запросом, а в list_editable виджет свой у каждой строки.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.selected is None:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, self.selected.pk, str(self.selected), True, len(options)
+        ))
+        return [(None, options, 0)]
+
+
+class ChangeListForm(forms.ModelForm):
+    """Форма строки списка: связанные объекты берёт из list_select_related."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, LoadedAutocompleteSelect):
+                widget.selected = getattr(self.instance, name)
+
+
+class PurgeAdminMixin:
+    """Удаление из админки через posts.purge: пометка и фоновая задача.
+
+    purge_queryset — функция posts.purge, которая помечает QuerySet.
+    Страница подтверждения не собирает все связанные объекты, как
+    каскадное удаление, а перечисляет только выбранные.
+    """
+    purge_queryset = None
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(
+            request, self.get_queryset(request).filter(pk=obj.pk)
+        )
+
+    def delete_queryset(self, request, queryset):
+        self.purge_queryset(queryset)
+
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {}, set(), []
+
+
+class DuplicateFilter(admin.SimpleListFilter):
+    title = 'дубликаты'
+    parameter_name = 'duplicate'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('yes', 'Дубликаты'),
+            ('no', 'Оригинальные'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(duplicate_of__isnull=False)
+        if self.value() == 'no':
+            return queryset.filter(duplicate_of__isnull=True)
+        return queryset
+
+
+class PostAdmin(PurgeAdminMixin, admin.ModelAdmin):
     list_display = (
         'pk',
-        'text',
+        'excerpt',
         'pub_date',
         'author',
         'group',
+        'is_published',
+        'duplicate_of',
     )
     list_editable = ('group',)
-    search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_select_related = ('author', 'group', 'duplicate_of')
+    autocomplete_fields = ('author', 'group')
+    search_fields = ('text', 'excerpt')
+    list_filter = ('pub_date', 'is_published', DuplicateFilter)
+    date_hierarchy = 'pub_date'
+    paginator = CappedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    actions = ('unmark_duplicates',)
+    purge_queryset = staticmethod(purge.delete_posts)
+
+    def get_queryset(self, request):
+        # Черновики и отложенные посты тоже видны. В списке нужен только
+        # анонс, полные тексты не загружаются.
+        return Post.all_objects.filter(is_deleted=False).defer(
+            'text',
+            'text_html',
+            'duplicate_of__text',
+            'duplicate_of__text_html',
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', ChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search.available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return search.filter_posts(queryset, search_term), False
+
+    def unmark_duplicates(self, request, queryset):
+        queryset.update(duplicate_of=None)
+    unmark_duplicates.short_description = 'Снять отметку дубликата'
+
+
+class GroupAdmin(PurgeAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count')
+    search_fields = ('title', 'slug')
+    purge_queryset = staticmethod(purge.delete_groups)
+
+
+class CommentAdmin(PurgeAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'text', 'author', 'post', 'created')
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    # Точное совпадение по уникальному индексу вместо LIKE по текстам.
+    search_fields = ('=author__username',)
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    purge_queryset = staticmethod(purge.delete_comments)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer(
+            'text_html', 'post__text', 'post__text_html'
+        )
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
@@ -0,0 +1,385 @@
+"""Архив старых постов.
+
+Команда archive_posts переносит посты старше ARCHIVE_AFTER_DAYS вместе
+с комментариями в отдельный файл SQLite (ARCHIVE_PATH) и удаляет их из
+posts_post, поэтому рабочие таблицы и их индексы остаются маленькими.
+В архив только дописывают; тексты лежат сжатыми zlib, а колонки для
+выборок (автор, сообщество, дата) — открыто, с индексами под ленты.
+
+Архивный пост читается как обычный несохранённый Post с
+is_archived = True: post_detail ищет в архиве то, чего нет в базе, а
+TieredPosts продолжает ленты архивом после последнего рабочего поста.
+Перенос не считается удалением: сводки и счётчики сообществ не меняются.
+"""
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import markup
+from .models import Comment, Group, Post, PostBody, User
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS post (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER NOT NULL,
+    group_id INTEGER,
+    pub_date TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS post_pub_date ON post (pub_date, id);
+CREATE INDEX IF NOT EXISTS post_author ON post (author_id, pub_date, id);
+CREATE INDEX IF NOT EXISTS post_group ON post (group_id, pub_date, id);
+CREATE TABLE IF NOT EXISTS comment (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    created TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comment_post ON comment (post_id, id);
+'''
+POST_FIELDS = (
+    'text', 'text_html', 'render_version', 'excerpt', 'text_length', 'image'
+)
+COMMENT_FIELDS = ('text', 'text_html', 'render_version')
+# Формат дат в архиве: строки сравниваются в том же порядке, что и время.
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+_local = threading.local()
+
+
+def is_moving():
+    """Идёт ли в этом потоке перенос постов в архив."""
+    return getattr(_local, 'moving', False)
+
+
+@contextlib.contextmanager
+def moving():
+    _local.moving = True
+    try:
+        yield
+    finally:
+        _local.moving = False
+
+
+def connect(create=False):
+    """Соединение потока с архивом или None, если архива ещё нет."""
+    path = settings.ARCHIVE_PATH
+    connections = _local.__dict__.setdefault('connections', {})
+    connection = connections.get(path)
+    if connection is None:
+        if not create and not os.path.exists(path):
+            return None
+        connection = sqlite3.connect(path, timeout=5)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        connections[path] = connection
+    return connection
+
+
+def _pack(instance, fields):
+    return zlib.compress(json.dumps(
+        {field: instance[field] for field in fields}
+    ).encode())
+
+
+def _unpack(data):
+    values = json.loads(zlib.decompress(data))
+    if values['render_version'] != markup.RENDER_VERSION:
+        # Архив не переписывается: устаревший HTML рисуется при чтении.
+        values['text_html'] = markup.render(values['text'])
+        values['render_version'] = markup.RENDER_VERSION
+    return values
+
+
+def _format_date(moment):
+    return moment.astimezone(datetime.timezone.utc).strftime(DATE_FORMAT)
+
+
+def _parse_date(value):
+    return datetime.datetime.strptime(value, DATE_FORMAT).replace(
+        tzinfo=datetime.timezone.utc
+    )
+
+
+def _restore(instance):
+    instance._state.adding = False
+    instance._state.db = 'default'
+    instance.is_archived = True
+    return instance
+
+
+def _posts(rows):
+    """Post из строк архива, с авторами и сообществами, как select_related."""
+    rows = list(rows)
+    users = User.objects.in_bulk({row[1] for row in rows})
+    groups = Group.objects.in_bulk({row[2] for row in rows if row[2]})
+    posts = []
+    for post_id, author_id, group_id, pub_date, data in rows:
+        posts.append(_restore(Post(
+            id=post_id,
+            author=users[author_id],
+            group=groups.get(group_id),
+            pub_date=_parse_date(pub_date),
+            **_unpack(data),
+        )))
+    return posts
+
+
+def get_post(post_id):
+    connection = connect()
+    if connection is None:
+        return None
+    rows = connection.execute(
+        'SELECT id, author_id, group_id, pub_date, data FROM post '
+        'WHERE id = ?',
+        (post_id,),
+    ).fetchall()
+    return _posts(rows)[0] if rows else None
+
+
+def get_comments(post):
+    connection = connect()
+    if connection is None:
+        return []
+    rows = connection.execute(
+        'SELECT id, author_id, created, data FROM comment '
+        'WHERE post_id = ? ORDER BY id',
+        (post.pk,),
+    ).fetchall()
+    users = User.objects.in_bulk({row[1] for row in rows})
+    return [
+        _restore(Comment(
+            id=comment_id,
+            post=post,
+            author=users[author_id],
+            created=_parse_date(created),
+            **_unpack(data),
+        ))
+        for comment_id, author_id, created, data in rows
+    ]
+
+
+class ArchivedPosts:
+    """Архивные посты, новые сверху; фильтры как в ORM.
+
+    Поддерживаются author_id, group_id и author_id__in.
+    """
+    COLUMNS = {
+        'author_id': 'author_id = ?',
+        'group_id': 'group_id = ?',
+    }
+
+    def __init__(self, **filters):
+        self.filters = filters
+
+    def _query(self, select, suffix='', params=()):
+        connection = connect()
+        if connection is None:
+            return []
+        where, values = [], []
+        # Фильтры разбираются только при наличии архива: author_id__in
+        # может быть ещё не выполненным QuerySet.
+        for name, value in self.filters.items():
+            if name == 'author_id__in':
+                value = list(value)
+                placeholders = ', '.join('?' * len(value))
+                where.append(
+                    f'author_id IN ({placeholders})' if value else '0'
+                )
+                values.extend(value)
+            else:
+                where.append(self.COLUMNS[name])
+                values.append(value)
+        sql = f'SELECT {select} FROM post'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return connection.execute(
+            sql + suffix, values + list(params)
+        ).fetchall()
+
+    def count(self):
+        rows = self._query('COUNT(*)')
+        return rows[0][0] if rows else 0
+
+    def exists(self):
+        return bool(self._query('1', ' LIMIT 1'))
+
+    def __getitem__(self, item):
+        start, stop = item.start or 0, item.stop
+        if stop is not None and stop <= start:
+            return []
+        return _posts(self._query(
+            'id, author_id, group_id, pub_date, data',
+            ' ORDER BY pub_date DESC, id DESC LIMIT ? OFFSET ?',
+            (-1 if stop is None else stop - start, start),
+        ))
+
+
+class TieredPosts:
+    """Лента из рабочих постов, за которыми идут архивные.
+
+    В архив посты уходят от старых к новым, поэтому все архивные
+    старше рабочих и ленту можно просто продолжить. Paginator читает
+    только нужный уровень: глубокие страницы — одним запросом к архиву.
+    """
+
+    def __init__(self, posts, archived):
+        self.posts = posts
+        self.archived = archived
+        self._hot_count = None
+
+    @property
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.posts.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count + self.archived.count()
+
+    def __getitem__(self, item):
+        start, stop = item.start or 0, item.stop
+        page = []
+        if start < self.hot_count:
+            page = list(self.posts[start:stop])
+        if stop is None or stop > self.hot_count:
+            page += self.archived[
+                max(start - self.hot_count, 0):
+                None if stop is None else stop - self.hot_count
+            ]
+        return page
+
+
+def tiered(posts, **filters):
+    return TieredPosts(posts, ArchivedPosts(**filters))
+
+
+def group_summary():
+    """{сообщество: (постов, множество авторов, последняя дата)}."""
+    connection = connect()
+    if connection is None:
+        return {}
+    summary = {}
+    rows = connection.execute(
+        'SELECT group_id, author_id, COUNT(*), MAX(pub_date) FROM post '
+        'WHERE group_id IS NOT NULL GROUP BY group_id, author_id'
+    ).fetchall()
+    for group_id, author_id, total, latest in rows:
+        posts, authors, last = summary.get(group_id, (0, set(), None))
+        authors.add(author_id)
+        latest = _parse_date(latest)
+        summary[group_id] = (
+            posts + total, authors, max(last, latest) if last else latest
+        )
+    return summary
+
+
+def rollup_rows():
+    """(дата, автор, сообщество, поле сводки) всех записей архива."""
+    connection = connect()
+    if connection is None:
+        return
+    rows = connection.execute('SELECT pub_date, author_id, group_id FROM post')
+    for pub_date, author_id, group_id in rows:
+        yield _parse_date(pub_date), author_id, group_id, 'posts'
+    rows = connection.execute(
+        'SELECT comment.created, post.author_id, post.group_id FROM comment '
+        'JOIN post ON post.id = comment.post_id'
+    )
+    for created, author_id, group_id in rows:
+        yield _parse_date(created), author_id, group_id, 'comments'
+
+
+def forget_author(author_id):
+    """Удаляет из архива посты и комментарии удалённого пользователя."""
+    connection = connect()
+    if connection is None:
+        return
+    with connection:
+        connection.execute(
+            'DELETE FROM comment WHERE author_id = ? OR post_id IN '
+            '(SELECT id FROM post WHERE author_id = ?)',
+            (author_id, author_id),
+        )
+        connection.execute(
+            'DELETE FROM post WHERE author_id = ?', (author_id,)
+        )
+
+
+def archive_batch(before, size):
+    """Переносит в архив до size самых старых постов раньше before.
+
+    Чтение, запись в архив и удаление идут в одной транзакции (BEGIN
+    IMMEDIATE): пока пачка переносится, к её постам не добавится
+    комментарий, который удалится вместе с постом, не попав в архив.
+    Архив фиксируется раньше базы, и после сбоя между ними повторный
+    запуск только удалит уже перенесённые посты.
+
+    В архив попадают посты и видимые комментарии. Остальное, что
+    ссылается на пост, удаляется каскадом намеренно: история правок,
+    уведомления, теги, похожие посты и подписи дубликатов нужны только
+    рабочим постам, а комментарии с пометкой is_deleted и так ждут
+    удаления.
+    """
+    with moving(), transaction.atomic():
+        posts = list(Post.objects.filter(pub_date__lt=before).order_by(
+            'pub_date', 'pk'
+        ).values('pk', 'author_id', 'group_id', 'pub_date', 'is_compressed',
+                 *POST_FIELDS)[:size])
+        if not posts:
+            return 0
+        post_ids = [post['pk'] for post in posts]
+        bodies = PostBody.objects.in_bulk(
+            [post['pk'] for post in posts if post['is_compressed']]
+        )
+        for post in posts:
+            body = bodies.get(post['pk'])
+            if body is not None:
+                post['text'], post['text_html'] = body.text, body.text_html
+        comments = Comment.objects.filter(post_id__in=post_ids).order_by(
+            'pk'
+        ).values('pk', 'post_id', 'author_id', 'created', *COMMENT_FIELDS)
+        _write(posts, comments)
+        Post.objects.filter(pk__in=post_ids).delete()
+    return len(posts)
+
+
+def _write(posts, comments):
+    connection = connect(create=True)
+    with connection:
+        connection.executemany(
+            'INSERT OR IGNORE INTO post VALUES (?, ?, ?, ?, ?)',
+            (
+                (post['pk'], post['author_id'], post['group_id'],
+                 _format_date(post['pub_date']), _pack(post, POST_FIELDS))
+                for post in posts
+            ),
+        )
+        connection.executemany(
+            'INSERT OR IGNORE INTO comment VALUES (?, ?, ?, ?, ?)',
+            (
+                (comment['pk'], comment['post_id'], comment['author_id'],
+                 _format_date(comment['created']),
+                 _pack(comment, COMMENT_FIELDS))
+                for comment in comments
+            ),
+        )
+
+
+def archive_older_than(days, batch_size):
+    before = timezone.now() - datetime.timedelta(days=days)
+    total = 0
+    while True:
+        moved = archive_batch(before, batch_size)
+        if not moved:
+            return total
+        total += moved
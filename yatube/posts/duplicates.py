@@ -0,0 +1,121 @@
+"""Поиск почти одинаковых постов: MinHash и LSH.
+
+Текст разбивается на шинглы по DUPLICATES_SHINGLE слов, из их хешей
+считается MinHash-подпись. Подпись делится на DUPLICATES_BANDS полос,
+хеш каждой полосы — корзина в SignatureBucket. Кандидаты в дубликаты —
+посты, совпавшие хотя бы в одной корзине, поэтому поиск идёт по
+индексу, а не перебором. Похожесть кандидата оценивается по доле
+совпавших значений подписи.
+"""
+import hashlib
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Post, PostSignature, SignatureBucket
+
+# Простое число Мерсенна 2^31 - 1: a * x помещается в uint64.
+PRIME = (1 << 31) - 1
+SEED = 20261019
+WORD_RE = re.compile(r'\w+')
+
+
+def _permutations():
+    size = settings.DUPLICATES_BANDS * settings.DUPLICATES_ROWS
+    rng = np.random.RandomState(SEED)
+    a = rng.randint(1, PRIME, size=size).astype(np.uint64)
+    b = rng.randint(0, PRIME, size=size).astype(np.uint64)
+    return a[:, None], b[:, None]
+
+
+def shingles(text):
+    """Хеши шинглов текста; у пустого текста один нулевой шингл."""
+    words = WORD_RE.findall(text.lower())
+    size = settings.DUPLICATES_SHINGLE
+    grams = {
+        ' '.join(words[start:start + size])
+        for start in range(max(len(words) - size + 1, 1))
+    }
+    return np.fromiter(
+        (zlib.crc32(gram.encode()) % PRIME for gram in grams),
+        dtype=np.uint64,
+        count=len(grams),
+    )
+
+
+def signatures(texts):
+    """MinHash-подписи пачки текстов одним векторным вычислением."""
+    parts = [shingles(text) for text in texts]
+    offsets = np.cumsum([0] + [len(part) for part in parts[:-1]])
+    a, b = _permutations()
+    hashed = (a * np.concatenate(parts) + b) % PRIME
+    return np.minimum.reduceat(hashed, offsets, axis=1).T.astype(np.uint32)
+
+
+def signature(text):
+    return signatures([text])[0]
+
+
+def buckets(sig):
+    rows = settings.DUPLICATES_ROWS
+    for band in range(settings.DUPLICATES_BANDS):
+        digest = hashlib.blake2b(
+            sig[band * rows:(band + 1) * rows].tobytes(), digest_size=8
+        ).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+
+def similarity(first, second):
+    return float(np.mean(first == second))
+
+
+def find_duplicate(sig, before=None):
+    """Самый похожий из известных постов (с pk меньше before).
+
+    Возвращает pk поста или None и похожесть.
+    """
+    query = Q()
+    for band, bucket in buckets(sig):
+        query |= Q(band=band, bucket=bucket)
+    candidates = SignatureBucket.objects.filter(query)
+    if before is not None:
+        candidates = candidates.filter(post_id__lt=before)
+    stored = PostSignature.objects.filter(
+        post__in=candidates.values('post_id')
+    ).values_list('post_id', 'data')
+    best, best_score = None, 0
+    for post_id, data in stored:
+        score = similarity(sig, np.frombuffer(data, dtype=np.uint32))
+        if score > best_score:
+            best, best_score = post_id, score
+    if best_score < settings.DUPLICATES_THRESHOLD:
+        return None, best_score
+    return best, best_score
+
+
+@transaction.atomic
+def store(post_id, sig):
+    PostSignature.objects.update_or_create(
+        post_id=post_id, defaults={'data': sig.tobytes()}
+    )
+    SignatureBucket.objects.filter(post_id=post_id).delete()
+    SignatureBucket.objects.bulk_create(
+        SignatureBucket(post_id=post_id, band=band, bucket=bucket)
+        for band, bucket in buckets(sig)
+    )
+
+
+def index(post, sig=None):
+    """Запоминает подпись поста и отмечает повтор более раннего."""
+    if sig is None:
+        sig = signature(post.text)
+    duplicate_of, _ = find_duplicate(sig, before=post.pk)
+    store(post.pk, sig)
+    if duplicate_of != post.duplicate_of_id:
+        Post.objects.filter(pk=post.pk).update(duplicate_of=duplicate_of)
+        post.duplicate_of_id = duplicate_of
+    return duplicate_of
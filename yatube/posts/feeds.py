@@ -0,0 +1,151 @@
+"""RSS и Atom ленты сайта, сообществ и авторов.
+
+Готовый XML хранится в кеше до следующего изменения постов (поколение
+FEEDS), описание каждого поста — отдельно в FEED_ITEM_KEY. Ключ
+описания содержит версии самого поста и его сообщества (в описании
+есть название сообщества), поэтому новое поколение лент переиспользует
+описания неизменившихся постов. ETag зависит только от поколения, и
+повторный опрос без изменений получает 304 без единого запроса к базе.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from core.cache import get_generation
+from .models import Group, Post, User
+
+FEEDS = 'feeds'
+FEED_KEY_TEMPLATE = 'feed.%s.%s'
+FEED_ITEM_KEY = 'feed_item.%s.%s.%s.%s'
+FEED_SIZE = 20
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def get_posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj=None):
+        return self.get_posts(obj).select_related(
+            'author', 'group'
+        ).defer('text')[:FEED_SIZE]
+
+    def item_title(self, item):
+        return item.excerpt[:50]
+
+    def item_description(self, item):
+        key = FEED_ITEM_KEY % (
+            item.pk,
+            item.render_version,
+            item.updated.timestamp(),
+            item.group.updated.timestamp() if item.group else '',
+        )
+        description = cache.get(key)
+        if description is None:
+            description = render_to_string(
+                'posts/includes/feed_item.html', {'post': item}
+            )
+            cache.set(key, description, settings.FEED_CACHE_TIMEOUT)
+        return description
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Все записи автора {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+class AtomFeedMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj=None):
+        return self._get_dynamic_attr('description', obj)
+
+
+class LatestPostsAtomFeed(AtomFeedMixin, LatestPostsFeed):
+    pass
+
+
+class GroupPostsAtomFeed(AtomFeedMixin, GroupPostsFeed):
+    pass
+
+
+class AuthorPostsAtomFeed(AtomFeedMixin, AuthorPostsFeed):
+    pass
+
+
+def _path_hash(request):
+    return hashlib.md5(request.path.encode()).hexdigest()
+
+
+def _etag(request, *args, **kwargs):
+    return f'{get_generation(FEEDS)}-{_path_hash(request)}'
+
+
+def cached_feed(feed):
+    """Оборачивает ленту кешем и условными GET-запросами."""
+    @condition(etag_func=_etag)
+    def view(request, *args, **kwargs):
+        key = FEED_KEY_TEMPLATE % (get_generation(FEEDS), _path_hash(request))
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = feed(request, *args, **kwargs)
+        cache.set(
+            key,
+            (response.content, response['Content-Type']),
+            settings.FEED_CACHE_TIMEOUT,
+        )
+        return response
+    return view
@@ -1,13 +1,78 @@
 from django import forms
+from django.conf import settings
+from django.utils import timezone
 
+from . import duplicates
 from .models import Post, Comment
 
 
 class PostForm(forms.ModelForm):
+    NOW = 'now'
+    DRAFT = 'draft'
+    LATER = 'later'
+    PUBLISH_CHOICES = (
+        (NOW, 'Опубликовать сразу'),
+        (DRAFT, 'Сохранить черновик'),
+        (LATER, 'Опубликовать в указанное время'),
+    )
+    publish = forms.ChoiceField(
+        label='Публикация',
+        choices=PUBLISH_CHOICES,
+        initial=NOW,
+        required=False,
+    )
 
     class Meta:
         model = Post
-        fields = ('group', 'text', 'image')
+        fields = ('group', 'text', 'image', 'publish_at')
+        widgets = {
+            'publish_at': forms.DateTimeInput(
+                attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'
+            ),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Формат поля datetime-local браузера.
+        self.fields['publish_at'].input_formats = ['%Y-%m-%dT%H:%M']
+        if self.instance.pk is None:
+            return
+        if self.instance.is_published:
+            # Опубликованный пост в черновики не возвращается.
+            del self.fields['publish']
+            del self.fields['publish_at']
+        else:
+            self.initial['publish'] = (
+                self.LATER if self.instance.publish_at else self.DRAFT
+            )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if 'publish' not in self.fields:
+            return cleaned_data
+        choice = cleaned_data.get('publish') or self.NOW
+        publish_at = cleaned_data.get('publish_at')
+        if choice != self.LATER:
+            cleaned_data['publish_at'] = None
+        elif publish_at is None:
+            self.add_error('publish_at', 'Укажите время публикации')
+        elif publish_at <= timezone.now():
+            self.add_error('publish_at', 'Это время уже прошло')
+        self.instance.is_published = choice == self.NOW
+        return cleaned_data
+
+    def clean_text(self):
+        text = self.cleaned_data['text']
+        if settings.DUPLICATES_ACTION == 'block':
+            duplicate_of, _ = duplicates.find_duplicate(
+                duplicates.signature(text), before=self.instance.pk
+            )
+            if duplicate_of is not None:
+                raise forms.ValidationError(
+                    'Почти такой же пост уже опубликован',
+                    code='duplicate',
+                )
+        return text
 
 
 class CommentForm(forms.ModelForm):
@@ -0,0 +1,102 @@
+"""Денормализованная статистика сообществ.
+
+Счётчики в Group меняются точечными UPDATE при добавлении поста в
+группу и при его удалении оттуда, без GROUP BY по всем постам.
+Каталог сообществ строится из этих полей и хранится в кеше уже
+отсортированным.
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Q
+
+from . import archive
+from .models import Group, Post
+
+DIRECTORY_KEY = 'group_directory'
+DIRECTORY_FIELDS = (
+    'title',
+    'slug',
+    'description',
+    'posts_count',
+    'authors_count',
+    'last_post_date',
+)
+
+
+def _author_has_other_posts(group_id, post):
+    return Post.objects.filter(
+        group_id=group_id, author_id=post.author_id
+    ).exclude(pk=post.pk).exists() or archive.ArchivedPosts(
+        group_id=group_id, author_id=post.author_id
+    ).exists()
+
+
+def post_added(group_id, post):
+    """Учитывает пост, попавший в группу group_id."""
+    changes = {'posts_count': F('posts_count') + 1}
+    if not _author_has_other_posts(group_id, post):
+        changes['authors_count'] = F('authors_count') + 1
+    Group.objects.filter(pk=group_id).update(**changes)
+    Group.objects.filter(
+        Q(last_post_date__lt=post.pub_date) | Q(last_post_date__isnull=True),
+        pk=group_id,
+    ).update(last_post_date=post.pub_date)
+    cache.delete(DIRECTORY_KEY)
+
+
+def post_removed(group_id, post):
+    """Убирает из статистики пост, который покинул группу group_id."""
+    changes = {'posts_count': F('posts_count') - 1}
+    if not _author_has_other_posts(group_id, post):
+        changes['authors_count'] = F('authors_count') - 1
+    Group.objects.filter(pk=group_id, posts_count__gt=0).update(**changes)
+    latest = Post.objects.filter(group_id=group_id).exclude(
+        pk=post.pk
+    ).values_list('pub_date', flat=True).first()
+    if latest is None:
+        latest = next((
+            archived.pub_date
+            for archived in archive.ArchivedPosts(group_id=group_id)[:1]
+        ), None)
+    Group.objects.filter(
+        pk=group_id, last_post_date=post.pub_date
+    ).update(last_post_date=latest)
+    cache.delete(DIRECTORY_KEY)
+
+
+def get_directory():
+    """Сообщества по убыванию активности, из кеша."""
+    directory = cache.get(DIRECTORY_KEY)
+    if directory is None:
+        directory = list(
+            Group.objects.order_by(
+                '-posts_count', '-last_post_date', 'title'
+            ).values(*DIRECTORY_FIELDS)
+        )
+        cache.set(DIRECTORY_KEY, directory, None)
+    return directory
+
+
+def recount(groups=None):
+    """Пересчитывает статистику с нуля, например после ручных правок."""
+    groups = Group.objects.all() if groups is None else groups
+    stats = archive.group_summary()
+    rows = Post.objects.filter(group__in=groups).order_by().values_list(
+        'group', 'author'
+    ).annotate(total=Count('id'), latest=Max('pub_date'))
+    for group_id, author_id, total, latest in rows:
+        posts, authors, last = stats.get(group_id, (0, set(), None))
+        authors.add(author_id)
+        stats[group_id] = (
+            posts + total, authors, max(last, latest) if last else latest
+        )
+    group_ids = set(groups.values_list('pk', flat=True))
+    groups.update(posts_count=0, authors_count=0, last_post_date=None)
+    for group_id, (posts, authors, latest) in stats.items():
+        if group_id not in group_ids:
+            continue
+        Group.objects.filter(pk=group_id).update(
+            posts_count=posts,
+            authors_count=len(authors),
+            last_post_date=latest,
+        )
+    cache.delete(DIRECTORY_KEY)
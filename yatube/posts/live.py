@@ -0,0 +1,98 @@
+"""Живые обновления лент через Server-Sent Events.
+
+post_create публикует событие в шину процесса, а открытые соединения
+/stream/ получают отрисованный фрагмент нового поста. Фрагмент
+рендерится один раз при публикации, а не для каждого слушателя.
+
+Шина не выходит за пределы процесса: посты, сохранённые другими
+процессами (воркеры, runscheduler, второй процесс сервера), в поток
+не попадают. Поэтому обновления включает SSE_ENABLED только там, где
+сайт работает одним процессом, и только для вошедших пользователей:
+каждое соединение держит поток сервера до SSE_MAX_SECONDS.
+"""
+import json
+import time
+from http import HTTPStatus
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+
+from core.pubsub import Broker, BrokerFull
+from .models import Follow
+
+broker = Broker(
+    max_subscribers=settings.SSE_MAX_CONNECTIONS,
+    queue_size=settings.SSE_QUEUE_SIZE,
+)
+
+
+def enabled(request):
+    return settings.SSE_ENABLED and request.user.is_authenticated
+
+
+def publish_post(post):
+    broker.publish({
+        'id': post.pk,
+        'author_id': post.author_id,
+        'html': render_to_string(
+            'posts/includes/post_live.html', {'post': post}
+        ),
+    })
+
+
+def format_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+def event_stream(subscription):
+    try:
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        deadline = time.monotonic() + settings.SSE_MAX_SECONDS
+        while time.monotonic() < deadline:
+            events, dropped = subscription.get(settings.SSE_HEARTBEAT)
+            if not events and not dropped:
+                yield ': ping\n\n'
+                continue
+            for event in events:
+                yield format_event('post', {
+                    'id': event['id'], 'html': event['html']
+                })
+            if dropped:
+                yield format_event('missed', {'count': dropped})
+    finally:
+        subscription.close()
+
+
+def stream(request):
+    """Поток новых постов; ?feed=follow — только избранные авторы"""
+    if not enabled(request):
+        # На 204 EventSource перестаёт переподключаться.
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+    accept = None
+    if request.GET.get('feed') == 'follow':
+        authors = set(
+            Follow.objects.filter(user=request.user).values_list(
+                'author_id', flat=True
+            )
+        )
+        accept = lambda event: event['author_id'] in authors  # noqa: E731
+    try:
+        subscription = broker.subscribe(accept)
+    except BrokerFull:
+        return HttpResponse(
+            'Слишком много подключений',
+            status=HTTPStatus.SERVICE_UNAVAILABLE,
+        )
+    # Соединение с базой потоку больше не нужно, а держать его
+    # на всё время подписки слишком дорого.
+    for connection in connections.all():
+        if not connection.in_atomic_block:
+            connection.close()
+    response = StreamingHttpResponse(
+        event_stream(subscription), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты с комментариями в архив'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help='Архивировать посты старше этого числа дней',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=settings.ARCHIVE_BATCH_SIZE,
+            help='Сколько постов переносить за одну транзакцию',
+        )
+
+    def handle(self, *args, **options):
+        total = archive.archive_older_than(options['days'], options['batch'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено в архив постов: {total}'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневные и месячные сводки авторов и сообществ'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=5000,
+            help='Сколько записей читать за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        total = rollups.backfill(options['chunk'])
+        self.stdout.write(self.style.SUCCESS(f'Учтено записей: {total}'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import tags
+
+
+class Command(BaseCommand):
+    help = 'Заново выделяет хештеги из текстов всех постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=1000,
+            help='Сколько постов читать за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        total = tags.backfill(options['chunk'])
+        self.stdout.write(self.style.SUCCESS(f'Просмотрено постов: {total}'))
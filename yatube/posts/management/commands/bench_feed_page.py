@@ -0,0 +1,85 @@
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import Context, Template
+from django.test import override_settings
+
+from posts.models import Post, PostBody, User
+from posts.views import NUMBER_OF_POSTS
+
+PARAGRAPH = 'Длинная глава, которую дописывают каждый день. ' * 20 + '\n'
+# Одинаковая разметка, различается только выводимый текст.
+FULL_PAGE = Template(
+    '{% for post in posts %}<p>{{ post.text }}</p>{% endfor %}'
+)
+EXCERPT_PAGE = Template(
+    '{% for post in posts %}<p>{{ post.excerpt }}</p>{% endfor %}'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает страницу ленты с полными текстами и с анонсами: '
+        'пик памяти, объём загруженного из базы текста и размер HTML'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--paragraphs',
+            type=int,
+            default=200,
+            help='Размер каждого поста в абзацах',
+        )
+
+    def handle(self, *args, **options):
+        text = PARAGRAPH * options['paragraphs']
+        self.stdout.write(f'Текст поста: {len(text.encode()) / 1024:.0f} КБ')
+        # Данные создаются во временной транзакции и откатываются.
+        with transaction.atomic():
+            with override_settings(POST_COMPRESS_THRESHOLD=len(text)):
+                self.fill('bench_full', text)
+            self.report('полный текст', self.measure(
+                Post.objects.filter(author__username='bench_full'),
+                FULL_PAGE,
+            ))
+            author = self.fill('bench_excerpt', text)
+            stored = sum(map(len, PostBody.objects.filter(
+                post__author=author
+            ).values_list('data', flat=True)))
+            self.stdout.write(
+                f'Сжатый текст в PostBody: '
+                f'{stored / NUMBER_OF_POSTS / 1024:.1f} КБ на пост'
+            )
+            self.report('анонс, defer(text)', self.measure(
+                Post.objects.filter(author=author).defer('text'),
+                EXCERPT_PAGE,
+            ))
+            transaction.set_rollback(True)
+
+    def fill(self, username, text):
+        author = User.objects.create_user(username=username)
+        for _ in range(NUMBER_OF_POSTS):
+            Post.objects.create(author=author, text=text)
+        return author
+
+    def measure(self, posts, template):
+        tracemalloc.start()
+        page = list(posts.select_related('author', 'group'))
+        html = template.render(Context({'posts': page}))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        loaded = sum(
+            len(post.__dict__.get('text', '').encode())
+            + len(post.excerpt.encode())
+            for post in page
+        )
+        return peak, loaded, len(html.encode())
+
+    def report(self, title, result):
+        peak, loaded, html = result
+        self.stdout.write(
+            f'{title}: пик памяти {peak / 1024:.0f} КБ, '
+            f'загружено текста {loaded / 1024:.0f} КБ, '
+            f'HTML {html / 1024:.0f} КБ'
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import related
+
+
+class Command(BaseCommand):
+    help = 'Строит TF-IDF индекс постов и заново считает похожие посты'
+
+    def handle(self, *args, **options):
+        count = related.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано постов: {count}')
+        )
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from posts import revisions
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Сливает старые версии постов в один снимок, '
+        'более новые версии не трогает'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Версии старше стольких дней сливаются',
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        posts = Post.objects.filter(
+            revisions__created__lt=before
+        ).annotate(old=Count('revisions')).filter(old__gt=1)
+        deleted = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            deleted += revisions.compact(post_id, before)
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено версий: {deleted}')
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from posts import duplicates
+from posts.models import Post, PostSignature, SignatureBucket
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает MinHash-подписи всех постов пачками и заново '
+        'отмечает дубликаты'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Посты обходятся по возрастанию pk, и каждый сравнивается
+        # только с уже проиндексированными, более ранними.
+        SignatureBucket.objects.all().delete()
+        PostSignature.objects.all().delete()
+        posts = Post.objects.only(
+            'pk', 'text', 'group', 'is_compressed', 'duplicate_of'
+        ).order_by('pk')
+        found = total = 0
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            signatures = duplicates.signatures(post.text for post in batch)
+            for post, sig in zip(batch, signatures):
+                if duplicates.index(post, sig) is not None:
+                    found += 1
+            total += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {total}, дубликатов: {found}'
+        ))
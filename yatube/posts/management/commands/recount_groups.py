@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import group_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику сообществ по всем постам'
+
+    def handle(self, *args, **options):
+        group_stats.recount()
+        self.stdout.write(self.style.SUCCESS('Статистика пересчитана'))
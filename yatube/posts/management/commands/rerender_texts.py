@@ -0,0 +1,53 @@
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+
+from posts import markup
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Перерисовывает HTML постов и комментариев, отрисованных '
+        'прошлой версией markup, в пуле процессов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перерисовать все тексты, а не только устаревшие',
+        )
+
+    def handle(self, *args, **options):
+        # Процессы пула только рисуют HTML и не трогают базу,
+        # сохраняет результаты этот процесс. Черновики и помеченные на
+        # удаление тексты тоже перерисовываются.
+        with Pool(options['processes']) as pool:
+            for model in (Post, Comment):
+                objects = model.all_objects.order_by('pk')
+                if not options['all']:
+                    objects = objects.exclude(
+                        render_version=markup.RENDER_VERSION
+                    )
+                done = self.rerender(
+                    pool, objects.defer('text_html'), options['batch_size']
+                )
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}: {done}'
+                )
+
+    def rerender(self, pool, objects, batch_size):
+        done = 0
+        last_pk = 0
+        while True:
+            batch = list(objects.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return done
+            texts = pool.map(markup.render, [obj.text for obj in batch])
+            for obj, html in zip(batch, texts):
+                obj.save_rendered(html)
+            done += len(batch)
+            last_pk = batch[-1].pk
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import publishing
+
+
+class Command(BaseCommand):
+    help = 'Публикует отложенные посты, когда наступает их время'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument(
+            '--max-sleep',
+            type=float,
+            default=30,
+            help='Наибольшая пауза в секундах: так замечаются новые '
+                 'отложенные посты',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Опубликовать наступившие посты и выйти',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        try:
+            while True:
+                published = publishing.publish_due(batch_size)
+                if published:
+                    self.stdout.write(f'Опубликовано постов: {published}')
+                if published == batch_size:
+                    continue
+                if options['once']:
+                    return
+                time.sleep(self.pause(options['max_sleep']))
+        except KeyboardInterrupt:
+            pass
+
+    def pause(self, max_sleep):
+        """Сон до ближайшей публикации, но не дольше max_sleep."""
+        moment = publishing.next_due()
+        if moment is None:
+            return max_sleep
+        return min(max(
+            (moment - timezone.now()).total_seconds(), 0
+        ), max_sleep)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+REQUEST = (
+    'GET {path} HTTP/1.1\r\n'
+    'Host: {host}\r\n'
+    'Accept: text/event-stream\r\n'
+    'Cookie: sessionid={session}\r\n'
+    '\r\n'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает тысячи простаивающих SSE-соединений к запущенному '
+        'серверу и считает, сколько из них удалось удержать'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8000)
+        parser.add_argument('--path', default='/stream/')
+        parser.add_argument('--connections', type=int, default=2000)
+        parser.add_argument(
+            '--session',
+            required=True,
+            help='sessionid вошедшего пользователя: гостям поток не отдаётся',
+        )
+        parser.add_argument(
+            '--hold',
+            type=float,
+            default=30,
+            help='Сколько секунд держать соединения открытыми',
+        )
+
+    def handle(self, *args, **options):
+        opened, failed, alive = asyncio.run(self.run(options))
+        self.stdout.write(
+            f'Открыто: {opened}, отказов: {failed}, '
+            f'живы после {options["hold"]} с: {alive}'
+        )
+
+    async def run(self, options):
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(self.connect(options) for _ in range(options['connections'])),
+            return_exceptions=True,
+        )
+        streams = [result for result in results if isinstance(result, tuple)]
+        self.stdout.write(
+            f'Подключение заняло {time.monotonic() - started:.1f} с'
+        )
+        await asyncio.sleep(options['hold'])
+        alive = 0
+        for reader, writer in streams:
+            if not reader.at_eof():
+                alive += 1
+            writer.close()
+        return len(streams), len(results) - len(streams), alive
+
+    async def connect(self, options):
+        reader, writer = await asyncio.open_connection(
+            options['host'], options['port']
+        )
+        writer.write(REQUEST.format(
+            path=options['path'],
+            host=options['host'],
+            session=options['session'],
+        ).encode())
+        await writer.drain()
+        status = await reader.readline()
+        if b' 200 ' not in status:
+            writer.close()
+            raise ConnectionError(status.decode().strip())
+        # Дочитываем заголовки и первое сообщение retry.
+        await reader.readuntil(b'\r\n\r\n')
+        await reader.readuntil(b'\n\n')
+        return reader, writer
@@ -0,0 +1,34 @@
+"""Markdown для постов и комментариев.
+
+Текст разбирается и очищается один раз при сохранении, готовый HTML
+хранится рядом с исходником. Если правила ниже меняются, нужно
+увеличить RENDER_VERSION: устаревший HTML перерисуется при первом
+показе или командой rerender_texts.
+"""
+from html import unescape
+
+import bleach
+import markdown
+from django.utils.html import strip_tags
+
+RENDER_VERSION = 1
+
+EXTENSIONS = ('fenced_code', 'nl2br', 'sane_lists')
+ALLOWED_TAGS = {
+    'a', 'blockquote', 'br', 'code', 'em', 'h3', 'h4', 'h5', 'hr', 'li',
+    'ol', 'p', 'pre', 'strong', 'ul',
+}
+ALLOWED_ATTRIBUTES = {'a': ['href', 'title']}
+
+
+def render(text):
+    """Markdown в безопасный HTML."""
+    html = markdown.markdown(text, extensions=EXTENSIONS)
+    html = bleach.clean(
+        html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True
+    )
+    return bleach.linkify(html)
+
+
+def to_plain(html):
+    return unescape(strip_tags(html)).strip()
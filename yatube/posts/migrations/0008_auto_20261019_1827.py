@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:27
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    stats = Post.objects.filter(
+        group__isnull=False
+    ).order_by().values('group').annotate(
+        posts_count=Count('id'),
+        authors_count=Count('author', distinct=True),
+        last_post_date=Max('pub_date'),
+    )
+    for row in stats:
+        Group.objects.filter(pk=row.pop('group')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_auto_20220409_1614'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='authors_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Авторов'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='last_post_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний пост'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Постов'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'author'], name='posts_post_group_i_4c1b9d_idx'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:43
+
+import zlib
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import Truncator
+import django.db.models.deletion
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostBody = apps.get_model('posts', 'PostBody')
+    for pk in list(Post.objects.values_list('pk', flat=True)):
+        text = Post.objects.values_list('text', flat=True).get(pk=pk)
+        changes = {
+            'excerpt': Truncator(text).chars(300),
+            'text_length': len(text),
+        }
+        if len(text) > settings.POST_COMPRESS_THRESHOLD:
+            PostBody.objects.create(
+                post_id=pk, data=zlib.compress(text.encode())
+            )
+            changes.update(text='', is_compressed=True)
+        Post.objects.filter(pk=pk).update(**changes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostBody',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='posts.Post')),
+                ('data', models.BinaryField(verbose_name='Сжатый текст')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300, verbose_name='Анонс'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_compressed',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Текст сжат'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_length',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Длина текста'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
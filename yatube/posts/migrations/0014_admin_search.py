@@ -0,0 +1,63 @@
+# Generated by Django 2.2.16 on 2026-10-19 18:51
+import zlib
+
+from django.db import migrations, models
+import posts.models
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    PostBody = apps.get_model('posts', 'PostBody')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE VIRTUAL TABLE posts_post_fts '
+            "USING fts5(text, tokenize='unicode61')"
+        )
+        for pk in list(Post.objects.values_list('pk', flat=True)):
+            post = Post.objects.only('text', 'is_compressed').get(pk=pk)
+            text = post.text
+            if post.is_compressed:
+                body = PostBody.objects.get(post_id=pk)
+                text = zlib.decompress(bytes(body.data)).decode()
+            cursor.execute(
+                'INSERT INTO posts_post_fts (rowid, text) VALUES (%s, %s)',
+                [pk, text],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_related_post'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='text_html',
+            field=posts.models.BodyTextField(blank=True, editable=False, verbose_name='HTML'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text',
+            field=posts.models.BodyTextField(),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text_html',
+            field=posts.models.BodyTextField(blank=True, editable=False, verbose_name='HTML'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date'], name='posts_post_pub_dat_471922_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-19 19:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_admin_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('author', 'Автор'), ('group', 'Сообщество')], max_length=6, verbose_name='Для кого')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Автор или сообщество')),
+                ('period', models.CharField(choices=[('day', 'День'), ('month', 'Месяц')], max_length=5, verbose_name='Период')),
+                ('day', models.DateField(verbose_name='Начало периода')),
+                ('posts', models.IntegerField(default=0, verbose_name='Постов')),
+                ('comments', models.IntegerField(default=0, verbose_name='Комментариев получено')),
+                ('followers', models.IntegerField(default=0, verbose_name='Новых подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Сводка',
+                'verbose_name_plural': 'Сводки',
+            },
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата подписки'),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='rollup',
+            constraint=models.UniqueConstraint(fields=('scope', 'object_id', 'period', 'day'), name='unique rollup'),
+        ),
+    ]
@@ -1,21 +1,141 @@
+import zlib
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from . import markup
 
 User = get_user_model()
 
+EXCERPT_LENGTH = 300
+# Поля сжатого поста, которые хранятся в PostBody.
+BODY_FIELDS = ('text', 'text_html')
+
+
+class VisibleManager(models.Manager):
+    """Объекты без пометки is_deleted.
+
+    Помеченные объекты по частям удаляет posts.purge; им и связям
+    (post.group, comment.post) доступен all_objects.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class PublishedManager(VisibleManager):
+    """Опубликованные посты без пометки is_deleted.
+
+    Черновики и отложенные посты видны только автору и админке
+    через all_objects.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_published=True)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    # Денормализованная статистика, её поддерживает posts.group_stats.
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    authors_count = models.PositiveIntegerField('Авторов', default=0)
+    last_post_date = models.DateTimeField(
+        'Последний пост',
+        blank=True,
+        null=True,
+    )
+    is_deleted = models.BooleanField('Удалено', default=False, editable=False)
+    # Версия сообщества в ключах кеша фрагментов (posts.feeds).
+    updated = models.DateTimeField('Изменено', auto_now=True)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
-    text = models.TextField()
+class BodyTextField(models.TextField):
+    """Текстовая колонка, пустая у сжатых постов: текст лежит в PostBody.
+
+    Значение в памяти не меняется, поэтому обработчики post_save видят
+    полный текст.
+    """
+
+    def pre_save(self, model_instance, add):
+        if getattr(model_instance, 'is_compressed', False):
+            return ''
+        return super().pre_save(model_instance, add)
+
+
+class RichTextModel(models.Model):
+    """Текст в Markdown и его HTML, отрисованный при сохранении."""
+    text_html = BodyTextField('HTML', blank=True, editable=False)
+    render_version = models.PositiveSmallIntegerField(
+        'Версия отрисовки',
+        default=0,
+        editable=False,
+    )
+
+    class Meta:
+        abstract = True
+
+    def render_text(self, kwargs):
+        """Отрисовывает text, если он будет сохранён.
+
+        kwargs — аргументы save(): поля HTML дописываются в update_fields.
+        """
+        update_fields = kwargs.get('update_fields')
+        if 'text' not in self.__dict__ or (
+            update_fields is not None and 'text' not in update_fields
+        ):
+            return False
+        self.text_html = markup.render(self.text)
+        self.render_version = markup.RENDER_VERSION
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                'text_html', 'render_version'
+            }
+        return True
+
+    def render_columns(self, html):
+        """Значения колонок, которые выводятся из HTML."""
+        return {'text_html': html, 'render_version': markup.RENDER_VERSION}
+
+    def save_rendered(self, html):
+        """Записывает новый HTML текста, который не менялся.
+
+        Пишет только колонки отрисовки через UPDATE, без save(): текст
+        прежний, и обработчикам post_save (сброс кешей, поиск, теги)
+        делать нечего. Запрос идёт в основную базу мимо роутера — это
+        не правка пользователя, и чтение с реплик не закрепляется.
+        """
+        columns = self.render_columns(html)
+        type(self)._base_manager.using(DEFAULT_DB_ALIAS).filter(
+            pk=self.pk
+        ).update(**columns)
+        self.__dict__.update(columns, text_html=html)
+
+    @property
+    def html(self):
+        if self.render_version != markup.RENDER_VERSION:
+            # HTML устарел: перерисовываем один раз и сохраняем.
+            if 'text' in self.get_deferred_fields():
+                self.refresh_from_db(fields=['text'])
+            self.save_rendered(markup.render(self.text))
+        return mark_safe(self.text_html)
+
+
+class Post(RichTextModel):
+    text = BodyTextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    # Версия поста в ключах кеша фрагментов (posts.feeds).
+    updated = models.DateTimeField('Изменён', auto_now=True)
     group = models.ForeignKey(Group,
                               related_name="posts",
                               blank=True,
@@ -32,15 +152,274 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Ленты показывают анонс и не загружают text (.defer('text')).
+    # Длинные тексты лежат сжатыми в PostBody, а колонка text пуста.
+    excerpt = models.CharField(
+        'Анонс',
+        max_length=EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+    )
+    text_length = models.PositiveIntegerField(
+        'Длина текста',
+        default=0,
+        editable=False,
+    )
+    is_compressed = models.BooleanField(
+        'Текст сжат',
+        default=False,
+        editable=False,
+    )
+    # Отметку ставит posts.duplicates.
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='duplicates',
+        verbose_name='Дубликат поста',
+    )
+    is_deleted = models.BooleanField('Удалено', default=False, editable=False)
+    # Черновик не опубликован и без publish_at. Отложенный пост
+    # публикует posts.publishing в publish_at и стирает это время.
+    is_published = models.BooleanField(
+        'Опубликован',
+        default=True,
+        editable=False,
+    )
+    publish_at = models.DateTimeField(
+        'Время публикации',
+        blank=True,
+        null=True,
+    )
+    # Посты, прочитанные из архива (posts.archive), только для чтения.
+    is_archived = False
+
+    objects = PublishedManager()
+    all_objects = models.Manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_group()
+        # Пустые колонки сжатого поста догрузятся из PostBody
+        # при первом обращении, как отложенные поля.
+        if instance.__dict__.get('text') == '' and instance.is_compressed:
+            for field in BODY_FIELDS:
+                instance.__dict__.pop(field, None)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        if fields is not None and set(fields) & set(BODY_FIELDS) and (
+            self.is_compressed
+        ):
+            body = PostBody.objects.using(
+                using or self._state.db
+            ).get(post=self)
+            for field in BODY_FIELDS:
+                if field in fields:
+                    setattr(self, field, getattr(body, field))
+            fields = [field for field in fields if field not in BODY_FIELDS]
+            if not fields:
+                return
+        super().refresh_from_db(using, fields)
+
+    def remember_group(self):
+        """Запоминает сообщество из базы, чтобы заметить перенос поста.
+
+        Отложенное (.defer('group')) сообщество не загружается.
+        """
+        if 'group_id' in self.__dict__:
+            self._loaded_group_id = self.group_id
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self._loaded_group_id = None
+        elif not hasattr(self, '_loaded_group_id') and (
+            'group_id' in self.__dict__
+        ):
+            # Отложенное сообщество назначили после загрузки.
+            self._loaded_group_id = Post.all_objects.filter(
+                pk=self.pk
+            ).values_list('group_id', flat=True).first()
+        if not self.render_text(kwargs):
+            return super().save(*args, **kwargs)
+        text, html = self.text, self.text_html
+        plain = markup.to_plain(html)
+        was_compressed = self.is_compressed
+        self.excerpt = Truncator(plain).chars(EXCERPT_LENGTH)
+        self.text_length = len(plain)
+        self.is_compressed = len(text) > settings.POST_COMPRESS_THRESHOLD
+        if 'update_fields' in kwargs:
+            kwargs['update_fields'] |= {
+                'excerpt', 'text_length', 'is_compressed'
+            }
+        super().save(*args, **kwargs)
+        if self.is_compressed:
+            PostBody.objects.update_or_create(post=self, defaults={
+                'data': PostBody.compress(text),
+                'html_data': PostBody.compress(html),
+            })
+        elif was_compressed:
+            PostBody.objects.filter(post=self).delete()
+
+    def render_columns(self, html):
+        plain = markup.to_plain(html)
+        columns = super().render_columns(html)
+        columns['excerpt'] = Truncator(plain).chars(EXCERPT_LENGTH)
+        columns['text_length'] = len(plain)
+        if self.is_compressed:
+            columns['text_html'] = ''
+        return columns
+
+    def save_rendered(self, html):
+        if self.is_compressed:
+            PostBody.objects.using(DEFAULT_DB_ALIAS).filter(
+                post_id=self.pk
+            ).update(html_data=PostBody.compress(html))
+        super().save_rendered(html)
+
+    @property
+    def is_truncated(self):
+        return self.text_length > len(self.excerpt)
 
     def __str__(self):
-        return self.text[:15]
+        return self.excerpt[:15]
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['group', 'author']),
+            models.Index(fields=['pub_date']),
+            models.Index(fields=['is_published', 'pub_date']),
+            # Очередь posts.publishing: только отложенные посты.
+            models.Index(
+                fields=['publish_at'],
+                name='posts_post_due',
+                condition=models.Q(publish_at__isnull=False),
+            ),
+            # Очередь posts.purge: только помеченные строки.
+            models.Index(
+                fields=['id'],
+                name='posts_post_deleted',
+                condition=models.Q(is_deleted=True),
+            ),
+        ]
+
+
+class PostBody(models.Model):
+    """Сжатые zlib полный текст длинного поста и его HTML."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='body',
+    )
+    data = models.BinaryField('Сжатый текст')
+    html_data = models.BinaryField('Сжатый HTML', default=b'')
+
+    @staticmethod
+    def compress(text):
+        return zlib.compress(text.encode())
+
+    @staticmethod
+    def decompress(data):
+        return zlib.decompress(bytes(data)).decode() if data else ''
+
+    @property
+    def text(self):
+        return self.decompress(self.data)
 
+    @property
+    def text_html(self):
+        return self.decompress(self.html_data)
+
+
+class PostSignature(models.Model):
+    """MinHash-подпись текста поста (массив uint32)."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+    )
+    data = models.BinaryField('Подпись')
+
+
+class SignatureBucket(models.Model):
+    """Корзина LSH: хеш одной полосы подписи поста."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='signature_buckets',
+    )
+    band = models.PositiveSmallIntegerField('Полоса')
+    bucket = models.BigIntegerField('Хеш полосы')
 
-class Comment(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'bucket']),
+        ]
+
+
+class RelatedPost(models.Model):
+    """Заранее посчитанный похожий пост, его строит posts.related."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_posts',
+    )
+    related = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField('Похожесть')
+    rank = models.PositiveSmallIntegerField('Место')
+
+    class Meta:
+        ordering = ['rank']
+        indexes = [
+            models.Index(fields=['post', 'rank']),
+        ]
+
+
+class Revision(models.Model):
+    """Версия текста поста: снимок целиком или дельта к предыдущей.
+
+    Данные сжаты zlib, собирает версии posts.revisions.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+        verbose_name='Пост',
+    )
+    number = models.PositiveIntegerField('Номер')
+    is_snapshot = models.BooleanField('Снимок', default=False)
+    data = models.BinaryField('Данные')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='revisions',
+        verbose_name='Автор правки',
+    )
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        ordering = ['number']
+        verbose_name = 'Версия поста'
+        verbose_name_plural = 'Версии постов'
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'number'],
+                                    name='unique post revision')
+        ]
+
+
+class Comment(RichTextModel):
     post = models.ForeignKey(Post,
                              related_name="comments",
                              on_delete=models.CASCADE,)
@@ -49,6 +428,23 @@ class Comment(models.Model):
                                on_delete=models.CASCADE,)
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    is_deleted = models.BooleanField('Удалено', default=False, editable=False)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='posts_comment_deleted',
+                condition=models.Q(is_deleted=True),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.render_text(kwargs)
+        super().save(*args, **kwargs)
 
 
 class Follow(models.Model):
@@ -68,6 +464,7 @@ class Follow(models.Model):
         null=True,
         verbose_name='Имя автора',
     )
+    created = models.DateTimeField('Дата подписки', auto_now_add=True)
 
     class Meta:
         verbose_name = 'Подписчик'
@@ -77,3 +474,92 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique appversion')
         ]
+
+
+class Rollup(models.Model):
+    """Счётчики автора или сообщества за день или месяц.
+
+    Строки поддерживает posts.rollups при записи постов, комментариев и
+    подписок; day — первый день периода.
+    """
+    AUTHOR = 'author'
+    GROUP = 'group'
+    SCOPES = ((AUTHOR, 'Автор'), (GROUP, 'Сообщество'))
+    DAY = 'day'
+    MONTH = 'month'
+    PERIODS = ((DAY, 'День'), (MONTH, 'Месяц'))
+
+    scope = models.CharField('Для кого', max_length=6, choices=SCOPES)
+    object_id = models.PositiveIntegerField('Автор или сообщество')
+    period = models.CharField('Период', max_length=5, choices=PERIODS)
+    day = models.DateField('Начало периода')
+    posts = models.IntegerField('Постов', default=0)
+    comments = models.IntegerField('Комментариев получено', default=0)
+    followers = models.IntegerField('Новых подписчиков', default=0)
+
+    class Meta:
+        verbose_name = 'Сводка'
+        verbose_name_plural = 'Сводки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'object_id', 'period', 'day'],
+                name='unique rollup',
+            )
+        ]
+
+
+class Tag(models.Model):
+    """Хештег; поддерживает posts.tags."""
+    name = models.CharField('Тег', max_length=50, unique=True)
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    """Тег поста; pub_date повторяет дату поста для ленты тега по индексу."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'tag'],
+                                    name='unique post tag')
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'pub_date', 'post']),
+        ]
+
+
+class TagTrend(models.Model):
+    """Сколько раз тег ставили в постах за час, начиная с hour."""
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='trends',
+    )
+    hour = models.DateTimeField('Час')
+    count = models.PositiveIntegerField('Постов', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'hour'],
+                                    name='unique tag hour')
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
@@ -0,0 +1,125 @@
+"""Черновики и отложенная публикация.
+
+Пост с is_published = False не виден лентам (Post.objects его не
+возвращает), а обработчики post_save учитывают его в сводках, счётчиках
+сообществ и тегах только в момент публикации; в поисковый индекс
+черновик попадает сразу, чтобы его находил поиск админки. Отложенный
+пост — неопубликованный пост с publish_at; их публикует команда
+runscheduler: publish_due() выбирает наступившие по частичному индексу
+posts_post_due, а next_due() говорит, сколько спать до следующего, без
+обхода таблицы.
+
+post_published() — общее для всех путей публикации: медленная работа
+воркеру, уведомления подписчикам и живые обновления лент.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.tasks import posts_published
+from tasks.queue import enqueue
+from . import live
+from .models import Post
+from .tasks import update_related, warm_thumbnails
+
+
+def schedule_side_effects(post):
+    """Отдаёт медленную работу после сохранения поста воркеру."""
+    if post.image:
+        enqueue(
+            warm_thumbnails,
+            post.pk,
+            idempotency_key=f'thumbnails:{post.pk}:{post.image.name}',
+        )
+    enqueue(update_related, post.pk)
+
+
+def post_published(post):
+    schedule_side_effects(post)
+    enqueue(posts_published, post.pk)
+    # Из процесса планировщика событие слушателям /stream/ не доходит:
+    # они увидят пост при обновлении ленты.
+    live.publish_post(post)
+
+
+def became_published(post, created):
+    """Становится ли пост видимым этим сохранением."""
+    return post.is_published and (
+        created or getattr(post, '_publishing', False)
+    )
+
+
+def publish(post):
+    """Сохраняет черновик или отложенный пост опубликованным сейчас.
+
+    post_published() вызывающий запускает после фиксации транзакции.
+    """
+    post.is_published = True
+    post.pub_date = timezone.now()
+    post.publish_at = None
+    post._publishing = True
+    try:
+        post.save()
+    finally:
+        del post._publishing
+
+
+def save_unpublished(post):
+    """Сохраняет правку поста, не опубликованного при загрузке формы.
+
+    Пока автор правил, пост мог опубликовать планировщик. Тогда правка
+    ложится на опубликованный пост и не снимает публикацию: сводки,
+    счётчики и уведомления его уже учли. Проверка и запись идут в одной
+    транзакции (BEGIN IMMEDIATE). Возвращает True, если пост был
+    опубликован до этой правки.
+    """
+    with transaction.atomic():
+        pub_date = Post.all_objects.filter(
+            pk=post.pk, is_published=True
+        ).values_list('pub_date', flat=True).first()
+        if pub_date is not None:
+            post.is_published = True
+            post.publish_at = None
+            post.pub_date = pub_date
+            post.save()
+            return True
+        if not post.is_published:
+            post.save()
+            return False
+        publish(post)
+    post_published(post)
+    return False
+
+
+def due(now=None):
+    # Без условия на is_published: publish_at есть только у отложенных
+    # постов, и SQLite выбирает частичный индекс posts_post_due.
+    return Post.all_objects.filter(
+        publish_at__lte=now or timezone.now(), is_deleted=False
+    ).order_by('publish_at', 'pk')
+
+
+def publish_due(limit):
+    """Публикует до limit отложенных постов, время которых наступило.
+
+    Каждый пост публикуется в своей короткой транзакции (BEGIN
+    IMMEDIATE) и в ней перечитывается: два планировщика не опубликуют
+    его дважды, а база заблокирована на запись только на одно
+    сохранение. Задачи и уведомления ставятся уже после фиксации.
+    """
+    published = 0
+    for post_id in list(due()[:limit].values_list('pk', flat=True)):
+        with transaction.atomic():
+            post = due().filter(pk=post_id).first()
+            if post is not None:
+                publish(post)
+        if post is not None:
+            post_published(post)
+            published += 1
+    return published
+
+
+def next_due():
+    """Время ближайшей отложенной публикации или None."""
+    return Post.all_objects.filter(
+        publish_at__isnull=False, is_deleted=False
+    ).order_by('publish_at').values_list('publish_at', flat=True).first()
@@ -0,0 +1,214 @@
+"""Удаление пользователей, постов и сообществ частями.
+
+Каскадное delete() удаляет всё связанное в одной транзакции и сначала
+загружает это в память, а SQLite всё это время заблокирован на запись.
+Поэтому delete_* только помечают объекты is_deleted (их сразу скрывает
+VisibleManager) и ставят задачу, а задачи удаляют помеченное порциями по
+PURGE_CHUNK_SIZE, каждую в своей транзакции. После каждой порции
+удаляются картинки с миниатюрами, поправляются сводки и счётчики
+сообществ; кеш страниц сбрасывают обычные обработчики post_delete.
+"""
+import contextlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from sorl.thumbnail import delete as delete_image
+
+from core.cache import bump_generation
+from core.middleware.page_cache import GENERATION as PAGES
+from notifications.models import Notification
+from tasks.queue import enqueue, task
+from . import archive, group_stats, rollups
+from .feeds import FEEDS
+from .models import (
+    Comment, Follow, Group, Post, RelatedPost, Revision, Rollup, User
+)
+
+_local = threading.local()
+
+
+def is_purging():
+    """Удаляет ли этот поток порцию: счётчики тогда правятся разом."""
+    return getattr(_local, 'purging', False)
+
+
+@contextlib.contextmanager
+def purging():
+    _local.purging = True
+    try:
+        yield
+    finally:
+        _local.purging = False
+
+
+def _hidden():
+    bump_generation(PAGES)
+    bump_generation(FEEDS)
+
+
+def delete_posts(posts):
+    """Скрывает посты (QuerySet) сразу и удаляет их в фоне."""
+    posts.update(is_deleted=True)
+    _hidden()
+    enqueue(purge_deleted)
+
+
+def delete_comments(comments):
+    comments.update(is_deleted=True)
+    _hidden()
+    enqueue(purge_deleted)
+
+
+def delete_group(group):
+    Group.all_objects.filter(pk=group.pk).update(is_deleted=True)
+    cache.delete(group_stats.DIRECTORY_KEY)
+    _hidden()
+    enqueue(purge_group, group.pk)
+
+
+def delete_groups(groups):
+    for group in groups:
+        delete_group(group)
+
+
+def delete_user(user):
+    """Блокирует пользователя и скрывает его посты и комментарии."""
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+    Post.all_objects.filter(author=user).update(is_deleted=True)
+    Comment.all_objects.filter(author=user).update(is_deleted=True)
+    archive.forget_author(user.pk)
+    _hidden()
+    enqueue(purge_user, user.pk)
+
+
+def delete_users(users):
+    for user in users:
+        delete_user(user)
+
+
+def _comment_deltas(comments):
+    """Вычитаемое из сводок для строк (created, автор поста, сообщество)."""
+    deltas = {}
+    for created, author_id, group_id in comments:
+        for key in rollups.keys_for(created, author_id, group_id):
+            deltas.setdefault(key, Counter())['comments'] -= 1
+    return deltas
+
+
+def _purge_posts(post_ids):
+    # Чтение и удаление в одной транзакции (BEGIN IMMEDIATE): две
+    # задачи не вычтут одну порцию из сводок дважды.
+    with purging(), transaction.atomic():
+        posts = list(Post.all_objects.filter(pk__in=post_ids).only(
+            'pk', 'author', 'group', 'pub_date', 'image', 'is_published'
+        ))
+        # Комментарии, оставленные после _purge_dependents, удаляются
+        # каскадом вместе с постами.
+        deltas = _comment_deltas(Comment.all_objects.filter(
+            post_id__in=post_ids
+        ).values_list('created', 'post__author_id', 'post__group_id'))
+        for post in posts:
+            if not post.is_published:
+                # Черновики в сводки не попадали.
+                continue
+            for key in rollups.keys_for(
+                post.pub_date, post.author_id, post.group_id
+            ):
+                deltas.setdefault(key, Counter())['posts'] -= 1
+        Post.all_objects.filter(pk__in=post_ids).delete()
+        rollups.apply(deltas)
+    for post in posts:
+        if post.image:
+            delete_image(post.image)
+    return {post.group_id for post in posts if post.group_id is not None}
+
+
+def _purge_comments(comment_ids):
+    with purging(), transaction.atomic():
+        deltas = _comment_deltas(Comment.all_objects.filter(
+            pk__in=comment_ids
+        ).values_list('created', 'post__author_id', 'post__group_id'))
+        Comment.all_objects.filter(pk__in=comment_ids).delete()
+        rollups.apply(deltas)
+
+
+def _chunks(queryset):
+    """Порции pk из queryset, пока он не опустеет."""
+    size = settings.PURGE_CHUNK_SIZE
+    while True:
+        ids = list(
+            queryset.order_by('pk').values_list('pk', flat=True)[:size]
+        )
+        if not ids:
+            return
+        yield ids
+
+
+def _purge_dependents(post_ids):
+    """Многочисленные связанные строки постов — своими порциями.
+
+    Иначе каскад в _purge_posts удалил бы, например, длинное обсуждение
+    одного поста одной транзакцией.
+    """
+    for ids in _chunks(Comment.all_objects.filter(post_id__in=post_ids)):
+        _purge_comments(ids)
+    for queryset in (
+        Revision.objects.filter(post_id__in=post_ids),
+        Notification.objects.filter(post_id__in=post_ids),
+        RelatedPost.objects.filter(related_id__in=post_ids),
+    ):
+        for ids in _chunks(queryset):
+            queryset.model.objects.filter(pk__in=ids).delete()
+
+
+def _purge(posts, comments):
+    for ids in _chunks(posts):
+        _purge_dependents(ids)
+        groups = _purge_posts(ids)
+        if groups:
+            group_stats.recount(Group.all_objects.filter(pk__in=groups))
+    for ids in _chunks(comments):
+        _purge_comments(ids)
+
+
+@task()
+def purge_deleted():
+    """Удаляет все помеченные посты и комментарии."""
+    _purge(
+        posts=Post.all_objects.filter(is_deleted=True),
+        comments=Comment.all_objects.filter(is_deleted=True),
+    )
+
+
+@task()
+def purge_user(user_id):
+    user = User.objects.filter(pk=user_id, is_active=False).first()
+    if user is None:
+        return
+    _purge(
+        posts=Post.all_objects.filter(author_id=user_id),
+        comments=Comment.all_objects.filter(author_id=user_id),
+    )
+    for ids in _chunks(Follow.objects.filter(user_id=user_id)):
+        Follow.objects.filter(pk__in=ids).delete()
+    for ids in _chunks(Follow.objects.filter(author_id=user_id)):
+        Follow.objects.filter(pk__in=ids).delete()
+    user.delete()
+    Rollup.objects.filter(scope=Rollup.AUTHOR, object_id=user_id).delete()
+
+
+@task()
+def purge_group(group_id):
+    """Отвязывает посты от сообщества порциями и удаляет его."""
+    if not Group.all_objects.filter(pk=group_id, is_deleted=True).exists():
+        return
+    posts = Post.all_objects.filter(group_id=group_id)
+    for ids in _chunks(posts):
+        Post.all_objects.filter(pk__in=ids).update(group=None)
+    Group.all_objects.filter(pk=group_id).delete()
+    Rollup.objects.filter(scope=Rollup.GROUP, object_id=group_id).delete()
+    _hidden()
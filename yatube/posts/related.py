@@ -0,0 +1,319 @@
+"""Похожие посты для боковой колонки post_detail.
+
+Команда build_related строит TF-IDF матрицу по текстам постов и их
+сообществам и ищет соседей приближённо, через LSH: знаки случайных
+проекций вектора делятся на RELATED_BANDS полос по RELATED_ROWS бит,
+каждая полоса — корзина. Кандидаты в соседи — посты из общих корзин
+(сначала совпавшие в большем числе полос), только они уточняются
+точным косинусом, и по RELATED_TOP_K лучших сохраняются в RelatedPost.
+Матрица, словарь и корзины остаются в RELATED_INDEX_PATH: соседей
+нового поста задача update_related ищет по тем же корзинам, не
+перестраивая всё. Страница поста читает готовый список одним запросом
+по индексу.
+"""
+import os
+import re
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import Post, RelatedPost
+
+WORD_RE = re.compile(r'\w{3,}')
+SEED = 20261019
+# Во сколько раз больше кандидатов берётся из корзин для уточнения.
+CANDIDATES_FACTOR = 10
+_loaded = {}
+
+
+def tokens(post):
+    words = WORD_RE.findall(post.text.lower())
+    if post.group_id is not None:
+        words.append(f'#group{post.group_id}')
+    return words
+
+
+def _normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def _count_matrix(documents, vocabulary):
+    rows, cols = [], []
+    for row, words in enumerate(documents):
+        for word in words:
+            col = vocabulary.get(word)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(documents), len(vocabulary)),
+    )
+    counts.sum_duplicates()
+    counts.data = 1 + np.log(counts.data)
+    return counts
+
+
+class Index:
+    """TF-IDF векторы постов post_ids, словарь и корзины LSH."""
+
+    def __init__(self, post_ids, words, idf, matrix, buckets=None):
+        self.post_ids = post_ids
+        self.words = words
+        self.idf = idf
+        self.matrix = matrix
+        # Корзины строк: по столбцу на полосу.
+        self.buckets = buckets
+        self.vocabulary = {word: col for col, word in enumerate(words)}
+        self._projection = None
+        self._tables = None
+
+    @classmethod
+    def build(cls, posts):
+        post_ids, documents = [], []
+        for post in posts:
+            post_ids.append(post.pk)
+            documents.append(tokens(post))
+        frequency = {}
+        for words in documents:
+            for word in set(words):
+                frequency[word] = frequency.get(word, 0) + 1
+        words = sorted(
+            word for word, count in frequency.items()
+            if count >= settings.RELATED_MIN_DF
+        )
+        df = np.array([frequency[word] for word in words], dtype=np.float32)
+        idf = np.log((1 + len(documents)) / (1 + df)) + 1
+        index = cls(np.array(post_ids), np.array(words), idf, None)
+        index.matrix = index.vectorize(documents)
+        index.buckets = index.hash(index.matrix)
+        return index
+
+    def vectorize(self, documents):
+        counts = _count_matrix(documents, self.vocabulary)
+        return _normalize(counts @ sparse.diags(self.idf)).tocsr()
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            post_ids=self.post_ids,
+            words=self.words,
+            idf=self.idf,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+            buckets=self.buckets,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as stored:
+            matrix = sparse.csr_matrix(
+                (stored['data'], stored['indices'], stored['indptr']),
+                shape=tuple(stored['shape']),
+            )
+            index = cls(
+                stored['post_ids'], stored['words'], stored['idf'], matrix
+            )
+            if 'buckets' in stored.files:
+                index.buckets = stored['buckets']
+            else:
+                # Индекс собран до LSH: корзины считаются при загрузке.
+                index.buckets = index.hash(matrix)
+            return index
+
+    def projection(self):
+        """Случайные ±1 проекции, одинаковые для одного словаря."""
+        if self._projection is None:
+            rng = np.random.RandomState(SEED)
+            size = settings.RELATED_BANDS * settings.RELATED_ROWS
+            self._projection = sparse.random(
+                self.matrix.shape[1],
+                size,
+                density=min(1.0, 3 / np.sqrt(size)),
+                random_state=rng,
+                data_rvs=lambda count: rng.choice([-1.0, 1.0], count),
+                format='csr',
+            )
+        return self._projection
+
+    def hash(self, matrix):
+        """Корзины векторов: номер корзины в каждой полосе по знакам."""
+        rows = settings.RELATED_ROWS
+        weights = 1 << np.arange(rows, dtype=np.int64)
+        buckets = []
+        # Плотная проекция считается кусками, чтобы не держать её целиком.
+        for start in range(0, matrix.shape[0], settings.RELATED_BLOCK_SIZE):
+            block = matrix[start:start + settings.RELATED_BLOCK_SIZE]
+            signs = (block @ self.projection()).toarray() > 0
+            buckets.append(
+                signs.reshape(len(signs), -1, rows).astype(np.int64) @ weights
+            )
+        if not buckets:
+            return np.zeros((0, settings.RELATED_BANDS), dtype=np.int64)
+        return np.concatenate(buckets)
+
+    def tables(self):
+        """По полосе: строки, отсортированные по корзине, и границы корзин."""
+        if self._tables is None:
+            self._tables = []
+            for keys in self.buckets.T:
+                order = np.argsort(keys, kind='stable')
+                keys, starts, counts = np.unique(
+                    keys[order], return_index=True, return_counts=True
+                )
+                self._tables.append((order, keys, starts, counts))
+        return self._tables
+
+    def candidates(self, buckets, limit, exclude=None):
+        """До limit строк из общих с buckets корзин.
+
+        Первыми идут строки, совпавшие в большем числе полос. Корзины
+        больше RELATED_MAX_BUCKET (например, у постов без значимых слов)
+        ничего не говорят о похожести и пропускаются.
+        """
+        found = []
+        for bucket, (order, keys, starts, counts) in zip(
+            buckets, self.tables()
+        ):
+            position = np.searchsorted(keys, bucket)
+            if position == len(keys) or keys[position] != bucket:
+                continue
+            if counts[position] <= settings.RELATED_MAX_BUCKET:
+                start = starts[position]
+                found.append(order[start:start + counts[position]])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        rows, hits = np.unique(np.concatenate(found), return_counts=True)
+        if exclude is not None:
+            keep = rows != exclude
+            rows, hits = rows[keep], hits[keep]
+        if len(rows) > limit:
+            rows = rows[np.argpartition(-hits, limit - 1)[:limit]]
+        return rows
+
+    def neighbours(self, top_k):
+        """Соседи всех постов: тройки (строка, столбцы, оценки) по строкам."""
+        limit = top_k * CANDIDATES_FACTOR
+        for row, buckets in enumerate(self.buckets):
+            columns = self.candidates(buckets, limit, exclude=row)
+            if not len(columns):
+                continue
+            exact = (
+                self.matrix[columns] @ self.matrix[row].T
+            ).toarray().ravel()
+            yield row, *_top(columns, exact, top_k)
+
+
+def _top(columns, scores, top_k):
+    order = np.argsort(-scores)[:top_k]
+    keep = scores[order] > 0
+    return columns[order][keep], scores[order][keep]
+
+
+def load_index():
+    """Индекс из RELATED_INDEX_PATH, перечитывается при изменении файла."""
+    path = settings.RELATED_INDEX_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _loaded.get('key') != (path, mtime):
+        _loaded.update(key=(path, mtime), index=Index.load(path))
+    return _loaded['index']
+
+
+def rebuild():
+    """Строит индекс по всем постам и заново заполняет RelatedPost."""
+    top_k = settings.RELATED_TOP_K
+    posts = Post.objects.only(
+        'pk', 'text', 'group', 'is_compressed'
+    ).order_by('pk')
+    index = Index.build(posts.iterator())
+    index.save(settings.RELATED_INDEX_PATH)
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        batch = []
+        for row, columns, scores in index.neighbours(top_k):
+            batch.extend(
+                RelatedPost(
+                    post_id=index.post_ids[row],
+                    related_id=index.post_ids[column],
+                    score=score,
+                    rank=rank,
+                )
+                for rank, (column, score) in enumerate(zip(columns, scores))
+            )
+            if len(batch) >= 1000:
+                RelatedPost.objects.bulk_create(batch)
+                batch = []
+        RelatedPost.objects.bulk_create(batch)
+    return len(index.post_ids)
+
+
+def _replace(post_id, pairs):
+    RelatedPost.objects.filter(post_id=post_id).delete()
+    RelatedPost.objects.bulk_create(
+        RelatedPost(post_id=post_id, related_id=related_id, score=score,
+                    rank=rank)
+        for rank, (related_id, score) in enumerate(pairs)
+    )
+
+
+@transaction.atomic
+def update(post):
+    """Соседи нового или изменённого поста без перестройки индекса.
+
+    Пост сравнивается с кандидатами из его корзин индекса и с
+    последними RELATED_RECENT_LIMIT постами, появившимися после сборки
+    индекса (более ранние из них ждут build_related); он же попадает в
+    списки соседей, если оказывается ближе их худшего соседа.
+    """
+    index = load_index()
+    if index is None:
+        return
+    top_k = settings.RELATED_TOP_K
+    vector = index.vectorize([tokens(post)])
+    columns = index.candidates(
+        index.hash(vector)[0], top_k * CANDIDATES_FACTOR
+    )
+    scores = (index.matrix[columns] @ vector.T).toarray().ravel()
+    post_ids = index.post_ids[columns]
+    recent = list(Post.objects.filter(
+        pk__gt=index.post_ids.max() if len(index.post_ids) else 0
+    ).exclude(pk=post.pk).order_by('-pk').only(
+        'pk', 'text', 'group', 'is_compressed'
+    )[:settings.RELATED_RECENT_LIMIT])
+    if recent:
+        scores = np.concatenate([scores, (
+            index.vectorize([tokens(other) for other in recent]) @ vector.T
+        ).toarray().ravel()])
+        post_ids = np.concatenate([post_ids, [other.pk for other in recent]])
+    scores[post_ids == post.pk] = 0
+    columns, best = _top(
+        np.arange(len(post_ids)), scores, top_k * CANDIDATES_FACTOR
+    )
+    candidates = [int(post_ids[column]) for column in columns]
+    # Индекс мог устареть: удалённые с его сборки посты пропускаются.
+    alive = set(Post.objects.filter(pk__in=candidates).values_list(
+        'pk', flat=True
+    ))
+    pairs = [
+        (related_id, float(score))
+        for related_id, score in zip(candidates, best)
+        if related_id in alive
+    ][:top_k]
+    _replace(post.pk, pairs)
+    for related_id, score in pairs:
+        current = list(RelatedPost.objects.filter(
+            post_id=related_id
+        ).exclude(related_id=post.pk).values_list('related_id', 'score'))
+        if len(current) < top_k or current[-1][1] < score:
+            current.append((post.pk, score))
+            current.sort(key=lambda pair: -pair[1])
+            _replace(related_id, current[:top_k])
@@ -0,0 +1,130 @@
+"""История правок постов.
+
+Каждая правка хранится как построчная дельта к предыдущей версии,
+сжатая zlib. Раз в REVISION_SNAPSHOT_EVERY версий (или когда дельта
+не меньше самого текста) сохраняется полный снимок, поэтому для сборки
+любой версии нужен один снимок и ограниченное число дельт.
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Revision
+
+
+def _pack(value):
+    return zlib.compress(value.encode())
+
+
+def _unpack(data):
+    return zlib.decompress(bytes(data)).decode()
+
+
+def make_delta(old, new):
+    """Дельта из ссылок на строки old ([начало, конец]) и новых вставок."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    delta = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j1 != j2:
+            delta.append(''.join(new_lines[j1:j2]))
+    return json.dumps(delta, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(old, delta):
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for item in json.loads(delta):
+        if isinstance(item, str):
+            parts.append(item)
+        else:
+            parts.extend(old_lines[item[0]:item[1]])
+    return ''.join(parts)
+
+
+def _build(chain):
+    """Собирает текст последней версии цепочки, начинающейся снимком."""
+    text = _unpack(chain[0].data)
+    for revision in chain[1:]:
+        text = apply_delta(text, _unpack(revision.data))
+    return text
+
+
+def _chain(post, number=None):
+    revisions = Revision.objects.filter(post=post)
+    if number is not None:
+        revisions = revisions.filter(number__lte=number)
+    snapshot = revisions.filter(is_snapshot=True).order_by('-number').first()
+    if snapshot is None:
+        return []
+    return list(revisions.filter(number__gte=snapshot.number))
+
+
+def get_text(post, number=None):
+    """Текст версии number (по умолчанию последней) или None."""
+    chain = _chain(post, number)
+    if not chain or (number is not None and chain[-1].number != number):
+        return None
+    return _build(chain)
+
+
+def _append(post, text, author, chain, base):
+    """Добавляет версию text после цепочки chain с текстом base."""
+    number = chain[-1].number + 1 if chain else 1
+    revision = Revision(post=post, number=number, author=author)
+    snapshot = _pack(text)
+    if chain and len(chain) < settings.REVISION_SNAPSHOT_EVERY:
+        delta = _pack(make_delta(base, text))
+        if len(delta) < len(snapshot):
+            revision.data = delta
+    if not revision.data:
+        revision.is_snapshot = True
+        revision.data = snapshot
+    revision.save()
+    return revision
+
+
+@transaction.atomic
+def record(post, author=None, previous=None):
+    """Сохраняет текущий текст поста новой версией.
+
+    previous — текст до правки: если он не совпадает с последней
+    сохранённой версией (поста не было в истории или его правили в
+    обход неё), он сначала записывается отдельной версией.
+    """
+    chain = _chain(post)
+    last = _build(chain) if chain else None
+    if previous is not None and previous != last:
+        chain.append(_append(post, previous, None, chain, last))
+        if chain[-1].is_snapshot:
+            chain = chain[-1:]
+        last = previous
+    if post.text == last:
+        return None
+    return _append(post, post.text, author, chain, last)
+
+
+@transaction.atomic
+def compact(post, before):
+    """Сливает версии поста (объект или pk) старше before в один снимок.
+
+    Возвращает число удалённых версий.
+    """
+    old = list(Revision.objects.filter(post=post, created__lt=before))
+    if len(old) < 2:
+        return 0
+    keep = old[-1]
+    if not keep.is_snapshot:
+        keep.data = _pack(get_text(post, keep.number))
+        keep.is_snapshot = True
+        keep.save(update_fields=['data', 'is_snapshot'])
+    deleted, _ = Revision.objects.filter(
+        post=post, number__lt=keep.number
+    ).delete()
+    return deleted
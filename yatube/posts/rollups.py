@@ -0,0 +1,206 @@
+"""Дневные и месячные сводки авторов и сообществ.
+
+Rollup хранит на каждый день и месяц число постов, полученных
+комментариев и новых подписчиков. Строки меняются точечными UPDATE при
+записи поста, комментария или подписки, так что панель статистики
+читает готовые ряды по уникальному индексу, без GROUP BY. Удалённый
+пост, комментарий или подписка вычитаются из того дня, когда были
+созданы: сводка всегда совпадает с пересчётом командой backfill_rollups.
+"""
+import datetime
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import archive
+from .models import Comment, Follow, Post, Rollup
+
+FIELDS = ('posts', 'comments', 'followers')
+# Порядок владельцев в строках, которые читает backfill.
+SCOPES = (Rollup.AUTHOR, Rollup.GROUP)
+
+
+def period_start(day, period):
+    return day.replace(day=1) if period == Rollup.MONTH else day
+
+
+def shift(day, period, count):
+    """Начало периода, отстоящего от day на count периодов."""
+    if period == Rollup.DAY:
+        return day + datetime.timedelta(days=count)
+    month = day.year * 12 + day.month - 1 + count
+    return datetime.date(month // 12, month % 12 + 1, 1)
+
+
+def _keys(scope, object_id, moment):
+    day = timezone.localdate(moment)
+    for period, _ in Rollup.PERIODS:
+        yield scope, object_id, period, period_start(day, period)
+
+
+def apply(deltas):
+    """Прибавляет счётчики: {(scope, object_id, period, day): Counter}."""
+    for (scope, object_id, period, day), counts in deltas.items():
+        key = {
+            'scope': scope,
+            'object_id': object_id,
+            'period': period,
+            'day': day,
+        }
+        changes = {
+            field: F(field) + delta for field, delta in counts.items()
+        }
+        if Rollup.objects.filter(**key).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                Rollup.objects.create(**key, **counts)
+        except IntegrityError:
+            # Строку успел создать параллельный запрос.
+            Rollup.objects.filter(**key).update(**changes)
+
+
+def _change(targets, moment, field, delta):
+    deltas = {}
+    for scope, object_id in targets:
+        if object_id is not None:
+            for key in _keys(scope, object_id, moment):
+                deltas[key] = Counter({field: delta})
+    apply(deltas)
+
+
+def post_added(post, delta=1):
+    _change(
+        [(Rollup.AUTHOR, post.author_id), (Rollup.GROUP, post.group_id)],
+        post.pub_date,
+        'posts',
+        delta,
+    )
+
+
+def post_removed(post):
+    post_added(post, -1)
+
+
+def post_moved(post, old_group_id):
+    """Переносит пост в сводках из сообщества old_group_id в текущее."""
+    _change([(Rollup.GROUP, old_group_id)], post.pub_date, 'posts', -1)
+    _change([(Rollup.GROUP, post.group_id)], post.pub_date, 'posts', 1)
+
+
+def comment_added(comment, delta=1):
+    owner = Post.objects.filter(pk=comment.post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if owner is None:
+        return
+    author_id, group_id = owner
+    _change(
+        [(Rollup.AUTHOR, author_id), (Rollup.GROUP, group_id)],
+        comment.created,
+        'comments',
+        delta,
+    )
+
+
+def comment_removed(comment):
+    comment_added(comment, -1)
+
+
+def follow_added(follow, delta=1):
+    _change(
+        [(Rollup.AUTHOR, follow.author_id)], follow.created, 'followers', delta
+    )
+
+
+def follow_removed(follow):
+    follow_added(follow, -1)
+
+
+def keys_for(moment, author_id, group_id=None):
+    """Ключи сводок автора и сообщества (если оно есть) на момент moment."""
+    for scope, object_id in zip(SCOPES, (author_id, group_id)):
+        if object_id is not None:
+            yield from _keys(scope, object_id, moment)
+
+
+def _add_row(deltas, moment, owners, field):
+    for key in keys_for(moment, *owners):
+        deltas.setdefault(key, Counter())[field] += 1
+
+
+def _chunks(queryset, fields, size):
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk').values_list(
+            'pk', *fields
+        )[:size])
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield rows
+
+
+@transaction.atomic
+def backfill(chunk_size=5000):
+    """Пересчитывает все сводки, читая таблицы кусками по chunk_size.
+
+    Учитываются и посты с комментариями из архива. Идёт в одной
+    транзакции: записи, сделанные во время пересчёта, не учитываются
+    дважды. Возвращает число учтённых записей.
+    """
+    Rollup.objects.all().delete()
+    sources = (
+        (Post.objects.all(), ('pub_date', 'author_id', 'group_id'), 'posts'),
+        (
+            Comment.objects.all(),
+            ('created', 'post__author_id', 'post__group_id'),
+            'comments',
+        ),
+        (Follow.objects.all(), ('created', 'author_id'), 'followers'),
+    )
+    total = 0
+    for queryset, fields, field in sources:
+        for rows in _chunks(queryset, fields, chunk_size):
+            deltas = {}
+            for _, moment, *owners in rows:
+                _add_row(deltas, moment, owners, field)
+            apply(deltas)
+            total += len(rows)
+    deltas = {}
+    for moment, author_id, group_id, field in archive.rollup_rows():
+        _add_row(deltas, moment, (author_id, group_id), field)
+        total += 1
+        if len(deltas) >= chunk_size:
+            apply(deltas)
+            deltas = {}
+    apply(deltas)
+    return total
+
+
+def series(scope, object_id, period, start, count):
+    """Ряды счётчиков за count периодов, начиная с периода start.
+
+    Пустые периоды — нули: i-й элемент каждого ряда относится к
+    shift(start, period, i).
+    """
+    start = period_start(start, period)
+    days = [shift(start, period, number) for number in range(count)]
+    position = {day: number for number, day in enumerate(days)}
+    result = {
+        'period': period,
+        'start': start,
+        **{field: [0] * count for field in FIELDS},
+    }
+    rows = Rollup.objects.filter(
+        scope=scope,
+        object_id=object_id,
+        period=period,
+        day__range=(days[0], days[-1]),
+    ).values_list('day', *FIELDS)
+    for day, *values in rows:
+        for field, value in zip(FIELDS, values):
+            result[field][position[day]] = value
+    return result
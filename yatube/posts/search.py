@@ -0,0 +1,51 @@
+"""Полнотекстовый поиск постов для админки.
+
+На SQLite посты индексируются в FTS5-таблице posts_post_fts (rowid —
+pk поста). Таблицу создаёт миграция, а ведут сигналы сохранения и
+удаления: полный текст сжатых постов есть только в Python, поэтому
+триггеры не подходят.
+На других базах поиск остаётся обычным поиском админки.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def index(post):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def remove(post_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def match_query(term):
+    """Все слова запроса, каждое как префикс: "кот"* AND "спит"*."""
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(term))
+
+
+def filter_posts(queryset, term):
+    query = match_query(term)
+    if not query:
+        return queryset
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [query]
+    ))
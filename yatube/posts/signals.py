@@ -0,0 +1,158 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation
+from core.middleware.page_cache import GENERATION as PAGES
+from . import (
+    archive, duplicates, group_stats, publishing, purge, rollups, search, tags
+)
+from .feeds import FEEDS
+from .models import Comment, Follow, Group, Post, PostTag, User
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_pages(sender, **kwargs):
+    """Сбрасывает кеш страниц анонимных посетителей."""
+    bump_generation(PAGES)
+
+
+@receiver(post_save, sender=User)
+def invalidate_pages_on_user_change(sender, update_fields=None, **kwargs):
+    # При каждом входе обновляется last_login, на страницах он не виден.
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_generation(PAGES)
+    bump_generation(FEEDS)
+
+
+@receiver(post_delete, sender=User)
+def remove_archived_posts(sender, instance, **kwargs):
+    archive.forget_author(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_feeds(sender, **kwargs):
+    bump_generation(FEEDS)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_feeds(sender, **kwargs):
+    bump_generation(FEEDS)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_directory(sender, **kwargs):
+    cache.delete(group_stats.DIRECTORY_KEY)
+
+
+@receiver(post_save, sender=Post)
+def update_group_stats(sender, instance, created, **kwargs):
+    if not instance.is_published:
+        # Черновик учитывается, когда его опубликуют.
+        instance.remember_group()
+        return
+    published = publishing.became_published(instance, created)
+    if published:
+        old_group_id = None
+    elif hasattr(instance, '_loaded_group_id'):
+        old_group_id = instance._loaded_group_id
+    else:
+        # Сообщество не загружалось, а значит, и не менялось.
+        return
+    if published:
+        rollups.post_added(instance)
+    elif old_group_id != instance.group_id:
+        rollups.post_moved(instance, old_group_id)
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            group_stats.post_removed(old_group_id, instance)
+        if instance.group_id is not None:
+            group_stats.post_added(instance.group_id, instance)
+    instance.remember_group()
+
+
+@receiver(post_delete, sender=Post)
+def update_group_stats_on_delete(sender, instance, **kwargs):
+    if archive.is_moving() or purge.is_purging() or not instance.is_published:
+        return
+    rollups.post_removed(instance)
+    if instance.group_id is not None:
+        group_stats.post_removed(instance.group_id, instance)
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_rollups(sender, instance, created, **kwargs):
+    if created:
+        rollups.comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_rollups_on_delete(sender, instance, **kwargs):
+    if not (archive.is_moving() or purge.is_purging()):
+        rollups.comment_removed(instance)
+
+
+@receiver(post_save, sender=Follow)
+def update_follow_rollups(sender, instance, created, **kwargs):
+    if created:
+        rollups.follow_added(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def update_follow_rollups_on_delete(sender, instance, **kwargs):
+    rollups.follow_removed(instance)
+
+
+def _text_saved(instance, update_fields):
+    return 'text' in instance.__dict__ and (
+        update_fields is None or 'text' in update_fields
+    )
+
+
+def _published_text_saved(instance, created, update_fields):
+    """Сохранён ли текст опубликованного поста; при публикации — всегда."""
+    if not instance.is_published:
+        return False
+    return publishing.became_published(instance, created) or _text_saved(
+        instance, update_fields
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_duplicates(sender, instance, created, update_fields=None, **kwargs):
+    if not _published_text_saved(instance, created, update_fields):
+        return
+    duplicates.index(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_search(sender, instance, update_fields=None, **kwargs):
+    # Черновики тоже индексируются: админка показывает их и ищет по ним.
+    if not _text_saved(instance, update_fields):
+        return
+    search.index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search(sender, instance, **kwargs):
+    search.remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def sync_tags(sender, instance, created, update_fields=None, **kwargs):
+    if not _published_text_saved(instance, created, update_fields):
+        return
+    tags.sync(instance)
+
+
+@receiver(post_delete, sender=PostTag)
+def update_tag_count(sender, instance, **kwargs):
+    tags.tag_removed(instance)
@@ -0,0 +1,188 @@
+"""Хештеги постов.
+
+При сохранении текста sync() выделяет из него #теги и приводит к ним
+строки PostTag. PostTag повторяет дату поста, поэтому лента тега
+читается по индексу (tag, pub_date) и листается курсором — id
+последнего поста страницы — без OFFSET и без поиска по тексту.
+Tag.posts_count и часовые счётчики TagTrend меняются точечными UPDATE;
+popular() складывает счётчики за последние TAGS_TRENDING_HOURS часов.
+Посты в архиве из лент тегов уходят, как и из поиска.
+"""
+import datetime
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Post, PostBody, PostTag, Tag, TagTrend
+
+# Тег начинается с буквы: «#1» и якоря ссылок (/#about) тегами не считаются.
+TAG_RE = re.compile(r'(?<![\w&#/])#([^\W\d_]\w{0,49})')
+PAGE_SIZE = 10
+TRENDING_KEY = 'tags.trending'
+TRENDING_TIMEOUT = 60
+
+
+def extract(text):
+    """Теги текста в нижнем регистре, без повторов, по порядку появления."""
+    names = []
+    for name in TAG_RE.findall(text):
+        name = name.lower()
+        if name not in names:
+            names.append(name)
+            if len(names) == settings.TAGS_PER_POST:
+                break
+    return names
+
+
+def _get_tags(names):
+    """Теги с именами names, недостающие создаются."""
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    return list(Tag.objects.filter(name__in=names))
+
+
+def _hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _count_trends(tag_ids):
+    hour = _hour(timezone.now())
+    for tag_id in tag_ids:
+        key = {'tag_id': tag_id, 'hour': hour}
+        if TagTrend.objects.filter(**key).update(count=F('count') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                TagTrend.objects.create(**key, count=1)
+        except IntegrityError:
+            # Строку успел создать параллельный запрос.
+            TagTrend.objects.filter(**key).update(count=F('count') + 1)
+
+
+@transaction.atomic
+def sync(post):
+    """Приводит теги поста к тегам его текста."""
+    names = extract(post.text)
+    current = dict(PostTag.objects.filter(post=post).values_list(
+        'tag__name', 'pk'
+    ))
+    removed = [pk for name, pk in current.items() if name not in names]
+    if removed:
+        # Tag.posts_count уменьшает обработчик post_delete.
+        PostTag.objects.filter(pk__in=removed).delete()
+    added = [name for name in names if name not in current]
+    if not added:
+        return
+    tag_ids = [tag.pk for tag in _get_tags(added)]
+    PostTag.objects.bulk_create([
+        PostTag(post=post, tag_id=tag_id, pub_date=post.pub_date)
+        for tag_id in tag_ids
+    ])
+    Tag.objects.filter(pk__in=tag_ids).update(
+        posts_count=F('posts_count') + 1
+    )
+    _count_trends(tag_ids)
+
+
+def tag_removed(post_tag):
+    Tag.objects.filter(pk=post_tag.tag_id).update(
+        posts_count=F('posts_count') - 1
+    )
+
+
+def timeline(tag, before=None, size=PAGE_SIZE):
+    """Посты с тегом после поста с id=before и курсор следующей страницы."""
+    rows = PostTag.objects.filter(tag=tag, post__is_deleted=False)
+    if before:
+        pub_date = PostTag.objects.filter(
+            tag=tag, post_id=before
+        ).values_list('pub_date', flat=True).first()
+        if pub_date is None:
+            return [], None
+        rows = rows.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, post_id__lt=before)
+        )
+    rows = list(rows.order_by('-pub_date', '-post_id').select_related(
+        'post__author', 'post__group'
+    ).defer('post__text', 'post__text_html')[:size + 1])
+    posts = [row.post for row in rows[:size]]
+    next_cursor = posts[-1].pk if len(rows) > size else None
+    return posts, next_cursor
+
+
+def popular():
+    """[(тег, постов за TAGS_TRENDING_HOURS часов)], частые сверху.
+
+    Пересчитывается раз в TRENDING_TIMEOUT секунд; заодно удаляются
+    счётчики, вышедшие из окна.
+    """
+    trending = cache.get(TRENDING_KEY)
+    if trending is None:
+        since = _hour(timezone.now()) - datetime.timedelta(
+            hours=settings.TAGS_TRENDING_HOURS - 1
+        )
+        TagTrend.objects.filter(hour__lt=since).delete()
+        trending = list(TagTrend.objects.filter(hour__gte=since).values(
+            'tag__name'
+        ).annotate(total=Sum('count')).order_by(
+            '-total', 'tag__name'
+        ).values_list('tag__name', 'total')[:settings.TAGS_TRENDING_SIZE])
+        cache.set(TRENDING_KEY, trending, TRENDING_TIMEOUT)
+    return trending
+
+
+def _chunks(size):
+    last = 0
+    while True:
+        posts = list(Post.all_objects.filter(
+            pk__gt=last, is_published=True
+        ).order_by('pk').values_list(
+            'pk', 'pub_date', 'text', 'is_compressed'
+        )[:size])
+        if not posts:
+            return
+        last = posts[-1][0]
+        yield posts
+
+
+@transaction.atomic
+def backfill(chunk_size=1000):
+    """Заново строит теги всех постов, читая их кусками по chunk_size.
+
+    Счётчики трендов не трогает: старые посты в тренды не попадают.
+    Возвращает число просмотренных постов.
+    """
+    # Без обработчиков post_delete: счётчики пересчитываются в конце.
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {PostTag._meta.db_table}')
+    total = 0
+    for posts in _chunks(chunk_size):
+        bodies = PostBody.objects.in_bulk(
+            [pk for pk, _, _, is_compressed in posts if is_compressed]
+        )
+        found = []
+        for pk, pub_date, text, _ in posts:
+            if pk in bodies:
+                text = bodies[pk].text
+            found.extend((pk, pub_date, name) for name in extract(text))
+        tags = {
+            tag.name: tag.pk
+            for tag in _get_tags({name for _, _, name in found})
+        } if found else {}
+        PostTag.objects.bulk_create([
+            PostTag(post_id=pk, tag_id=tags[name], pub_date=pub_date)
+            for pk, pub_date, name in found
+        ])
+        total += len(posts)
+    Tag.objects.update(posts_count=Coalesce(Subquery(
+        PostTag.objects.filter(tag=OuterRef('pk')).values('tag').annotate(
+            total=Count('pk')
+        ).values('total')[:1]
+    ), 0))
+    return total
@@ -0,0 +1,27 @@
+from sorl.thumbnail import get_thumbnail
+
+from tasks.queue import task
+from . import related
+from .models import Post
+# Задачи удаления живут рядом с пометкой is_deleted в posts.purge.
+from .purge import purge_deleted, purge_group, purge_user  # noqa: F401
+
+# Те же параметры, что у {% thumbnail %} в шаблонах лент и поста.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+@task()
+def warm_thumbnails(post_id):
+    """Готовит миниатюру заранее, чтобы её не строил первый читатель."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.image:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+@task()
+def update_related(post_id):
+    """Пересчитывает похожие посты для нового или изменённого поста."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        related.update(post)
@@ -0,0 +1,89 @@
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        cls.groups = [
+            Group.objects.create(
+                title=f'group_{number}',
+                slug=f'slug_{number}',
+                description='test_description',
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def create_posts(self, count):
+        for _ in range(count):
+            number = User.objects.count()
+            author = User.objects.create_user(username=f'author_{number}')
+            post = Post.objects.create(
+                author=author,
+                text=f'post number {number}',
+                group=self.groups[number % len(self.groups)],
+            )
+            Comment.objects.create(post=post, author=author, text='comment')
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.admin_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_changelists_without_n_plus_one(self):
+        """Число запросов списка не зависит от числа строк"""
+        for name in ('admin:posts_post_changelist',
+                     'admin:posts_comment_changelist'):
+            with self.subTest(name=name):
+                Post.objects.all().delete()
+                self.create_posts(2)
+                # Первый запрос кладёт сессию и пользователя в кеш.
+                self.changelist_queries(reverse(name))
+                few = self.changelist_queries(reverse(name))
+                self.create_posts(10)
+                self.assertEqual(self.changelist_queries(reverse(name)), few)
+
+    def test_group_uses_autocomplete(self):
+        self.create_posts(1)
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist')
+        )
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'group_2</option>')
+
+    @override_settings(ADMIN_COUNT_CAP=5)
+    def test_count_capped(self):
+        self.create_posts(8)
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist')
+        )
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    @override_settings(POST_COMPRESS_THRESHOLD=100)
+    def test_search_uses_full_text_index(self):
+        """Поиск находит слово из сжатого текста и не ищет по LIKE"""
+        post = Post.objects.create(
+            author=self.admin, text='filler ' * 50 + 'needle'
+        )
+        Post.objects.create(author=self.admin, text='another post')
+        with CaptureQueriesContext(connection) as context:
+            response = self.admin_client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'need'}
+            )
+        self.assertEqual(list(response.context['cl'].result_list), [post])
+        self.assertFalse(
+            [query for query in context if 'LIKE' in query['sql']]
+        )
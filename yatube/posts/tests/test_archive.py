@@ -0,0 +1,156 @@
+import datetime
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive, group_stats, rollups
+from ..models import Comment, Follow, Group, Post, Rollup, User
+from ..views import NUMBER_OF_POSTS
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    ARCHIVE_PATH=os.path.join(TEMP_DIR, 'archive.sqlite3'),
+    POST_COMPRESS_THRESHOLD=100,
+)
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='group', slug='group', description='test_description'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        now = timezone.now()
+        # Старые посты: первый длинный, его текст лежит в PostBody.
+        self.old_posts = []
+        for number in range(NUMBER_OF_POSTS + 2):
+            text = f'old post {number} ' + 'long ' * 50 * (number == 0)
+            post = Post.objects.create(
+                author=self.author, text=text, group=self.group
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - datetime.timedelta(days=400 + number)
+            )
+            self.old_posts.append(post)
+        self.comment = Comment.objects.create(
+            post=self.old_posts[0], author=self.reader, text='**old**'
+        )
+        self.fresh = Post.objects.create(
+            author=self.author, text='fresh post', group=self.group
+        )
+
+    def tearDown(self):
+        connection = archive.connect()
+        if connection is not None:
+            with connection:
+                connection.execute('DELETE FROM post')
+                connection.execute('DELETE FROM comment')
+
+    def archive(self):
+        call_command('archive_posts', days=365, batch=5, stdout=StringIO())
+
+    def test_old_posts_moved(self):
+        """Старые посты с комментариями уходят из рабочих таблиц"""
+        self.archive()
+        self.assertEqual(list(Post.objects.all()), [self.fresh])
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(archive.ArchivedPosts().count(), NUMBER_OF_POSTS + 2)
+        self.archive()
+        self.assertEqual(archive.ArchivedPosts().count(), NUMBER_OF_POSTS + 2)
+
+    def test_archive_written_inside_batch_transaction(self):
+        """Пачка читается, пишется в архив и удаляется в одной транзакции"""
+        depth = len(connection.savepoint_ids)
+        write = archive._write
+
+        def checked_write(posts, comments):
+            self.assertEqual(len(connection.savepoint_ids), depth + 1)
+            write(posts, comments)
+
+        with mock.patch.object(archive, '_write', checked_write):
+            archive.archive_batch(timezone.now(), NUMBER_OF_POSTS + 2)
+        self.assertEqual(list(Post.objects.all()), [self.fresh])
+        self.assertEqual(len(archive.get_comments(self.old_posts[0])), 1)
+
+    def test_post_detail_reads_archive(self):
+        self.archive()
+        old = self.old_posts[0]
+        response = self.client.get(
+            reverse('posts:post_detail', args=[old.pk])
+        )
+        post = response.context['post']
+        self.assertTrue(post.is_archived)
+        self.assertEqual(post.text, old.text)
+        self.assertEqual(post.author, self.author)
+        self.assertEqual(post.group, self.group)
+        self.assertContains(response, '<strong>old</strong>')
+        self.assertEqual(response.context['author_posts_count'], 13)
+        self.assertNotContains(response, 'add_comment')
+        response = self.client.get(reverse('posts:post_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_pages_continue_into_archive(self):
+        """Ленты после рабочих постов продолжаются архивом"""
+        expected = [self.fresh.pk] + [post.pk for post in self.old_posts]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        before = {}
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+        for url in urls:
+            before[url] = self.page_ids(url)
+        self.archive()
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertEqual(self.page_ids(url), expected)
+                self.assertEqual(before[url], expected)
+
+    def page_ids(self, url):
+        ids = []
+        for page in (1, 2):
+            response = self.client.get(url, {'page': page})
+            ids += [post.pk for post in response.context['page_obj']]
+        return ids
+
+    def test_statistics_unchanged(self):
+        """Перенос в архив не меняет сводки и счётчики сообществ"""
+        snapshot = list(Rollup.objects.values_list(
+            'scope', 'object_id', 'period', 'day', 'posts', 'comments'
+        ).order_by('pk'))
+        self.archive()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, NUMBER_OF_POSTS + 3)
+        self.assertEqual(list(Rollup.objects.values_list(
+            'scope', 'object_id', 'period', 'day', 'posts', 'comments'
+        ).order_by('pk')), snapshot)
+        group_stats.recount()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, NUMBER_OF_POSTS + 3)
+        self.assertEqual(self.group.authors_count, 1)
+        self.assertEqual(rollups.backfill(), NUMBER_OF_POSTS + 4)
@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import User
+
+AUTH_TABLES = ('FROM "django_session"', 'FROM "auth_user"')
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    USER_CACHE_ENABLED=True,
+)
+class AuthCacheTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='Cached', password='old-password-1'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='Cached', password='old-password-1')
+        self.url = reverse('posts:follow_index')
+
+    def auth_queries(self):
+        contexts = [
+            CaptureQueriesContext(connections[alias])
+            for alias in ('default', 'replica')
+        ]
+        for context in contexts:
+            context.__enter__()
+        response = self.client.get(self.url)
+        for context in contexts:
+            context.__exit__(None, None, None)
+        self.assertContains(response, 'Cached')
+        return [
+            query['sql'] for context in contexts
+            for query in context.captured_queries
+            if any(table in query['sql'] for table in AUTH_TABLES)
+        ]
+
+    def test_no_auth_queries_on_cache_hit(self):
+        """Сессия и пользователь повторного запроса берутся из кеша"""
+        self.assertNotEqual(self.auth_queries(), [])
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_password_change_invalidates(self):
+        """После смены пароля старая сессия больше не действует"""
+        self.auth_queries()
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-password-2')
+        user.save()
+        response = self.client.get(self.url)
+        self.assertRedirects(
+            response, reverse('users:login') + '?next=' + self.url
+        )
+
+    def test_profile_change_invalidates(self):
+        self.auth_queries()
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Новое'
+        user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.wsgi_request.user.first_name, 'Новое')
+
+    def test_old_sessions_stay_logged_in(self):
+        """Сессии с путём ModelBackend не разлогиниваются"""
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        self.assertContains(client.get(self.url), 'Cached')
+
+
+class ProcessLocalCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Local')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_sessions_and_users_not_cached_per_process(self):
+        """С кешем процесса сессии и пользователи читаются из базы"""
+        self.assertFalse(settings.SHARED_CACHE)
+        self.assertEqual(
+            settings.SESSION_ENGINE, 'django.contrib.sessions.backends.db'
+        )
+        url = reverse('posts:follow_index')
+        for _ in range(2):
+            with CaptureQueriesContext(connections['default']) as context:
+                self.assertContains(self.client.get(url), 'Local')
+            self.assertTrue(any(
+                'FROM "auth_user"' in query['sql']
+                for query in context.captured_queries
+            ))
@@ -1,8 +1,9 @@
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 
-from ..models import Post, User
+from core import swr
+from ..models import Comment, Post, User
 
 
 class CacheTests(TestCase):
@@ -36,3 +37,104 @@ class CacheTests(TestCase):
             reverse('posts:index')
         ).content
         self.assertNotEqual(post_before, cache_content)
+
+
+@override_settings(SWR_BACKGROUND_REFRESH=False)
+class StaleWhileRevalidateTests(TestCase):
+    KEY: str = 'swr_test'
+
+    def setUp(self):
+        cache.clear()
+        swr.breaker.reset()
+        self.renders = []
+
+    def render(self):
+        self.renders.append(1)
+        return f'version_{len(self.renders)}'
+
+    def test_stale_value_served_while_refreshing(self):
+        """Устаревшее значение отдаётся сразу, а кеш обновляется"""
+        self.assertEqual(
+            swr.get_or_render(self.KEY, self.render, 0, 60), 'version_1'
+        )
+        self.assertEqual(
+            swr.get_or_render(self.KEY, self.render, 0, 60), 'version_1'
+        )
+        self.assertEqual(len(self.renders), 2)
+        self.assertEqual(
+            swr.get_or_render(self.KEY, self.render, 60, 60), 'version_2'
+        )
+
+    def test_only_one_refresh_per_key(self):
+        """Пока ключ заблокирован, повторная перерисовка не запускается"""
+        swr.get_or_render(self.KEY, self.render, 0, 60)
+        cache.add(swr.LOCK_KEY_TEMPLATE % self.KEY, True)
+        for _ in range(3):
+            swr.get_or_render(self.KEY, self.render, 0, 60)
+        self.assertEqual(len(self.renders), 1)
+
+    def test_open_breaker_skips_refresh(self):
+        """При разомкнутой цепи отдаются устаревшие данные"""
+        swr.get_or_render(self.KEY, self.render, 0, 60)
+        for _ in range(swr.breaker.max_failures):
+            swr.breaker.record(swr.breaker.slow_threshold)
+        self.assertTrue(swr.breaker.is_open)
+        self.assertEqual(
+            swr.get_or_render(self.KEY, self.render, 0, 60), 'version_1'
+        )
+        self.assertEqual(len(self.renders), 1)
+
+
+class AnonymousPageCacheTests(TestCase):
+    POST_TEXT: str = 'test_post'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text=cls.POST_TEXT
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_guest_page_served_without_view(self):
+        """Повторный запрос гостя отдаётся из кеша без вызова view"""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        first = self.guest_client.get(url)
+        self.assertTemplateUsed(first, 'posts/post_detail.html')
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertEqual(first.content, second.content)
+        self.assertContains(second, 'Войти')
+        self.assertNotContains(second, 'page-hole')
+
+    def test_cached_page_keeps_headers(self):
+        """Страница из кеша отдаётся с теми же заголовками"""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url)
+        second = self.guest_client.get(url)
+        self.assertEqual(second['X-Frame-Options'], 'SAMEORIGIN')
+        self.assertEqual(dict(first.items()), dict(second.items()))
+
+    def test_authorized_user_bypasses_page_cache(self):
+        """Страница авторизованного пользователя не берётся из кеша"""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.guest_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Добавить комментарий')
+        self.assertContains(response, 'Выйти')
+
+    def test_content_event_invalidates_page_cache(self):
+        """Новый комментарий сбрасывает кеш страниц"""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='new_comment'
+        )
+        self.assertContains(self.guest_client.get(url), 'new_comment')
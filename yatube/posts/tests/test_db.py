@@ -0,0 +1,36 @@
+import sqlite3
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from core.db.backends.sqlite3 import base
+
+
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        """Новое соединение получает PRAGMA из настроек бэкенда"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(
+                cursor.fetchone()[0], base.DEFAULT_PRAGMAS['busy_timeout']
+            )
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_locked_query_is_retried(self):
+        """Запрос, упавший с database is locked, повторяется"""
+        locked = sqlite3.OperationalError('database is locked')
+        execute = mock.Mock(side_effect=[locked, locked, 'result'])
+        cursor = connection.cursor().cursor
+        with mock.patch.object(base, 'RETRY_DELAY', 0):
+            self.assertEqual(cursor._retry(execute, 'SELECT 1'), 'result')
+        self.assertEqual(execute.call_count, 3)
+
+    def test_other_errors_are_not_retried(self):
+        """Прочие ошибки пробрасываются сразу"""
+        execute = mock.Mock(side_effect=sqlite3.OperationalError('no table'))
+        cursor = connection.cursor().cursor
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor._retry(execute, 'SELECT 1')
+        self.assertEqual(execute.call_count, 1)
@@ -0,0 +1,61 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import duplicates
+from ..models import Post, User
+
+SPAM = (
+    'Купите наш замечательный курс по заработку в интернете, '
+    'первые десять покупателей получат скидку, пишите в личные '
+    'сообщения прямо сейчас и не упустите свой шанс разбогатеть'
+)
+
+
+class DuplicateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_batch_signatures_match_single(self):
+        texts = [SPAM, 'совсем другой текст', '']
+        for text, sig in zip(texts, duplicates.signatures(texts)):
+            with self.subTest(text=text):
+                self.assertTrue((sig == duplicates.signature(text)).all())
+
+    def test_near_duplicate_flagged(self):
+        """Почти такой же пост отмечается дубликатом, другой — нет"""
+        original = Post.objects.create(author=self.author, text=SPAM)
+        copy = Post.objects.create(author=self.author, text=SPAM + '!!!')
+        other = Post.objects.create(
+            author=self.author, text='Сегодня гулял в парке и видел белку'
+        )
+        self.assertIsNone(original.duplicate_of_id)
+        self.assertEqual(copy.duplicate_of_id, original.pk)
+        self.assertIsNone(other.duplicate_of_id)
+
+    @override_settings(DUPLICATES_ACTION='block')
+    def test_duplicate_blocked_by_form(self):
+        Post.objects.create(author=self.author, text=SPAM)
+        response = self.authorized_client.post(
+            reverse('posts:create_post'), data={'text': SPAM}
+        )
+        self.assertFormError(
+            response, 'form', 'text', 'Почти такой же пост уже опубликован'
+        )
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_backfill_marks_later_copy(self):
+        original = Post.objects.create(author=self.author, text=SPAM)
+        copy = Post.objects.create(author=self.author, text=SPAM)
+        Post.objects.update(duplicate_of=None)
+        call_command('index_duplicates', batch_size=1, stdout=StringIO())
+        copy.refresh_from_db()
+        self.assertEqual(copy.duplicate_of_id, original.pk)
@@ -0,0 +1,95 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import feeds
+from ..models import Group, Post, User
+
+
+class FeedTests(TestCase):
+    POST_TEXT: str = 'test_post'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='test_group',
+            slug='test_slug',
+            description='test_description',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text=cls.POST_TEXT, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds_contain_posts(self):
+        """Ленты сайта, сообщества и автора содержат пост"""
+        urls = (
+            reverse('posts:feed_rss'),
+            reverse('posts:feed_atom'),
+            reverse('posts:group_feed_rss', args=[self.group.slug]),
+            reverse('posts:group_feed_atom', args=[self.group.slug]),
+            reverse('posts:profile_feed_rss', args=[self.author.username]),
+            reverse('posts:profile_feed_atom', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), self.POST_TEXT)
+
+    def test_unknown_group_feed_returns_404(self):
+        response = self.guest_client.get(
+            reverse('posts:group_feed_rss', args=['unknown'])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_repeated_poll_served_from_cache(self):
+        """Повторный опрос не обращается к базе, по ETag отдаётся 304"""
+        url = reverse('posts:feed_rss')
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+            not_modified = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=first['ETag']
+            )
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_new_post_invalidates_feed(self):
+        """Новый пост меняет ETag и содержимое ленты"""
+        url = reverse('posts:feed_rss')
+        first = self.guest_client.get(url)
+        Post.objects.create(author=self.author, text='fresh_post')
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=first['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'fresh_post')
+
+    def test_group_rename_updates_items(self):
+        """Новое название сообщества попадает в описания постов ленты"""
+        url = reverse('posts:feed_rss')
+        self.guest_client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'renamed_group'
+        group.save()
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'renamed_group')
+        self.assertNotContains(response, 'test_group')
+
+    def test_unchanged_items_survive_new_post(self):
+        """Новый пост не сбрасывает описания остальных постов"""
+        url = reverse('posts:feed_rss')
+        self.guest_client.get(url)
+        Post.objects.create(author=self.author, text='fresh_post')
+        with mock.patch.object(
+            feeds, 'render_to_string', wraps=feeds.render_to_string
+        ) as render:
+            self.assertContains(self.guest_client.get(url), 'fresh_post')
+        self.assertEqual(render.call_count, 1)
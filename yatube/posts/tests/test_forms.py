@@ -4,8 +4,10 @@ from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from tasks.models import Task
 from ..forms import PostForm, CommentForm
 from ..models import Group, Post, User
+from ..tasks import warm_thumbnails
 
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -129,6 +131,9 @@ class PostFormTests(TestCase):
             )
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
+        self.assertTrue(
+            Task.objects.filter(name=warm_thumbnails.task_name).exists()
+        )
 
     def test_comment_form_work_correct(self):
         """Комментарий может быть добавлен
@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class GroupStatsTests(TestCase):
+    POST_TEXT: str = 'test_post'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.another_author = User.objects.create_user(username='another')
+        cls.group = Group.objects.create(
+            title='first_group',
+            slug='first_slug',
+            description='test_description',
+        )
+        cls.empty_group = Group.objects.create(
+            title='second_group',
+            slug='second_slug',
+            description='test_description',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def create_post(self, author, group):
+        return Post.objects.create(
+            author=author, text=self.POST_TEXT, group=group
+        )
+
+    def test_counters_follow_new_posts(self):
+        """Новые посты увеличивают счётчики сообщества"""
+        self.create_post(self.author, self.group)
+        self.create_post(self.author, self.group)
+        last_post = self.create_post(self.another_author, self.group)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(self.group.authors_count, 2)
+        self.assertEqual(self.group.last_post_date, last_post.pub_date)
+
+    def test_post_moved_to_another_group_through_form(self):
+        """Перенос поста через PostForm меняет статистику обеих групп"""
+        first_post = self.create_post(self.author, self.group)
+        post = self.create_post(self.author, self.group)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': self.POST_TEXT, 'group': self.empty_group.pk},
+        )
+        self.group.refresh_from_db()
+        self.empty_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.group.authors_count, 1)
+        self.assertEqual(self.group.last_post_date, first_post.pub_date)
+        self.assertEqual(self.empty_group.posts_count, 1)
+        self.assertEqual(self.empty_group.authors_count, 1)
+
+    def test_deferred_group_not_loaded(self):
+        """Пост с отложенным сообществом сохраняется без лишних запросов"""
+        post = self.create_post(self.author, self.group)
+        with self.assertNumQueries(1):
+            post = Post.objects.defer('group').get(pk=post.pk)
+        post.text = 'edited'
+        post.save()
+        self.assertNotIn('group_id', post.__dict__)
+        post.group = self.empty_group
+        post.save()
+        self.group.refresh_from_db()
+        self.empty_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.empty_group.posts_count, 1)
+
+    def test_deleted_post_leaves_statistics(self):
+        """Удалённый пост убирается из статистики"""
+        post = self.create_post(self.author, self.group)
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group.authors_count, 0)
+        self.assertIsNone(self.group.last_post_date)
+
+    def test_directory_sorted_by_activity(self):
+        """Каталог сообществ отсортирован по числу постов"""
+        self.create_post(self.author, self.empty_group)
+        response = self.authorized_client.get(reverse('posts:group_index'))
+        slugs = [group['slug'] for group in response.context['groups']]
+        self.assertEqual(slugs, ['second_slug', 'first_slug'])
+
+    def test_directory_follows_group_changes(self):
+        """Новое или изменённое сообщество сразу видно в каталоге"""
+        self.authorized_client.get(reverse('posts:group_index'))
+        Group.objects.create(
+            title='third_group', slug='third_slug', description='new'
+        )
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'renamed'
+        group.save()
+        response = self.authorized_client.get(reverse('posts:group_index'))
+        titles = {group['title'] for group in response.context['groups']}
+        self.assertEqual(titles, {'renamed', 'second_group', 'third_group'})
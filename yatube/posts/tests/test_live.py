@@ -0,0 +1,82 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.pubsub import Broker, BrokerFull
+from .. import live
+from ..models import Post, User
+
+
+class BrokerTests(TestCase):
+    def test_slow_subscriber_drops_oldest_events(self):
+        """Переполненная очередь теряет старые события и считает их"""
+        broker = Broker(max_subscribers=1, queue_size=2)
+        subscription = broker.subscribe()
+        for number in range(5):
+            broker.publish(number)
+        events, dropped = subscription.get(0)
+        self.assertEqual(events, [3, 4])
+        self.assertEqual(dropped, 3)
+
+    def test_subscribers_limit(self):
+        broker = Broker(max_subscribers=1, queue_size=2)
+        subscription = broker.subscribe()
+        with self.assertRaises(BrokerFull):
+            broker.subscribe()
+        subscription.close()
+        broker.subscribe()
+
+
+@override_settings(SSE_ENABLED=True)
+class StreamViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_stream_pushes_new_post(self):
+        """Новый пост приходит в открытый поток"""
+        response = self.authorized_client.get(reverse('posts:stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        post = Post.objects.create(author=self.author, text='live_post')
+        live.publish_post(post)
+        chunk = next(chunks)
+        self.assertTrue(chunk.startswith(b'event: post'))
+        self.assertIn(b'live_post', chunk)
+        response.close()
+        self.assertFalse(live.broker.subscriptions)
+
+    def test_stream_refuses_over_limit(self):
+        with mock.patch.object(live.broker, 'max_subscribers', 0):
+            response = self.authorized_client.get(reverse('posts:stream'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.SERVICE_UNAVAILABLE
+        )
+
+    def test_guests_not_subscribed(self):
+        """Гости не открывают поток и не получают его"""
+        response = self.guest_client.get(reverse('posts:stream'))
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertNotContains(
+            self.guest_client.get(reverse('posts:index')), 'EventSource'
+        )
+        self.assertContains(
+            self.authorized_client.get(reverse('posts:index')), 'EventSource'
+        )
+
+    @override_settings(SSE_ENABLED=False)
+    def test_disabled(self):
+        response = self.authorized_client.get(reverse('posts:stream'))
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertNotContains(
+            self.authorized_client.get(reverse('posts:index')), 'EventSource'
+        )
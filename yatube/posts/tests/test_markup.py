@@ -0,0 +1,83 @@
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.cache import get_generation
+from core.middleware.page_cache import GENERATION as PAGES
+from .. import markup
+from ..feeds import FEEDS
+from ..models import Comment, Post, User
+
+
+class MarkupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_text_rendered_and_sanitized_on_save(self):
+        """Markdown отрисовывается при сохранении, скрипты вырезаются"""
+        self.authorized_client.post(
+            reverse('posts:create_post'),
+            data={'text': '**bold** <script>alert(1)</script>'},
+        )
+        post = Post.objects.get()
+        self.assertIn('<strong>bold</strong>', post.text_html)
+        self.assertNotIn('<script>', post.text_html)
+        self.assertEqual(post.render_version, markup.RENDER_VERSION)
+        self.assertEqual(post.excerpt, 'bold alert(1)')
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': '_comment_'},
+        )
+        self.assertIn('<em>comment</em>', Comment.objects.get().text_html)
+
+    def test_outdated_html_rerendered_lazily(self):
+        """HTML старой версии перерисовывается при первом показе"""
+        post = Post.objects.create(author=self.author, text='*new*')
+        Post.objects.filter(pk=post.pk).update(
+            text_html='old', render_version=0
+        )
+        generations = get_generation(PAGES), get_generation(FEEDS)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, '<em>new</em>')
+        post.refresh_from_db()
+        self.assertEqual(post.render_version, markup.RENDER_VERSION)
+        # Перерисовка не правка: кеши и чтение с реплик не сбрасываются.
+        self.assertEqual(
+            (get_generation(PAGES), get_generation(FEEDS)), generations
+        )
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_rerender_command(self):
+        """Команда перерисовывает и черновики, и длинные сжатые посты"""
+        posts = [
+            Post.objects.create(author=self.author, text='*post*'),
+            Post.objects.create(
+                author=self.author, text='*draft*', is_published=False
+            ),
+            Post.objects.create(
+                author=self.author,
+                text='*long*' + ' word' * settings.POST_COMPRESS_THRESHOLD,
+            ),
+        ]
+        for post in posts:
+            post.save_rendered('<p>old</p>')
+        with mock.patch.object(markup, 'RENDER_VERSION', 2):
+            call_command('rerender_texts', processes=2, stdout=StringIO())
+        for post, word in zip(posts, ('post', 'draft', 'long')):
+            with self.subTest(word=word):
+                post = Post.all_objects.get(pk=post.pk)
+                self.assertEqual(post.render_version, 2)
+                self.assertIn(f'<em>{word}</em>', post.text_html)
+                self.assertTrue(post.excerpt.startswith(word))
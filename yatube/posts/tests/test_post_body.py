@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, PostBody, User
+
+
+@override_settings(POST_COMPRESS_THRESHOLD=1000)
+class PostBodyTests(TestCase):
+    LONG_TEXT: str = 'chapter line\n' * 500 + 'the end'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_long_text_stored_compressed(self):
+        """Длинный текст уходит в PostBody и догружается по обращению"""
+        post = Post.objects.create(author=self.author, text=self.LONG_TEXT)
+        self.assertTrue(post.is_compressed)
+        self.assertEqual(post.text, self.LONG_TEXT)
+        self.assertEqual(
+            Post.objects.values_list('text', flat=True).get(pk=post.pk), ''
+        )
+        self.assertLess(
+            len(PostBody.objects.get(post=post).data), len(self.LONG_TEXT)
+        )
+        post = Post.objects.get(pk=post.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(post.text, self.LONG_TEXT)
+
+    def test_feed_shows_excerpt_and_detail_full_text(self):
+        """Лента показывает анонс, полный текст только на странице поста"""
+        post = Post.objects.create(author=self.author, text=self.LONG_TEXT)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'the end')
+        self.assertContains(response, 'читать далее')
+        self.assertNotIn('text', response.context['page_obj'][0].__dict__)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, 'the end')
+
+    def test_shortened_post_leaves_side_table(self):
+        post = Post.objects.create(author=self.author, text=self.LONG_TEXT)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'short'},
+        )
+        post.refresh_from_db()
+        self.assertFalse(post.is_compressed)
+        self.assertEqual(post.text, 'short')
+        self.assertFalse(PostBody.objects.filter(post=post).exists())
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware.profiling import should_profile
+from core.profiling import Sampler
+
+TEMP_PROFILER_DIR = tempfile.mkdtemp()
+
+
+def busy_loop(seconds):
+    finish = time.monotonic() + seconds
+    total = 0
+    while time.monotonic() < finish:
+        total += sum(range(100))
+    return total
+
+
+@override_settings(
+    PROFILER_DIR=TEMP_PROFILER_DIR,
+    PROFILER_INTERVAL=0.001,
+    PROFILER_TOKEN='secret',
+    PROFILER_VIEWS=['posts:profile'],
+    PROFILER_SAMPLE_RATE=0,
+)
+class ProfilerTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_PROFILER_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_selection(self):
+        """Профилируются выбранные страницы и запросы с токеном"""
+        factory = RequestFactory()
+        cases = (
+            (factory.get('/'), 'posts:profile', True),
+            (factory.get('/'), 'posts:index', False),
+            (factory.get('/', HTTP_X_PROFILE='secret'), 'posts:index', True),
+            (factory.get('/', HTTP_X_PROFILE='wrong'), 'posts:index', False),
+        )
+        for request, view_name, expected in cases:
+            with self.subTest(view_name=view_name):
+                self.assertIs(should_profile(request, view_name), expected)
+
+    def test_samples_dumped_as_folded_stacks(self):
+        """Стеки процесса сводятся в файл для flamegraph и очищаются"""
+        sampler = Sampler()
+        sampler.start('posts:profile')
+        busy_loop(0.1)
+        sampler.stop()
+        sampler.flush(force=True)
+        output = os.path.join(TEMP_PROFILER_DIR, 'dump')
+        call_command('dump_profiles', output=output, stdout=StringIO())
+        with open(os.path.join(output, 'posts.profile.folded')) as file:
+            lines = file.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn(f'{__name__}:busy_loop', stack)
+        self.assertGreater(int(count), 0)
+        self.assertFalse(any(
+            name.endswith(('.folded', '.dumping'))
+            for name in os.listdir(TEMP_PROFILER_DIR)
+        ))
@@ -0,0 +1,163 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.tasks import posts_published
+from tasks.models import Task
+from .. import publishing, search
+from ..models import Group, Post, PostTag, Rollup, User
+
+
+class PublishingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='group', slug='group', description='test_description'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def create(self, publish, publish_at=''):
+        return self.client.post(reverse('posts:create_post'), {
+            'text': 'отложенный #пост',
+            'group': self.group.pk,
+            'publish': publish,
+            'publish_at': publish_at,
+        })
+
+    def announced(self):
+        return Task.objects.filter(name=posts_published.task_name).count()
+
+    def assert_published(self, post):
+        self.group.refresh_from_db()
+        self.assertTrue(post.is_published)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertTrue(Rollup.objects.filter(
+            scope=Rollup.AUTHOR, object_id=self.author.pk, posts=1
+        ).exists())
+        self.assertTrue(PostTag.objects.filter(post=post).exists())
+        self.assertEqual(self.announced(), 1)
+        self.assertIn(post, self.client.get(
+            reverse('posts:index')
+        ).context['page_obj'])
+
+    def test_draft_is_hidden(self):
+        """Черновик виден только автору и ни во что не засчитан"""
+        response = self.create('draft')
+        self.assertRedirects(response, reverse('posts:drafts'))
+        post = Post.all_objects.get()
+        self.assertFalse(post.is_published)
+        self.assertFalse(Post.objects.exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertFalse(Rollup.objects.exists())
+        self.assertFalse(PostTag.objects.exists())
+        self.assertEqual(self.announced(), 0)
+        self.assertEqual(self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        ).status_code, 404)
+        response = self.client.get(reverse('posts:drafts'))
+        self.assertIn(post, response.context['page_obj'])
+        if search.available():
+            self.assertIn(post, search.filter_posts(
+                Post.all_objects.all(), 'отложенный'
+            ))
+
+    def test_publish_draft_on_edit(self):
+        """Черновик публикуется правкой с текущей датой"""
+        self.create('draft')
+        post = Post.all_objects.get()
+        Post.all_objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - datetime.timedelta(days=3)
+        )
+        self.client.post(reverse('posts:post_edit', args=[post.pk]), {
+            'text': 'готовый #пост', 'group': self.group.pk, 'publish': 'now'
+        })
+        post = Post.objects.get()
+        self.assertEqual(post.pub_date.date(), timezone.now().date())
+        self.assert_published(post)
+
+    def test_schedule_validation(self):
+        """Время отложенной публикации обязательно и не в прошлом"""
+        past = timezone.localtime() - datetime.timedelta(hours=1)
+        for value in ('', past.strftime('%Y-%m-%dT%H:%M')):
+            with self.subTest(value=value):
+                response = self.create('later', value)
+                self.assertTrue(response.context['form'].errors['publish_at'])
+        self.assertFalse(Post.all_objects.exists())
+
+    def test_scheduler_publishes_due_posts(self):
+        """Планировщик публикует наступившие посты и спит до следующего"""
+        moment = timezone.localtime() + datetime.timedelta(hours=1)
+        self.create('later', moment.strftime('%Y-%m-%dT%H:%M'))
+        post = Post.all_objects.get()
+        self.assertEqual(publishing.publish_due(10), 0)
+        self.assertEqual(publishing.next_due(), post.publish_at)
+        Post.all_objects.filter(pk=post.pk).update(
+            publish_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        out = StringIO()
+        call_command('runscheduler', '--once', stdout=out)
+        self.assertIn('Опубликовано постов: 1', out.getvalue())
+        self.assert_published(Post.objects.get())
+        self.assertIsNone(publishing.next_due())
+
+    def test_scheduler_commits_post_by_post(self):
+        """Каждый пост публикуется в своей транзакции, задачи — после неё"""
+        moment = timezone.localtime() + datetime.timedelta(hours=1)
+        for _ in range(2):
+            self.create('later', moment.strftime('%Y-%m-%dT%H:%M'))
+        Post.all_objects.update(
+            publish_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        depth = len(connection.savepoint_ids)
+        announced = []
+
+        def post_published(post):
+            self.assertEqual(len(connection.savepoint_ids), depth)
+            announced.append(post.pk)
+
+        with mock.patch.object(publishing, 'post_published', post_published):
+            self.assertEqual(publishing.publish_due(10), 2)
+        self.assertEqual(
+            sorted(announced),
+            sorted(Post.objects.values_list('pk', flat=True)),
+        )
+
+    def test_stale_draft_edit_keeps_publication(self):
+        """Правка, начатая до публикации планировщиком, её не снимает"""
+        moment = timezone.localtime() + datetime.timedelta(hours=1)
+        self.create('later', moment.strftime('%Y-%m-%dT%H:%M'))
+        stale = Post.all_objects.get()
+        Post.all_objects.update(
+            publish_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        publishing.publish_due(10)
+        pub_date = Post.objects.get().pub_date
+        stale.text = 'исправленный #пост'
+        stale.is_published = False
+        self.assertTrue(publishing.save_unpublished(stale))
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'исправленный #пост')
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertIsNone(post.publish_at)
+        self.assert_published(post)
+
+    def test_due_query_uses_index(self):
+        sql, params = publishing.due()[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('posts_post_due', plan)
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tasks.models import Task
+from .. import purge
+from ..models import Comment, Follow, Group, Post, Rollup, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, PURGE_CHUNK_SIZE=2)
+class PurgeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='group', slug='group', description='test_description'
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'post {number}', group=self.group
+            )
+            for number in range(5)
+        ]
+        self.posts[0].image = SimpleUploadedFile(
+            'small.gif', SMALL_GIF, content_type='image/gif'
+        )
+        self.posts[0].save()
+        self.kept = Post.objects.create(
+            author=self.reader, text='kept', group=self.group
+        )
+        Comment.objects.create(post=self.kept, author=self.author, text='c')
+        Comment.objects.create(post=self.kept, author=self.reader, text='c')
+        Comment.objects.create(
+            post=self.posts[1], author=self.reader, text='c'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+
+    def rollup(self, scope, object_id, field):
+        return sum(Rollup.objects.filter(
+            scope=scope, object_id=object_id, period=Rollup.DAY
+        ).values_list(field, flat=True))
+
+    def test_user_hidden_then_purged(self):
+        """Контент пользователя скрыт сразу, а удаляется задачей"""
+        image = os.path.join(TEMP_MEDIA_ROOT, self.posts[0].image.name)
+        self.assertTrue(os.path.exists(image))
+        purge.delete_user(self.author)
+        self.assertEqual(list(Post.objects.all()), [self.kept])
+        self.assertFalse(Comment.objects.filter(author=self.author).exists())
+        self.assertEqual(
+            Task.objects.filter(name=purge.purge_user.task_name).count(), 1
+        )
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, 'post 1')
+
+        purge.purge_user(self.author.pk)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Post.all_objects.all()), [self.kept])
+        self.assertEqual(Comment.all_objects.count(), 1)
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(os.path.exists(image))
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.group.authors_count, 1)
+        self.assertEqual(self.rollup(Rollup.GROUP, self.group.pk, 'posts'), 1)
+        self.assertEqual(
+            self.rollup(Rollup.GROUP, self.group.pk, 'comments'), 1
+        )
+        self.assertEqual(
+            self.rollup(Rollup.AUTHOR, self.reader.pk, 'comments'), 1
+        )
+        self.assertEqual(
+            self.rollup(Rollup.AUTHOR, self.reader.pk, 'followers'), 0
+        )
+
+    def test_admin_deletes_in_background(self):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [self.posts[1].pk],
+        })
+        self.assertContains(response, 'post 1')
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [post.pk for post in self.posts[1:3]],
+            'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(Post.all_objects.count(), 6)
+        purge.purge_deleted()
+        self.assertEqual(Post.all_objects.count(), 4)
+        self.assertFalse(Comment.all_objects.filter(
+            post_id=self.posts[1].pk
+        ).exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 4)
+
+    def test_group_purged(self):
+        purge.delete_group(self.group)
+        response = Client().get(
+            reverse('posts:group_list', args=[self.group.slug])
+        )
+        self.assertEqual(response.status_code, 404)
+        purge.purge_group(self.group.pk)
+        self.assertFalse(Group.all_objects.exists())
+        self.assertEqual(Post.objects.filter(group=None).count(), 6)
+
+    def test_comments_purged_in_chunks(self):
+        """Длинное обсуждение удаляется порциями, а не каскадом"""
+        post = self.posts[2]
+        for number in range(5):
+            Comment.objects.create(post=post, author=self.reader, text='c')
+        purge.delete_posts(Post.objects.filter(pk=post.pk))
+        with CaptureQueriesContext(connection) as queries:
+            purge.purge_deleted()
+        deletes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('DELETE FROM "posts_comment"')
+        ]
+        self.assertEqual(len(deletes), 3)
+        self.assertFalse(Comment.all_objects.filter(post=post).exists())
+        self.assertEqual(
+            self.rollup(Rollup.AUTHOR, self.author.pk, 'comments'), 1
+        )
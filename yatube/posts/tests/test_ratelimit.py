@@ -0,0 +1,89 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import ratelimit
+from ..models import Comment, Post, User
+
+LIMITS = {
+    'posts:add_comment': {'user': '2/m', 'ip': '5/m', 'methods': ('POST',)},
+}
+
+
+@override_settings(RATELIMITS=LIMITS)
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.user_2 = User.objects.create_user(username='user_2')
+        cls.user_3 = User.objects.create_user(username='user_3')
+        cls.post = Post.objects.create(author=cls.user, text='test_post')
+
+    def setUp(self):
+        cache.clear()
+        ratelimit._local_cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.another_client = Client()
+        self.another_client.force_login(self.user_2)
+        self.third_client = Client()
+        self.third_client.force_login(self.user_3)
+        self.url = reverse('posts:add_comment', args=[self.post.pk])
+
+    def comment(self, client):
+        return client.post(self.url, data={'text': 'comment'})
+
+    def test_user_limit_returns_429(self):
+        """После исчерпания лимита пользователь получает 429"""
+        for _ in range(2):
+            self.assertEqual(
+                self.comment(self.authorized_client).status_code,
+                HTTPStatus.FOUND
+            )
+        response = self.comment(self.authorized_client)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTrue(response.has_header('Retry-After'))
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_limits_are_per_user_and_per_ip(self):
+        """Лимит пользователя не мешает другим, лимит IP — общий"""
+        for _ in range(3):
+            self.comment(self.authorized_client)
+        for _ in range(3):
+            self.comment(self.another_client)
+        self.assertEqual(Comment.objects.count(), 4)
+        # Отказы по лимиту пользователя не засчитаны в лимит IP.
+        for _ in range(2):
+            self.comment(self.third_client)
+        self.assertEqual(Comment.objects.count(), 5)
+
+    def test_get_requests_are_not_limited(self):
+        """Методы вне настроек лимита не засчитываются"""
+        for _ in range(5):
+            self.authorized_client.get(self.url)
+        self.assertEqual(
+            self.comment(self.authorized_client).status_code,
+            HTTPStatus.FOUND
+        )
+
+    def test_fallback_to_process_memory(self):
+        """При недоступном кеше лимиты считаются в памяти процесса"""
+        broken_cache = mock.Mock()
+        broken_cache.get_many.side_effect = ConnectionError
+        with mock.patch.object(ratelimit, 'cache', broken_cache):
+            statuses = [
+                self.comment(self.authorized_client).status_code
+                for _ in range(3)
+            ]
+        self.assertEqual(statuses[-1], HTTPStatus.TOO_MANY_REQUESTS)
+
+    def test_previous_period_counts_partially(self):
+        """Запросы прошлого периода учитываются по оставшейся доле окна"""
+        window = ratelimit.SlidingWindow('10/m')
+        self.assertEqual(window.wait(5, 10, 30), 0)
+        self.assertAlmostEqual(window.wait(6, 10, 30), 6)
+        self.assertEqual(window.wait(11, 0, 30), 30)
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import related
+from ..models import Group, Post, RelatedPost, User
+
+TEMP_DIR = tempfile.mkdtemp()
+TOPICS = {
+    'cats': 'кошка мурлычет котёнок играет с клубком шерсти кошка спит',
+    'cars': 'автомобиль двигатель масло колесо бензин дорога автомобиль',
+    'food': 'рецепт борща свёкла капуста бульон сметана кастрюля рецепт',
+}
+NUMBERS = ('первый', 'второй', 'третий')
+
+
+@override_settings(
+    RELATED_INDEX_PATH=os.path.join(TEMP_DIR, 'related.npz'),
+    RELATED_TOP_K=2,
+    RELATED_MIN_DF=1,
+)
+class RelatedPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='test_group',
+            slug='test_slug',
+            description='test_description',
+        )
+        cls.posts = {
+            (topic, number): Post.objects.create(
+                author=cls.author, text=f'{text} {number}'
+            )
+            for topic, text in TOPICS.items()
+            for number in NUMBERS
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def related_ids(self, post):
+        return set(
+            RelatedPost.objects.filter(post=post).values_list(
+                'related_id', flat=True
+            )
+        )
+
+    def test_neighbours_share_topic(self):
+        """Соседи поста из полного пересчёта — посты той же темы"""
+        call_command('build_related', stdout=StringIO())
+        for (topic, number), post in self.posts.items():
+            with self.subTest(topic=topic, number=number):
+                expected = {
+                    other.pk for (other_topic, _), other in self.posts.items()
+                    if other_topic == topic and other != post
+                }
+                self.assertEqual(self.related_ids(post), expected)
+
+    def test_candidates_come_from_shared_buckets(self):
+        """Первые кандидаты — посты, совпавшие в большинстве корзин"""
+        index = related.Index.build(Post.objects.order_by('pk'))
+        rows = {pk: row for row, pk in enumerate(index.post_ids)}
+        for (topic, _), post in self.posts.items():
+            with self.subTest(post=post.pk):
+                row = rows[post.pk]
+                candidates = index.candidates(
+                    index.buckets[row], 2, exclude=row
+                )
+                self.assertEqual({
+                    index.post_ids[column] for column in candidates
+                }, {
+                    other.pk for (other_topic, _), other in self.posts.items()
+                    if other_topic == topic and other != post
+                })
+
+    def test_new_post_added_incrementally(self):
+        """Новый пост получает соседей и сам попадает в их списки"""
+        related.rebuild()
+        post = Post.objects.create(
+            author=self.author, text=TOPICS['cats'], group=self.group
+        )
+        related.update(post)
+        cats = {
+            other.pk for (topic, _), other in self.posts.items()
+            if topic == 'cats'
+        }
+        neighbours = self.related_ids(post)
+        self.assertEqual(len(neighbours), 2)
+        self.assertTrue(neighbours <= cats)
+        self.assertIn(post.pk, self.related_ids(neighbours.pop()))
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(len(response.context['related_posts']), 2)
+
+    def test_deleted_posts_skipped_by_stale_index(self):
+        """Посты, удалённые после сборки индекса, не попадают в соседи"""
+        related.rebuild()
+        deleted = self.posts[('cats', 'первый')]
+        Post.objects.filter(pk=deleted.pk).delete()
+        post = Post.objects.create(author=self.author, text=TOPICS['cats'])
+        related.update(post)
+        neighbours = self.related_ids(post)
+        self.assertNotIn(deleted.pk, neighbours)
+        self.assertEqual(len(neighbours), 2)
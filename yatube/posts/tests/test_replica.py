@@ -0,0 +1,55 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db.replica import sync_replica
+from ..models import Post, User
+
+
+@override_settings(READ_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплика обновляется только через sync_replica — так моделируется
+    её отставание от основной базы."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='test_post')
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feed_reads_from_lagging_replica(self):
+        """Лента читается с реплики и видит пост только после синхронизации"""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        sync_replica()
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+    def test_writer_pinned_to_primary(self):
+        """После записи пользователь читает свои данные с основной базы"""
+        sync_replica()
+        response = self.author_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            data={'text': 'fresh_comment'},
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertContains(self.author_client.get(url), 'fresh_comment')
+        self.assertNotContains(self.reader_client.get(url), 'fresh_comment')
+
+    def test_unpinned_reader_sees_replica_state(self):
+        """Без метки записи страницы поста читаются с реплики"""
+        response = self.reader_client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
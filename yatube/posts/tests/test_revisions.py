@@ -0,0 +1,108 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import revisions
+from ..models import Post, Revision, User
+
+
+@override_settings(REVISION_SNAPSHOT_EVERY=3)
+class RevisionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def edit_versions(self, count):
+        """Создаёт пост и правит его, возвращает пост и все тексты"""
+        lines = [f'line {number}\n' for number in range(50)]
+        texts = []
+        post = Post.objects.create(author=self.author, text='')
+        for version in range(count):
+            lines[version] = f'edited {version}\n'
+            post.text = ''.join(lines)
+            post.save()
+            revisions.record(post, author=self.author)
+            texts.append(post.text)
+        return post, texts
+
+    def test_every_version_restored(self):
+        """Любая версия собирается из снимка и дельт"""
+        post, texts = self.edit_versions(7)
+        stored = list(Revision.objects.filter(post=post))
+        self.assertEqual(
+            [revision.is_snapshot for revision in stored],
+            [True, False, False, True, False, False, True],
+        )
+        for number, text in enumerate(texts, start=1):
+            with self.subTest(number=number):
+                self.assertEqual(revisions.get_text(post, number), text)
+        self.assertIsNone(revisions.get_text(post, 100))
+
+    def test_new_post_has_no_history(self):
+        """Новый пост не хранит копию текста в истории до первой правки"""
+        self.authorized_client.post(
+            reverse('posts:create_post'), data={'text': 'first'}
+        )
+        self.assertFalse(Revision.objects.exists())
+
+    def test_edit_form_records_previous_text(self):
+        """Правка поста без истории сохраняет и старый, и новый текст"""
+        post = Post.objects.create(author=self.author, text='first')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'second'},
+        )
+        self.assertEqual(revisions.get_text(post, 1), 'first')
+        self.assertEqual(revisions.get_text(post, 2), 'second')
+        response = self.authorized_client.get(
+            reverse('posts:post_history', kwargs={'post_id': post.pk}),
+            {'rev': 1},
+        )
+        self.assertContains(response, 'first')
+
+    def test_history_visible_to_author_and_staff_only(self):
+        """Старые версии видят только автор и персонал"""
+        post = Post.objects.create(author=self.author, text='secret')
+        url = reverse('posts:post_history', kwargs={'post_id': post.pk})
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='reader'))
+        staff = Client()
+        staff.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        self.assertRedirects(
+            Client().get(url), reverse('users:login') + '?next=' + url
+        )
+        self.assertEqual(reader.get(url).status_code, 404)
+        self.assertNotContains(
+            reader.get(reverse('posts:post_detail', args=[post.pk])), url
+        )
+        for client in (self.authorized_client, staff):
+            with self.subTest(client=client):
+                self.assertContains(client.get(url), 'secret')
+
+    def test_compaction_keeps_later_versions(self):
+        """Сжатие истории удаляет старые версии, не ломая новые"""
+        post, texts = self.edit_versions(5)
+        Revision.objects.filter(post=post, number__lte=3).update(
+            created=timezone.now() - timedelta(days=60)
+        )
+        call_command('compact_revisions', days=30, stdout=StringIO())
+        numbers = list(
+            Revision.objects.filter(post=post).values_list('number', flat=True)
+        )
+        self.assertEqual(numbers, [3, 4, 5])
+        for number in numbers:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    revisions.get_text(post, number), texts[number - 1]
+                )
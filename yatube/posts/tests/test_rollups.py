@@ -0,0 +1,97 @@
+import datetime
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import rollups
+from ..models import Comment, Follow, Group, Post, Rollup, User
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='group', slug='group', description='test_description'
+        )
+        cls.other_group = Group.objects.create(
+            title='other', slug='other', description='test_description'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def snapshot(self):
+        return sorted(Rollup.objects.exclude(
+            posts=0, comments=0, followers=0
+        ).values_list(
+            'scope', 'object_id', 'period', 'day', 'posts', 'comments',
+            'followers',
+        ))
+
+    def write_events(self):
+        old = Post.objects.create(author=self.author, text='old')
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - datetime.timedelta(days=40)
+        )
+        old.refresh_from_db()
+        post = Post.objects.create(
+            author=self.author, text='post', group=self.group
+        )
+        Post.objects.create(author=self.author, text='moved', group=self.group)
+        moved = Post.objects.get(text='moved')
+        moved.group = self.other_group
+        moved.save()
+        Comment.objects.create(post=post, author=self.reader, text='first')
+        Comment.objects.create(post=post, author=self.reader, text='second')
+        Comment.objects.filter(text='second').delete()
+        Follow.objects.create(user=self.reader, author=self.author)
+        return old
+
+    def test_incremental_matches_backfill(self):
+        """Сводки из событий совпадают с пересчётом с нуля"""
+        old = self.write_events()
+        # Пересчёт сдвинул дату старого поста, событийные сводки — нет.
+        rollups.post_removed(Post(
+            author=self.author, pub_date=timezone.now()
+        ))
+        rollups.post_added(old)
+        incremental = self.snapshot()
+        self.assertEqual(rollups.backfill(chunk_size=2), 5)
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_series(self):
+        self.write_events()
+        today = timezone.localdate()
+        daily = rollups.series(
+            Rollup.AUTHOR, self.author.pk, Rollup.DAY,
+            today - datetime.timedelta(days=2), 3,
+        )
+        self.assertEqual(daily['posts'], [0, 0, 3])
+        self.assertEqual(daily['comments'], [0, 0, 1])
+        self.assertEqual(daily['followers'], [0, 0, 1])
+        group = rollups.series(
+            Rollup.GROUP, self.other_group.pk, Rollup.MONTH, today, 1
+        )
+        self.assertEqual(group['posts'], [1])
+
+    def test_dashboard(self):
+        """Панель видит только сам автор, ряды отдаются массивами"""
+        self.write_events()
+        url = reverse('posts:profile_stats', args=[self.author.username])
+        response = self.client.get(url)
+        self.assertEqual(response.context['totals']['posts'], 3)
+        data = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(data['daily']['posts']), 30)
+        self.assertEqual(data['daily']['posts'][-1], 3)
+        self.assertEqual(len(data['monthly']['posts']), 12)
+        reader = Client()
+        reader.force_login(self.reader)
+        self.assertRedirects(
+            reader.get(url),
+            reverse('posts:profile', args=[self.author.username]),
+        )
@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import Client, SimpleTestCase, override_settings
+
+from core.middleware.static import StaticFilesMiddleware
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.url = static('css/bootstrap.min.css')
+
+    def test_hashed_url_cached_forever(self):
+        """URL содержит хеш, а ответ кешируется на год"""
+        self.assertRegex(self.url, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+
+    def test_hashed_names_built_once(self):
+        """Имена из манифеста собираются один раз на middleware"""
+        middleware = StaticFilesMiddleware(None)
+        name = self.url[len(settings.STATIC_URL):]
+        self.assertIn('immutable', middleware.cache_control(name))
+        with mock.patch.object(staticfiles_storage, 'hashed_files', {}):
+            self.assertIn('immutable', middleware.cache_control(name))
+
+    def test_precompressed_copy_negotiated(self):
+        """Отдаётся заранее сжатая копия, которую принимает клиент"""
+        plain = self.client.get(self.url)
+        cases = (
+            ('gzip, deflate, br', 'br'),
+            ('gzip', 'gzip'),
+            ('br;q=0, gzip', 'gzip'),
+        )
+        for accept, encoding in cases:
+            with self.subTest(accept=accept):
+                response = self.client.get(
+                    self.url, HTTP_ACCEPT_ENCODING=accept
+                )
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertLess(
+                    int(response['Content-Length']),
+                    int(plain['Content-Length']),
+                )
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.url)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+class ManifestFallbackTests(SimpleTestCase):
+    @override_settings(STATIC_ROOT=tempfile.gettempdir() + '/no_static')
+    def test_missing_manifest_falls_back_to_plain_name(self):
+        self.assertFalse(staticfiles_storage.hashed_files)
+        self.assertEqual(
+            static('css/bootstrap.min.css'), '/static/css/bootstrap.min.css'
+        )
@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import tags
+from ..models import Post, PostTag, Tag, TagTrend, User
+
+
+class TagTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def post_tags(self, post):
+        return set(PostTag.objects.filter(post=post).values_list(
+            'tag__name', flat=True
+        ))
+
+    def test_extract(self):
+        """Теги выделяются без якорей ссылок, чисел и повторов"""
+        self.assertEqual(
+            tags.extract(
+                '#Django и #питон, снова #django. '
+                'http://example.com/#about #1 a#b #x_1'
+            ),
+            ['django', 'питон', 'x_1'],
+        )
+
+    def test_form_saves_tags(self):
+        """Теги выделяются при создании и правке поста"""
+        self.client.post(
+            reverse('posts:create_post'), {'text': 'про #Django и #python'}
+        )
+        post = Post.objects.get()
+        self.assertEqual(self.post_tags(post), {'django', 'python'})
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'только #django и #sqlite'},
+        )
+        self.assertEqual(self.post_tags(post), {'django', 'sqlite'})
+        counts = dict(Tag.objects.values_list('name', 'posts_count'))
+        self.assertEqual(counts, {'django': 1, 'python': 0, 'sqlite': 1})
+        self.assertEqual(
+            PostTag.objects.get(post=post, tag__name='django').pub_date,
+            post.pub_date,
+        )
+
+    def test_delete_updates_count(self):
+        """Удаление поста уменьшает счётчик тега"""
+        post = Post.objects.create(author=self.author, text='#django')
+        post.delete()
+        self.assertEqual(Tag.objects.get(name='django').posts_count, 0)
+
+    def test_timeline_cursor(self):
+        """Лента тега листается курсором, удалённые посты скрыты"""
+        posts = [
+            Post.objects.create(author=self.author, text=f'#django {number}')
+            for number in range(5)
+        ]
+        Post.objects.create(author=self.author, text='#python')
+        Post.objects.filter(pk=posts[2].pk).update(is_deleted=True)
+        url = reverse('posts:tag_posts', args=['Django'])
+        response = self.client.get(url)
+        first = response.context['posts']
+        self.assertEqual(len(first), 4)
+        page, cursor = tags.timeline(Tag.objects.get(name='django'), size=2)
+        self.assertEqual(
+            [post.pk for post in page], [posts[4].pk, posts[3].pk]
+        )
+        page, cursor = tags.timeline(
+            Tag.objects.get(name='django'), cursor, size=2
+        )
+        self.assertEqual(
+            [post.pk for post in page], [posts[1].pk, posts[0].pk]
+        )
+        self.assertIsNone(cursor)
+        self.assertEqual(
+            self.client.get(url, {'before': 'x'}).status_code, 404
+        )
+
+    def test_trending(self):
+        """Популярные теги считаются по часовым счётчикам"""
+        for text in ('#django', '#django #python', '#python', '#django'):
+            Post.objects.create(author=self.author, text=text)
+        self.assertEqual(TagTrend.objects.count(), 2)
+        self.assertEqual(tags.popular(), [('django', 3), ('python', 2)])
+        response = self.client.get(reverse('posts:tag_index'))
+        self.assertContains(response, '#django')
+
+    def test_backfill(self):
+        """Пересчёт с нуля совпадает с тегами, выделенными при записи"""
+        Post.objects.create(author=self.author, text='#django #python')
+        Post.objects.create(author=self.author, text='#django ' * 300)
+        post = Post.objects.create(author=self.author, text='#sqlite')
+        post.text = 'без тегов'
+        post.save()
+        expected = sorted(PostTag.objects.values_list('post', 'tag__name'))
+        counts = dict(Tag.objects.values_list('name', 'posts_count'))
+        self.assertEqual(tags.backfill(chunk_size=2), 3)
+        self.assertEqual(
+            sorted(PostTag.objects.values_list('post', 'tag__name')), expected
+        )
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'posts_count')), counts
+        )
@@ -1,22 +1,37 @@
 from django.urls import path
 
-from . import views
+from . import feeds, live, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name="group_list"),
+    path('tags/', views.tag_index, name='tag_index'),
+    path('tags/<str:name>/', views.tag_posts, name='tag_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/stats/',
+        views.profile_stats,
+        name='profile_stats'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='create_post'),
+    path('drafts/', views.drafts, name='drafts'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/history/',
+        views.post_history,
+        name='post_history'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('stream/', live.stream, name='stream'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -27,4 +42,34 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'rss/',
+        feeds.cached_feed(feeds.LatestPostsFeed()),
+        name='feed_rss'
+    ),
+    path(
+        'atom/',
+        feeds.cached_feed(feeds.LatestPostsAtomFeed()),
+        name='feed_atom'
+    ),
+    path(
+        'group/<slug:slug>/rss/',
+        feeds.cached_feed(feeds.GroupPostsFeed()),
+        name='group_feed_rss'
+    ),
+    path(
+        'group/<slug:slug>/atom/',
+        feeds.cached_feed(feeds.GroupPostsAtomFeed()),
+        name='group_feed_atom'
+    ),
+    path(
+        'profile/<str:username>/rss/',
+        feeds.cached_feed(feeds.AuthorPostsFeed()),
+        name='profile_feed_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.cached_feed(feeds.AuthorPostsAtomFeed()),
+        name='profile_feed_atom'
+    ),
 ]
@@ -1,11 +1,23 @@
+import datetime
+
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 
+from core.ratelimit import ratelimit
+from notifications.tasks import comments_added
+from tasks.queue import enqueue
+from . import (
+    archive, group_stats, live, publishing, revisions, rollups, tags
+)
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
+from .models import Group, Post, Revision, Rollup, Tag, User, Follow
 
 NUMBER_OF_POSTS = 10
+STATS_DAYS = 30
+STATS_MONTHS = 12
 
 
 def posts_paginator(posts, page_number):
@@ -15,10 +27,11 @@ def posts_paginator(posts, page_number):
 
 
 def index(request):
-    posts = Post.objects.all()
+    posts = archive.tiered(Post.objects.defer('text'))
     page_number = request.GET.get('page')
     context = {
-        'page_obj': posts_paginator(posts, page_number)
+        'page_obj': posts_paginator(posts, page_number),
+        'live_updates': live.enabled(request),
     }
     return render(request, 'posts/index.html', context)
 
@@ -29,12 +42,24 @@ def group_posts(request, slug):
     context = {
         'group': group,
         'page_obj': posts_paginator(
-            Post.objects.filter(group=group), page_number
+            archive.tiered(
+                Post.objects.filter(group=group).defer('text'),
+                group_id=group.pk,
+            ),
+            page_number,
         )
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def group_index(request):
+    """Каталог сообществ, самые активные сверху"""
+    context = {
+        'groups': group_stats.get_directory(),
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     page_number = request.GET.get('page')
@@ -45,25 +70,116 @@ def profile(request, username):
     context = {
         'author': author,
         'following': following,
-        'page_obj': posts_paginator(author.posts.all(), page_number)
+        'page_obj': posts_paginator(
+            archive.tiered(author.posts.defer('text'), author_id=author.pk),
+            page_number,
+        )
     }
     return render(request, 'posts/profile.html', context)
 
 
+def tag_index(request):
+    """Популярные теги за последние сутки"""
+    return render(request, 'posts/tag_index.html', {
+        'trending': tags.popular(),
+    })
+
+
+def tag_posts(request, name):
+    """Лента постов с тегом с курсорной пагинацией"""
+    tag = get_object_or_404(Tag, name=name.lower())
+    before = request.GET.get('before')
+    if before and not before.isdigit():
+        raise Http404
+    posts, next_cursor = tags.timeline(tag, before)
+    context = {
+        'tag': tag,
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'trending': tags.popular(),
+    }
+    return render(request, 'posts/tag_posts.html', context)
+
+
+@login_required
+def profile_stats(request, username):
+    """Статистика автора по дням и месяцам, ?format=json — только ряды"""
+    if username != request.user.username:
+        return redirect('posts:profile', username=username)
+    today = timezone.localdate()
+    daily = rollups.series(
+        Rollup.AUTHOR,
+        request.user.pk,
+        Rollup.DAY,
+        today - datetime.timedelta(days=STATS_DAYS - 1),
+        STATS_DAYS,
+    )
+    monthly = rollups.series(
+        Rollup.AUTHOR,
+        request.user.pk,
+        Rollup.MONTH,
+        rollups.shift(today.replace(day=1), Rollup.MONTH, 1 - STATS_MONTHS),
+        STATS_MONTHS,
+    )
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'daily': daily, 'monthly': monthly})
+    context = {
+        'author': request.user,
+        'series': {'daily': daily, 'monthly': monthly},
+        'months': _rows(monthly),
+        'days': _rows(daily),
+        'totals': {field: sum(daily[field]) for field in rollups.FIELDS},
+    }
+    return render(request, 'posts/profile_stats.html', context)
+
+
+def _rows(series):
+    """Строки таблицы, новые сверху: (период, посты, комментарии, подписки)"""
+    rows = [
+        (rollups.shift(series['start'], series['period'], number), *values)
+        for number, values in enumerate(
+            zip(*(series[field] for field in rollups.FIELDS))
+        )
+    ]
+    return rows[::-1]
+
+
 def post_detail(request, post_id):
-    """Страница просмотра поста"""
-    post = get_object_or_404(Post, id=post_id)
+    """Страница просмотра поста, старые посты читаются из архива"""
+    try:
+        post = Post.objects.get(id=post_id)
+    except Post.DoesNotExist:
+        post = archive.get_post(post_id)
+        if post is None:
+            raise Http404
     form = CommentForm()
-    comments = post.comments.all()
+    if post.is_archived:
+        comments = archive.get_comments(post)
+        related_posts = []
+        post_tags = []
+    else:
+        comments = post.comments.all()
+        related_posts = post.related_posts.filter(
+            related__is_deleted=False
+        ).select_related('related__author').defer(
+            'related__text', 'related__text_html'
+        )
+        post_tags = post.post_tags.values_list('tag__name', flat=True)
     context = {
         "post": post,
         "form": form,
         "comments": comments,
+        "related_posts": related_posts,
+        "tags": post_tags,
+        "author_posts_count": archive.tiered(
+            post.author.posts, author_id=post.author_id
+        ).count(),
     }
     return render(request, "posts/post_detail.html", context)
 
 
 @login_required
+@ratelimit('posts:create_post')
 def post_create(request):
     form = PostForm(request.POST or None,
                     files=request.FILES or None)
@@ -72,6 +188,9 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if not post.is_published:
+            return redirect('posts:drafts')
+        publishing.post_published(post)
         return redirect('posts:profile', username=request.user)
 
     return render(request, 'posts/create_post.html', {'form': form})
@@ -79,7 +198,9 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.all_objects, id=post_id, is_deleted=False)
+    was_published = post.is_published
+    previous_text = post.text
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
@@ -90,7 +211,16 @@ def post_edit(request, post_id):
         return redirect('posts:post_detail', post_id=post_id)
 
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        if was_published:
+            post.save()
+        else:
+            was_published = publishing.save_unpublished(post)
+        revisions.record(post, author=request.user, previous=previous_text)
+        if not post.is_published:
+            return redirect('posts:drafts')
+        if was_published:
+            publishing.schedule_side_effects(post)
         return redirect('posts:post_detail', post_id=post_id)
 
     context = {
@@ -102,6 +232,48 @@ def post_edit(request, post_id):
 
 
 @login_required
+def drafts(request):
+    """Черновики и отложенные посты автора, ближайшие к публикации сверху"""
+    posts = Post.all_objects.filter(
+        author=request.user, is_published=False, is_deleted=False
+    ).order_by('publish_at', '-pk').defer('text')
+    context = {
+        'page_obj': posts_paginator(posts, request.GET.get('page')),
+    }
+    return render(request, 'posts/drafts.html', context)
+
+
+@login_required
+def post_history(request, post_id):
+    """История правок поста, ?rev= — текст выбранной версии.
+
+    Видна только автору и персоналу: в старых версиях может остаться
+    то, что автор из поста убрал.
+    """
+    post = get_object_or_404(Post, id=post_id)
+    if post.author != request.user and not request.user.is_staff:
+        raise Http404
+    history = Revision.objects.filter(post=post).select_related(
+        'author'
+    ).defer('data').order_by('-number')
+    page_obj = posts_paginator(history, request.GET.get('page'))
+    number = request.GET.get('rev')
+    text = None
+    if number and number.isdigit():
+        text = revisions.get_text(post, int(number))
+    if text is None:
+        number, text = None, post.text
+    context = {
+        'post': post,
+        'page_obj': page_obj,
+        'number': number and int(number),
+        'text': text,
+    }
+    return render(request, 'posts/post_history.html', context)
+
+
+@login_required
+@ratelimit('posts:add_comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -110,20 +282,30 @@ def add_comment(request, post_id):
         comment.author = request.user
         comment.post = post
         comment.save()
+        enqueue(comments_added, comment.pk)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = archive.tiered(
+        Post.objects.filter(
+            author__following__user=request.user
+        ).defer('text'),
+        author_id__in=request.user.follower.values_list(
+            'author_id', flat=True
+        ),
+    )
     page_number = request.GET.get('page')
     context = {
-        'page_obj': posts_paginator(post_list, page_number)
+        'page_obj': posts_paginator(post_list, page_number),
+        'live_updates': live.enabled(request),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@ratelimit('posts:profile_follow')
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -132,6 +314,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@ratelimit('posts:profile_unfollow')
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key',)
+
+
+admin.site.register(Task, TaskAdmin)
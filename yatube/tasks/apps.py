@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TasksConfig(AppConfig):
+    name = 'tasks'
+
+    def ready(self):
+        # Подключаем модули tasks.py всех приложений, чтобы их функции
+        # попали в реестр до запуска воркера.
+        autodiscover_modules('tasks')
@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks import worker
+
+
+def work(batch_size, poll_interval, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while not stop.is_set():
+        if not worker.run_once(batch_size):
+            stop.wait(poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов, выполняющих фоновые задачи'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1,
+            help='Пауза в секундах, если очередь пуста',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь в текущем процессе и выйти',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            while worker.run_once(options['batch_size']):
+                pass
+            return
+
+        # Дочерние процессы открывают собственные соединения с базой.
+        connections.close_all()
+        stop = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(
+                target=work,
+                args=(options['batch_size'], options['poll_interval'], stop),
+            )
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Запущено воркеров: {len(processes)}')
+        try:
+            while any(process.is_alive() for process in processes):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            stop.set()
+        for process in processes:
+            process.join()
@@ -0,0 +1,81 @@
+"""Постановка фоновых задач в очередь.
+
+Задача — функция, зарегистрированная декоратором @task. В очередь
+попадает строка таблицы Task с именем функции и аргументами в JSON,
+выполняет её воркер (manage.py runworker).
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+registry = {}
+
+
+def task(name=None, batch=False):
+    """Регистрирует функцию как фоновую задачу.
+
+    Функция с batch=True получает список аргументов сразу всех
+    однотипных задач, которые воркер забрал за один раз.
+    """
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.batch = batch
+        registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def run_inline(func, payloads):
+    if func.batch:
+        func([payload['args'] for payload in payloads])
+        return
+    for payload in payloads:
+        func(*payload['args'], **payload['kwargs'])
+
+
+def enqueue(func, *args, priority=0, delay=None, idempotency_key=None,
+            max_attempts=3, **kwargs):
+    """Ставит func(*args, **kwargs) в очередь.
+
+    Повторный вызов с тем же idempotency_key не создаёт новую задачу.
+    """
+    payload = {'args': args, 'kwargs': kwargs}
+    if settings.TASKS_ALWAYS_EAGER:
+        run_inline(func, [payload])
+        return None
+    fields = {
+        'name': func.task_name,
+        'payload': json.dumps(payload),
+        'priority': priority,
+        'max_attempts': max_attempts,
+        'run_at': timezone.now() + (delay or timedelta()),
+    }
+    if idempotency_key is None:
+        return Task.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                idempotency_key=idempotency_key, **fields
+            )
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=idempotency_key)
+
+
+def enqueue_many(func, args_list, priority=0):
+    """Ставит в очередь пачку задач одним INSERT."""
+    if settings.TASKS_ALWAYS_EAGER:
+        run_inline(func, [{'args': args, 'kwargs': {}} for args in args_list])
+        return
+    Task.objects.bulk_create(
+        Task(
+            name=func.task_name,
+            payload=json.dumps({'args': args, 'kwargs': {}}),
+            priority=priority,
+        )
+        for args in args_list
+    )
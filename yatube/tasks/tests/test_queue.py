@@ -0,0 +1,100 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import worker
+from ..models import Task
+from ..queue import enqueue, enqueue_many, task
+from ..worker import claim, run_once
+
+calls = []
+
+
+@task(name='tests.collect')
+def collect(value):
+    calls.append(value)
+
+
+@task(name='tests.collect_batch', batch=True)
+def collect_batch(args_list):
+    calls.append([args[0] for args in args_list])
+
+
+@task(name='tests.broken')
+def broken():
+    raise ValueError('broken task')
+
+
+@override_settings(TASKS_RETRY_DELAY=0)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueued_task_runs_in_worker(self):
+        """Задача из очереди выполняется воркером"""
+        enqueue(collect, 'value')
+        self.assertEqual(calls, [])
+        self.assertEqual(run_once(batch_size=10), 1)
+        self.assertEqual(calls, ['value'])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_idempotency_key_prevents_duplicates(self):
+        """Задача с тем же ключом идемпотентности не дублируется"""
+        first = enqueue(collect, 1, idempotency_key='same')
+        second = enqueue(collect, 2, idempotency_key='same')
+        self.assertEqual(first.pk, second.pk)
+        run_once(batch_size=10)
+        self.assertEqual(calls, [1])
+
+    def test_higher_priority_claimed_first(self):
+        """Воркер сначала забирает задачи с большим приоритетом"""
+        enqueue(collect, 'low')
+        enqueue(collect, 'high', priority=10)
+        claimed = claim(limit=1)
+        self.assertEqual(len(claimed), 1)
+        self.assertIn('high', claimed[0].payload)
+
+    def test_batch_task_gets_all_payloads(self):
+        """Пакетная задача получает аргументы всех задач разом"""
+        enqueue_many(collect_batch, [(1,), (2,), (3,)])
+        run_once(batch_size=10)
+        self.assertEqual(calls, [[1, 2, 3]])
+
+    def test_failed_task_retried_then_marked_failed(self):
+        """Упавшая задача повторяется, пока не кончатся попытки"""
+        enqueue(broken, max_attempts=2)
+        run_once(batch_size=10)
+        item = Task.objects.get()
+        self.assertEqual(item.status, Task.QUEUED)
+        self.assertEqual(item.attempts, 1)
+        self.assertIn('broken task', item.last_error)
+        run_once(batch_size=10)
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_worker_loop_requeues_stale_tasks(self):
+        """Задачи умершего воркера возвращаются в очередь по ходу работы"""
+        enqueue(collect, 'stale')
+        Task.objects.update(
+            status=Task.RUNNING,
+            claim='dead',
+            locked_at=timezone.now() - timedelta(hours=1),
+        )
+        with mock.patch.object(worker, '_next_requeue', 0):
+            self.assertEqual(run_once(batch_size=10), 1)
+            self.assertEqual(calls, ['stale'])
+            enqueue(collect, 'again')
+            Task.objects.filter(status=Task.QUEUED).update(
+                status=Task.RUNNING,
+                locked_at=timezone.now() - timedelta(hours=1),
+            )
+            # Следующая проверка — не раньше TASKS_REQUEUE_INTERVAL.
+            self.assertEqual(run_once(batch_size=10), 0)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode_runs_immediately(self):
+        """В режиме eager задача выполняется без очереди"""
+        enqueue(collect, 'now')
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Task.objects.exists())
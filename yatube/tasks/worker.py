@@ -0,0 +1,110 @@
+import json
+import logging
+import time
+import traceback
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Task
+from .queue import registry, run_inline
+
+logger = logging.getLogger(__name__)
+
+# Когда этому процессу снова проверять зависшие задачи (time.monotonic).
+_next_requeue = 0
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, чей воркер умер на полпути."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=deadline
+    ).update(status=Task.QUEUED, claim='')
+
+
+def requeue_stale_if_due():
+    """requeue_stale() не чаще раза в TASKS_REQUEUE_INTERVAL секунд."""
+    global _next_requeue
+    now = time.monotonic()
+    if now < _next_requeue:
+        return 0
+    _next_requeue = now + settings.TASKS_REQUEUE_INTERVAL
+    return requeue_stale()
+
+
+def claim(limit):
+    """Забирает до limit готовых задач, самые приоритетные первыми.
+
+    Условный UPDATE с меткой claim не даёт двум воркерам взять одну
+    и ту же задачу.
+    """
+    now = timezone.now()
+    ids = list(
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        .order_by('-priority', 'run_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    Task.objects.filter(pk__in=ids, status=Task.QUEUED).update(
+        status=Task.RUNNING, claim=token, locked_at=now
+    )
+    return list(Task.objects.filter(claim=token).order_by('-priority'))
+
+
+def _finish(tasks, error=None):
+    ids = [item.pk for item in tasks]
+    if error is None:
+        Task.objects.filter(pk__in=ids).update(status=Task.DONE, claim='')
+        return
+    logger.error('Задачи %s упали: %s', ids, error)
+    for item in tasks:
+        item.attempts += 1
+        item.last_error = error
+        item.claim = ''
+        if item.attempts >= item.max_attempts:
+            item.status = Task.FAILED
+        else:
+            item.status = Task.QUEUED
+            item.run_at = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** item.attempts
+            )
+        item.save(update_fields=(
+            'attempts', 'last_error', 'claim', 'status', 'run_at'
+        ))
+
+
+def execute(tasks):
+    """Выполняет задачи; пакетные функции получают свои задачи разом."""
+    by_name = defaultdict(list)
+    for item in tasks:
+        by_name[item.name].append(item)
+    for name, group in by_name.items():
+        func = registry.get(name)
+        if func is None:
+            _finish(group, f'Неизвестная задача {name}')
+            continue
+        units = [group] if func.batch else [[item] for item in group]
+        for unit in units:
+            try:
+                run_inline(func, [json.loads(item.payload) for item in unit])
+            except Exception:
+                _finish(unit, traceback.format_exc())
+            else:
+                _finish(unit)
+
+
+def run_once(batch_size):
+    """Один проход воркера. Возвращает число обработанных задач."""
+    close_old_connections()
+    # Задачи упавших воркеров возвращаются в очередь и без перезапуска.
+    requeue_stale_if_due()
+    tasks = claim(batch_size)
+    execute(tasks)
+    return len(tasks)
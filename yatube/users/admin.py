@@ -0,0 +1,14 @@
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+
+from posts import purge
+from posts.admin import PurgeAdminMixin
+
+
+class PurgingUserAdmin(PurgeAdminMixin, UserAdmin):
+    purge_queryset = staticmethod(purge.delete_users)
+
+
+admin.site.unregister(User)
+admin.site.register(User, PurgingUserAdmin)
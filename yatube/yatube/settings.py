@@ -47,17 +47,23 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'tasks.apps.TasksConfig',
+    'notifications.apps.NotificationsConfig',
     'sorl.thumbnail'
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.static.StaticFilesMiddleware',
+    'core.middleware.page_cache.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.replica.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.profiling.SamplingProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -74,6 +80,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'notifications.context_processors.unread_notifications',
             ],
         },
     },
@@ -85,13 +92,50 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.db.backends.sqlite3 включает WAL и PRAGMA для каждого соединения,
+# открывает транзакции через BEGIN IMMEDIATE и повторяет запросы при
+# "database is locked". Соединения переиспользуются CONN_MAX_AGE секунд.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 5,
+        },
+    },
+    # Локальная реплика: копия db.sqlite3, её обновляет
+    # manage.py sync_replica --interval N.
+    'replica': {
+        'ENGINE': 'core.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 5,
+        },
+    },
 }
 
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+# Реплики для чтения, например YATUBE_READ_REPLICAS=replica.
+# Пока список пуст, всё читается с основной базы.
+READ_REPLICAS = [
+    alias
+    for alias in os.environ.get('YATUBE_READ_REPLICAS', '').split(',')
+    if alias
+]
+REPLICA_READ_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+REPLICA_EXCLUDED_APPS = ('auth', 'sessions')
+REPLICA_PIN_COOKIE = 'primary_pin'
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -130,7 +174,12 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# Исходники статики лежат в static/, collectstatic собирает их
+# с хешами в именах и сжатыми копиями в STATIC_ROOT.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
 
 
 LOGIN_URL = 'users:login'
@@ -147,8 +196,170 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 
+# Общий для процессов кеш (memcached) задаётся переменными окружения,
+# без них у каждого процесса свой LocMemCache.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.environ.get(
+            'YATUBE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', ''),
     }
 }
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_CACHE = CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+# Stale-while-revalidate для лент (core.swr)
+SWR_BACKGROUND_REFRESH = True
+SWR_LOCK_TIMEOUT = 30
+SWR_SLOW_RENDER_SECONDS = 2
+SWR_BREAKER_FAILURES = 3
+SWR_BREAKER_COOLDOWN = 60
+
+# Кеш страниц целиком для анонимных посетителей
+PAGE_CACHE_TIMEOUT = 60 * 5
+PAGE_CACHE_VIEWS = (
+    'posts:index',
+    'posts:group_index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+)
+
+# Лимиты запросов на запись (core.ratelimit): счётчик на пользователя
+# и на IP, запросы с другими методами не ограничиваются.
+RATELIMITS = {
+    'posts:create_post': {
+        'user': '10/m',
+        'ip': '30/m',
+        'methods': ('POST',),
+    },
+    'posts:add_comment': {
+        'user': '20/m',
+        'ip': '60/m',
+        'methods': ('POST',),
+    },
+    'posts:profile_follow': {
+        'user': '30/m',
+        'ip': '60/m',
+        'methods': ('GET', 'POST'),
+    },
+    'posts:profile_unfollow': {
+        'user': '30/m',
+        'ip': '60/m',
+        'methods': ('GET', 'POST'),
+    },
+}
+
+# Фоновые задачи (tasks): воркеры запускает manage.py runworker.
+# В режиме TASKS_ALWAYS_EAGER задачи выполняются сразу в запросе.
+TASKS_ALWAYS_EAGER = False
+TASKS_LOCK_TIMEOUT = 60 * 5
+# Как часто воркер возвращает в очередь задачи старше TASKS_LOCK_TIMEOUT.
+TASKS_REQUEUE_INTERVAL = 60
+TASKS_RETRY_DELAY = 5
+
+# RSS/Atom (posts.feeds) живут в кеше до изменения постов
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Живые обновления лент (posts.live). Каждое SSE-соединение занимает
+# поток WSGI-сервера, поэтому число соединений ограничено. Шина событий
+# живёт в одном процессе: включать только при запуске сайта одним
+# процессом с потоками (например, gunicorn --workers 1 --threads N).
+# Подписываются только вошедшие пользователи.
+SSE_ENABLED = os.environ.get('YATUBE_SSE_ENABLED') == '1'
+SSE_MAX_CONNECTIONS = 5000
+SSE_QUEUE_SIZE = 20
+SSE_HEARTBEAT = 15
+SSE_MAX_SECONDS = 60 * 5
+SSE_RETRY_MS = 3000
+
+# История правок (posts.revisions): полный снимок текста не реже чем
+# через столько версий, остальные хранятся дельтами.
+REVISION_SNAPSHOT_EVERY = 10
+
+# Тексты постов длиннее порога хранятся сжатыми в posts.PostBody
+POST_COMPRESS_THRESHOLD = 2000
+
+# Поиск почти одинаковых постов (posts.duplicates). Подпись из
+# BANDS * ROWS значений; дубликат — похожесть не ниже THRESHOLD.
+# ACTION: 'flag' — пост публикуется и отмечается в админке,
+# 'block' — форма не даёт его опубликовать.
+DUPLICATES_SHINGLE = 3
+DUPLICATES_BANDS = 16
+DUPLICATES_ROWS = 8
+DUPLICATES_THRESHOLD = 0.8
+DUPLICATES_ACTION = 'flag'
+
+# Похожие посты (posts.related): индекс строит manage.py build_related,
+# новые посты добавляет фоновая задача update_related.
+RELATED_INDEX_PATH = os.path.join(BASE_DIR, 'related_index.npz')
+RELATED_TOP_K = 5
+RELATED_MIN_DF = 2
+# LSH: полосы по RELATED_ROWS знаков случайных проекций.
+RELATED_BANDS = 16
+RELATED_ROWS = 8
+RELATED_MAX_BUCKET = 1000
+RELATED_BLOCK_SIZE = 1000
+# Сколько постов новее индекса update_related сравнивает напрямую.
+RELATED_RECENT_LIMIT = 500
+
+# Админка не считает больше строк, чем ADMIN_COUNT_CAP (core.paginator)
+ADMIN_COUNT_CAP = 10000
+
+# Отдача MEDIA_ROOT приложением (core.media). За nginx MEDIA_ACCEL =
+# 'nginx' и internal location MEDIA_ACCEL_PREFIX, за Apache/lighttpd с
+# mod_xsendfile — 'sendfile'.
+MEDIA_SERVE_PREFIXES = ('posts/', 'cache/')
+MEDIA_MAX_AGE = 60 * 60 * 24 * 7
+MEDIA_ACCEL = os.environ.get('YATUBE_MEDIA_ACCEL') or None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Сессии читаются из кеша, в базу пишутся только при изменении.
+# Пользователь запроса тоже берётся из кеша (core.auth). Только с общим
+# кешем: в кеше процесса выход из аккаунта, смена пароля и блокировка
+# сбросили бы запись лишь в том процессе, где случились, а остальные
+# ещё до конца таймаута пускали бы по старой сессии.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if SHARED_CACHE
+    else 'django.contrib.sessions.backends.db'
+)
+SESSION_SAVE_EVERY_REQUEST = False
+# ModelBackend нужен сессиям, открытым до core.auth: они хранят его путь.
+AUTHENTICATION_BACKENDS = [
+    'core.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_ENABLED = SHARED_CACHE
+USER_CACHE_TIMEOUT = 60 * 15
+
+# Сэмплирующий профилировщик (core.profiling). По умолчанию выключен:
+# профилируются только PROFILER_VIEWS, доля PROFILER_SAMPLE_RATE и
+# запросы с заголовком X-Profile: <PROFILER_TOKEN>.
+PROFILER_VIEWS = [
+    name
+    for name in os.environ.get('YATUBE_PROFILER_VIEWS', '').split(',')
+    if name
+]
+PROFILER_SAMPLE_RATE = float(os.environ.get('YATUBE_PROFILER_RATE', 0))
+PROFILER_TOKEN = os.environ.get('YATUBE_PROFILER_TOKEN') or None
+PROFILER_INTERVAL = 0.005
+PROFILER_FLUSH_SECONDS = 10
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Архив старых постов (posts.archive), переносит manage.py archive_posts
+ARCHIVE_PATH = os.path.join(BASE_DIR, 'archive.sqlite3')
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
+
+# Сколько строк удаляет одна транзакция фонового удаления (posts.purge)
+PURGE_CHUNK_SIZE = 200
+
+# Хештеги (posts.tags): сколько тегов поста учитывается и окно трендов
+TAGS_PER_POST = 10
+TAGS_TRENDING_HOURS = 24
+TAGS_TRENDING_SIZE = 20